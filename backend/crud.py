@@ -1,21 +1,27 @@
 from sqlalchemy.orm import Session
+from typing import List, Optional
 import models
 import schemas
 import security
+from services import archival, fx_engine, money, reconciliation, virtual_accounts
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
+def create_user(db: Session, user: schemas.UserCreate, va_currency: Optional[str] = virtual_accounts.DEFAULT_CURRENCY):
+    """Create a user and, unless va_currency is None, their default Virtual Account in the same commit."""
     hashed_password = security.get_password_hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
+    if va_currency:
+        db.flush()
+        virtual_accounts.provision(db, db_user.id, [va_currency])
     db.commit()
     db.refresh(db_user)
     return db_user
 
 def get_clients(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Client).filter(models.Client.owner_id == user_id).offset(skip).limit(limit).all()
+    return db.query(models.Client).filter(models.Client.owner_id == user_id).order_by(models.Client.id).offset(skip).limit(limit).all()
 
 def create_client(db: Session, client: schemas.ClientCreate, user_id: int):
     db_client = models.Client(**client.dict(), owner_id=user_id)
@@ -34,6 +40,7 @@ def update_client(db: Session, client_id: int, client: schemas.ClientCreate, use
             setattr(db_client, key, value)
         db.commit()
         db.refresh(db_client)
+        reconciliation.open_invoices.invalidate(user_id)  # client names are matched against senders
     return db_client
 
 def delete_client(db: Session, client_id: int, user_id: int):
@@ -44,22 +51,31 @@ def delete_client(db: Session, client_id: int, user_id: int):
     return db_client
 
 def get_invoices(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Invoice).filter(models.Invoice.owner_id == user_id).offset(skip).limit(limit).all()
+    return db.query(models.Invoice).filter(models.Invoice.owner_id == user_id).order_by(models.Invoice.id).offset(skip).limit(limit).all()
 
 import secrets
 
 # ...
 
 def create_invoice(db: Session, invoice: schemas.InvoiceCreate, user_id: int):
-    total_amount = sum(item.quantity * item.unit_price for item in invoice.items)
+    # Integer minor units from here on (exact sums, no float totals)
+    unit_prices = [money.to_minor(item.unit_price, invoice.currency) for item in invoice.items]
+    total_minor = sum(item.quantity * price for item, price in zip(invoice.items, unit_prices))
     payment_link_id = secrets.token_urlsafe(16)
-    
+
+    # Snapshot INR value for analytics; replaced by the locked rate once paid
+    currency_pair = f"{invoice.currency}_INR"
+    amount_inr_minor = None
+    if currency_pair in fx_engine.MOCK_BASE_RATES:
+        amount_inr_minor = fx_engine.to_inr_minor(total_minor, invoice.currency, fx_engine.get_mid_market_rate(currency_pair))
+
     db_invoice = models.Invoice(
         due_date=invoice.due_date,
         client_id=invoice.client_id,
         currency=invoice.currency,
         owner_id=user_id,
-        total_amount=total_amount,
+        total_minor=total_minor,
+        amount_inr_minor=amount_inr_minor,
         payment_link_id=payment_link_id
     )
 
@@ -67,17 +83,36 @@ def create_invoice(db: Session, invoice: schemas.InvoiceCreate, user_id: int):
     db.commit()
     db.refresh(db_invoice)
 
-    for item in invoice.items:
-        db_item = models.InvoiceItem(**item.dict(), invoice_id=db_invoice.id)
+    for item, price in zip(invoice.items, unit_prices):
+        db_item = models.InvoiceItem(
+            description=item.description, quantity=item.quantity, unit_price_minor=price, invoice_id=db_invoice.id,
+        )
         db.add(db_item)
     
     db.commit()
     db.refresh(db_invoice)
+    reconciliation.open_invoices.invalidate(user_id)
     return db_invoice
 
 def get_invoice(db: Session, invoice_id: int, user_id: int):
     return db.query(models.Invoice).filter(models.Invoice.id == invoice_id, models.Invoice.owner_id == user_id).first()
 
+def get_invoice_including_archived(db: Session, invoice_id: int, user_id: int):
+    """For read-only lookups: an archived invoice comes back detached (see services/archival.py)."""
+    return get_invoice(db, invoice_id, user_id) or archival.get_archived_invoice(db, invoice_id, user_id=user_id)
+
+def get_invoice_transaction(db: Session, invoice_id: int):
+    """The invoice's (first) transaction, from the archive if it has been archived."""
+    transaction = db.query(models.Transaction).filter(models.Transaction.invoice_id == invoice_id).first()
+    return transaction or archival.get_archived_transaction(db, invoice_id)
+
+def iter_invoice_item_rows(db: Session, invoice_id: int, batch_size: int = 1000):
+    """(description, quantity, unit_price_minor) rows of an invoice, fetched in batches (for PDFs)."""
+    return db.query(models.InvoiceItem.description, models.InvoiceItem.quantity, models.InvoiceItem.unit_price_minor)\
+        .filter(models.InvoiceItem.invoice_id == invoice_id)\
+        .order_by(models.InvoiceItem.id)\
+        .yield_per(batch_size)
+
 def set_user_onboarding_status(db: Session, user_id: int, status: bool):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
@@ -93,8 +128,14 @@ def create_transaction(db: Session, transaction: schemas.TransactionCreate):
     db.refresh(db_transaction)
     return db_transaction
 
-def get_invoice_by_link_id(db: Session, payment_link_id: str):
-    return db.query(models.Invoice).filter(models.Invoice.payment_link_id == payment_link_id).first()
+def get_invoice_by_link_id(db: Session, payment_link_id: str, for_update: bool = False):
+    query = db.query(models.Invoice).filter(models.Invoice.payment_link_id == payment_link_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+def get_invoice_by_link_id_including_archived(db: Session, payment_link_id: str):
+    return get_invoice_by_link_id(db, payment_link_id) or archival.get_archived_invoice(db, payment_link_id=payment_link_id)
 
 # --- Virtual Account CRUD ---
 def create_virtual_account(db: Session, user_id: int, va_data: dict):
@@ -110,46 +151,48 @@ def get_virtual_accounts_by_user(db: Session, user_id: int):
     return db.query(models.VirtualAccount).filter(models.VirtualAccount.user_id == user_id).all()
 
 def provision_virtual_account(db: Session, user_id: int, currency: str):
-    """Provision a Virtual Account for a specific currency."""
-    import secrets
-    
-    # Configuration for different currency corridors
-    VA_CONFIGS = {
-        "USD": {
-            "bank_name": "Community Federal Savings Bank",
-            "routing_code": "026073150",
-            "provider": "Currencycloud",
-            "prefix": "VA"
-        },
-        "EUR": {
-            "bank_name": "Banking Circle",
-            "routing_code": f"BE{secrets.token_hex(10).upper()}", # IBAN mock
-            "provider": "Banking Circle",
-            "prefix": "EU"
-        },
-        "GBP": {
-            "bank_name": "Barclays Bank UK",
-            "routing_code": "20-45-45", # Sort Code mock
-            "provider": "Currencycloud",
-            "prefix": "GB"
-        }
-    }
-    
-    config = VA_CONFIGS.get(currency.upper())
-    if not config:
-        return None
-        
-    va_data = {
-        "currency": currency.upper(),
-        "bank_name": config["bank_name"],
-        "account_number": f"{config['prefix']}{secrets.token_hex(6).upper()}",
-        "routing_code": config["routing_code"],
-        "provider": config["provider"]
-    }
-    return create_virtual_account(db, user_id, va_data)
-
-def provision_default_virtual_account(db: Session, user_id: int):
-    """Provision a default USD Virtual Account for a new user."""
-    return provision_virtual_account(db, user_id, "USD")
+    """Provision a Virtual Account for a specific currency (None if the currency is not supported)."""
+    return provision_virtual_accounts(db, user_id, [currency])[0] if currency.upper() in virtual_accounts.VA_CONFIGS else None
+
+def provision_virtual_accounts(db: Session, user_id: int, currencies: List[str]):
+    """Provision one Virtual Account per currency in a single transaction."""
+    accounts = virtual_accounts.provision(db, user_id, currencies)
+    db.commit()
+    for va in accounts:
+        db.refresh(va)
+    return accounts
 
+def create_recurring_template(db: Session, template: schemas.RecurringInvoiceTemplateCreate, user_id: int):
+    db_template = models.RecurringInvoiceTemplate(
+        **template.dict(exclude={"items"}),
+        owner_id=user_id,
+        next_run_date=template.start_date,
+        active=True,
+    )
+    db_template.items = [
+        models.RecurringInvoiceTemplateItem(
+            description=item.description,
+            quantity=item.quantity,
+            unit_price_minor=money.to_minor(item.unit_price, template.currency),
+        )
+        for item in template.items
+    ]
+    db.add(db_template)
+    db.commit()
+    db.refresh(db_template)
+    return db_template
+
+def get_recurring_templates(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+    return (
+        db.query(models.RecurringInvoiceTemplate)
+        .filter(models.RecurringInvoiceTemplate.owner_id == user_id)
+        .order_by(models.RecurringInvoiceTemplate.id)
+        .offset(skip).limit(limit).all()
+    )
 
+def get_recurring_template(db: Session, template_id: int, user_id: int):
+    return (
+        db.query(models.RecurringInvoiceTemplate)
+        .filter(models.RecurringInvoiceTemplate.id == template_id, models.RecurringInvoiceTemplate.owner_id == user_id)
+        .first()
+    )
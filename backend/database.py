@@ -1,23 +1,143 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import datetime
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # Check for database URL in various common environment variables
 raw_url = os.getenv("SQLALCHEMY_DATABASE_URL") or os.getenv("DATABASE_URL")
 
 if raw_url:
-    print(f"DEBUG: Found Database URL in environment: {raw_url[:15]}...")
+    logger.debug(f"Found Database URL in environment: {raw_url[:15]}...")
     SQLALCHEMY_DATABASE_URL = raw_url
 else:
-    print("DEBUG: No Database URL found in environment, falling back to localhost")
+    logger.debug("No Database URL found in environment, falling back to localhost")
     SQLALCHEMY_DATABASE_URL = "postgresql://localhost/skydo_local"
 
-# Railway/Heroku provide "postgres://", but SQLAlchemy requires "postgresql://"
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def _normalize_url(url: str) -> str:
+    # Railway/Heroku provide "postgres://", but SQLAlchemy requires "postgresql://"
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+SQLALCHEMY_DATABASE_URL = _normalize_url(SQLALCHEMY_DATABASE_URL)
+
+# Optional read replica for heavy read paths (analytics, listings, PDFs). For local
+# testing, point it at a second database restored from the primary, or at the
+# primary itself; a database that is not a hot standby always reports zero lag.
+raw_replica_url = os.getenv("SQLALCHEMY_REPLICA_URL") or os.getenv("DATABASE_REPLICA_URL")
+SQLALCHEMY_REPLICA_URL = _normalize_url(raw_replica_url) if raw_replica_url else None
 
+# create_engine() does not connect; connections are opened lazily in each process.
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = create_engine(SQLALCHEMY_REPLICA_URL) if SQLALCHEMY_REPLICA_URL else None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine or engine)
+
 Base = declarative_base()
+
+# Connections each worker opens at startup so the first requests skip connection setup
+POOL_PREWARM_SIZE = int(os.getenv("DB_POOL_PREWARM", "2"))
+
+
+def prewarm_pool(size: int = POOL_PREWARM_SIZE):
+    """Open `size` pooled connections per engine and return them to the pool."""
+    warmed = 0
+    for eng in filter(None, (engine, replica_engine)):
+        count = min(size, getattr(eng.pool, "size", lambda: size)())
+        connections = []
+        try:
+            for _ in range(count):
+                connections.append(eng.connect())
+        finally:
+            for conn in connections:
+                conn.close()
+        warmed += len(connections)
+    return warmed
+
+
+# --- Read routing ---
+# Reads go to the replica unless it lags more than REPLICA_MAX_LAG_SECONDS, or the
+# owner had a payment/settlement within READ_YOUR_WRITES_SECONDS (so the dashboard
+# never shows an invoice as unpaid right after the webhook marked it paid).
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+REPLICA_LAG_CHECK_INTERVAL = 1.0
+
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+_LAST_OWNER_WRITE_SQL = text(
+    "SELECT created_at FROM outbox_events WHERE owner_id = :owner_id ORDER BY id DESC LIMIT 1"
+)
+
+_lag_lock = threading.Lock()
+_lag_cache = {"checked_at": 0.0, "lag": 0.0}
+
+
+def replica_lag_seconds() -> float:
+    """Replication lag of the replica, cached briefly; infinite if it can't be reached."""
+    if replica_engine is None:
+        return 0.0
+    now = time.monotonic()
+    with _lag_lock:
+        if now - _lag_cache["checked_at"] < REPLICA_LAG_CHECK_INTERVAL:
+            return _lag_cache["lag"]
+        _lag_cache["checked_at"] = now
+    try:
+        with replica_engine.connect() as conn:
+            lag = float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0)
+    except Exception as e:
+        logger.warning(f"Replica lag check failed, reading from primary: {e}")
+        lag = float("inf")
+    _lag_cache["lag"] = lag
+    return lag
+
+
+def _owner_wrote_recently(db, owner_id: int) -> bool:
+    last_write = db.execute(_LAST_OWNER_WRITE_SQL, {"owner_id": owner_id}).scalar()
+    if last_write is None:
+        return False
+    age = datetime.datetime.utcnow() - last_write
+    return age.total_seconds() < READ_YOUR_WRITES_SECONDS
+
+
+def get_read_session(owner_id: int = None):
+    """
+    Session for a read-only request: the replica when it is configured, fresh
+    enough and the owner has no recent writes; otherwise the primary.
+    """
+    if replica_engine is None or replica_lag_seconds() > REPLICA_MAX_LAG_SECONDS:
+        return SessionLocal()
+    if owner_id is not None:
+        primary = SessionLocal()
+        try:
+            recent_write = _owner_wrote_recently(primary, owner_id)
+        except Exception:
+            primary.close()
+            raise
+        if recent_write:
+            return primary
+        primary.close()
+    return ReadSessionLocal()
+
+
+def _reset_pool_after_fork():
+    # A forked worker (e.g. `gunicorn --preload`) must never reuse sockets the
+    # parent opened; drop the inherited pool without closing the parent's connections.
+    engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.dispose(close=False)
+    _lag_cache["checked_at"] = 0.0
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
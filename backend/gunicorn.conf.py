@@ -0,0 +1,33 @@
+# backend/gunicorn.conf.py
+"""
+Gunicorn settings.
+
+The app is preloaded in the master by default: it is imported once (FastAPI,
+SQLAlchemy, jose, all routers and ReportLab) and the workers share those pages
+copy-on-write instead of each importing its own copy. Nothing in the import
+path opens a database connection, and database.py resets the pool in every
+forked child, so no socket is ever shared between processes.
+
+Set GUNICORN_PRELOAD=0 to go back to per-worker imports.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "False")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Pull lazily imported modules into the shared image before forking
+    from services import fx_engine, pdf_generator
+    pdf_generator.warm_up()
+    fx_engine.load_rates()
+    # Move everything allocated so far out of the GC's reach: collections in the
+    # workers would otherwise touch (and un-share) these pages.
+    gc.collect()
+    gc.freeze()
@@ -1,30 +1,65 @@
+import argparse
+import time
+from sqlalchemy import text
 import database
 import models
 import crud
 import schemas
+import migrations
+from services import partitions, virtual_accounts
 
-def init_db():
-    print("Initializing database...")
-    # 1. Drop and recreate tables
+DEMO_EMAIL = "demo@skydo.com"
+
+def reset_db():
+    """Destructive: drop every table and recreate the schema from the models."""
+    print("Resetting database (drop + create)...")
     database.Base.metadata.drop_all(bind=database.engine)
-    database.Base.metadata.create_all(bind=database.engine)
-    
-    # 2. Seed demo user
+    with database.engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+    migrations.upgrade()
+
+def seed_demo_user():
     db = database.SessionLocal()
     try:
-        demo_email = "demo@skydo.com"
-        print(f"Seeding demo user: {demo_email}")
-        demo_user_schema = schemas.UserCreate(email=demo_email, password="password123")
-        new_user = crud.create_user(db, demo_user_schema)
-        
-        # Auto-provision USD account for demo user
-        crud.provision_default_virtual_account(db, new_user.id)
-        
-        print("Database initialization complete.")
+        if crud.get_user_by_email(db, DEMO_EMAIL):
+            print(f"Demo user already present: {DEMO_EMAIL}")
+            return
+        print(f"Seeding demo user: {DEMO_EMAIL}")
+        demo_user_schema = schemas.UserCreate(email=DEMO_EMAIL, password="password123")
+        crud.create_user(db, demo_user_schema)  # with the default USD Virtual Account
     except Exception as e:
         print(f"Error seeding database: {e}")
     finally:
         db.close()
 
+def init_db(reset: bool = False):
+    started = time.perf_counter()
+    if reset:
+        reset_db()
+    else:
+        # Idempotent bootstrap: only apply what the stored schema version is missing
+        applied = migrations.upgrade()
+        for version, description, seconds in applied:
+            print(f"Applied schema v{version} ({description}) in {seconds * 1000:.0f} ms")
+        if not applied:
+            print(f"Schema up to date (v{migrations.LATEST_VERSION})")
+
+    # Keep monthly transaction partitions prepared ahead of time
+    with database.engine.begin() as conn:
+        created = partitions.ensure_transaction_partitions(conn)
+    if created:
+        print(f"Created transaction partitions: {', '.join(created)}")
+
+    # Pre-mint virtual account numbers so registrations never wait on a provider
+    refilled = virtual_accounts.refill()
+    if refilled and refilled["processed"]:
+        print(f"Virtual account pool: added {refilled['processed']} numbers ({refilled['available']})")
+
+    seed_demo_user()
+    print(f"Database initialization complete in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
 if __name__ == "__main__":
-    init_db()
+    parser = argparse.ArgumentParser(description="Bootstrap the Skydo database.")
+    parser.add_argument("--reset", action="store_true", help="drop all tables and reseed (destroys data)")
+    args = parser.parse_args()
+    init_db(reset=args.reset)
@@ -1,30 +1,86 @@
+import time
+_boot_started = time.perf_counter()
+
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import database
 import models
 import routers
+from services import admission, archival, compression, dunning, health, recurring_invoices, tracing, virtual_accounts
 
 from fastapi.middleware.cors import CORSMiddleware
-print("Starting FastAPI app with CORS enabled...")
-
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["Content-Disposition"]
-)
-
-app.include_router(routers.auth.router)
-app.include_router(routers.clients.router)
-app.include_router(routers.invoices.router)
-app.include_router(routers.mock_payments.router)
-app.include_router(routers.public_invoices.router)
-app.include_router(routers.analytics.router)
-app.include_router(routers.documents.router)
-app.include_router(routers.webhooks.router)
-
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the Skydo Replica API"}
+
+logger = logging.getLogger("uvicorn.error")
+
+def _mark_worker_fork():
+    # With `gunicorn --preload` the app is imported once in the master; time each
+    # worker from its fork rather than from the master's import.
+    global _boot_started
+    _boot_started = time.perf_counter()
+
+os.register_at_fork(after_in_child=_mark_worker_fork)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    imported = time.perf_counter()
+    try:
+        warmed = database.prewarm_pool()
+    except Exception as e:
+        # The database may still be starting; requests will connect on demand.
+        warmed = 0
+        logger.warning(f"Connection pool prewarm failed: {e}")
+    # Schema check, FX rate cache, PDF styles; /readyz retries whatever isn't ready
+    health.warm_up()
+    dunning.start_scheduler()  # only if OVERDUE_JOB_INTERVAL_SECONDS is set
+    recurring_invoices.start_scheduler()  # only if RECURRING_JOB_INTERVAL_SECONDS is set
+    virtual_accounts.start_scheduler()  # only if VA_POOL_REFILL_INTERVAL_SECONDS is set
+    archival.start_scheduler()  # only if ARCHIVE_JOB_INTERVAL_SECONDS is set
+    ready = time.perf_counter()
+    logger.info(
+        f"Worker {os.getpid()} ready in {(ready - _boot_started) * 1000:.0f} ms "
+        f"(app load {(imported - _boot_started) * 1000:.0f} ms, "
+        f"{warmed} pooled connections in {(ready - imported) * 1000:.0f} ms)"
+    )
+    yield
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Content-Disposition"]
+    )
+    # gzip/brotli for bodies over COMPRESSION_MIN_BYTES, per Accept-Encoding
+    app.add_middleware(compression.CompressionMiddleware)
+    # 429 for tenants over their rate limit, 503 when heavy routes are saturated
+    admission.install(app)
+    # Request, SQL and commit spans, only if TRACE_EXPORTER is set
+    tracing.instrument(app)
+
+    app.include_router(routers.auth.router)
+    app.include_router(routers.clients.router)
+    app.include_router(routers.invoices.router)
+    app.include_router(routers.mock_payments.router)
+    app.include_router(routers.public_invoices.router)
+    app.include_router(routers.analytics.router)
+    app.include_router(routers.documents.router)
+    app.include_router(routers.webhooks.router)
+    app.include_router(routers.streams.router)
+    app.include_router(routers.events.router)
+    app.include_router(routers.reconciliation.router)
+    app.include_router(routers.search.router)
+    app.include_router(routers.recurring_invoices.router)
+    app.include_router(routers.health.router)
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the Skydo Replica API"}
+
+    return app
+
+app = create_app()
@@ -0,0 +1,249 @@
+# backend/migrations.py
+"""
+Schema Versioning
+
+Tracks the schema version in a single-row `schema_version` table so boot only
+applies what is missing instead of dropping and recreating everything.
+
+  - Fresh database: create_all() from the models, then stamp the latest version.
+  - Existing database: run each migration newer than the stored version, in
+    order, each in its own transaction.
+
+Migrations must only upgrade databases that predate them; a fresh database
+never runs them. To change the schema, update models.py and append a
+(version, description, function) entry to MIGRATIONS. A table created by an
+older migration is built from the current models, so later steps must skip
+objects that already exist (_create_tables, _add_column, IF NOT EXISTS).
+
+The whole upgrade holds a Postgres advisory lock, so containers booting
+at the same time don't race each other.
+"""
+
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+import database
+import models
+from services import inr_normalization, ledger, money, partitions, rollups, search
+
+ADVISORY_LOCK_ID = 0x5C1D0  # arbitrary, constant across releases
+
+
+def _create_tables(conn: Connection, *tables):
+    for table in tables:
+        table.create(bind=conn, checkfirst=True)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str):
+    # Tables created by an earlier migration come from the current models and may
+    # already have the column, so every column addition is skipped if present.
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _m001_outbox(conn: Connection):
+    _create_tables(conn, models.OutboxEvent.__table__, models.EventConsumerCheckpoint.__table__)
+
+
+def _m002_partition_transactions(conn: Connection):
+    # Move the old heap table (and the names it owns) out of the way
+    conn.execute(text("ALTER TABLE transactions RENAME TO transactions_legacy"))
+    conn.execute(text("ALTER TABLE transactions_legacy RENAME CONSTRAINT transactions_pkey TO transactions_legacy_pkey"))
+    conn.execute(text("ALTER TABLE transactions_legacy RENAME CONSTRAINT transactions_invoice_id_fkey TO transactions_legacy_invoice_id_fkey"))
+    conn.execute(text("ALTER INDEX IF EXISTS ix_transactions_id RENAME TO ix_transactions_legacy_id"))
+    conn.execute(text("ALTER SEQUENCE transactions_id_seq RENAME TO transactions_legacy_id_seq"))
+
+    models.Transaction.__table__.create(bind=conn)  # also creates the current and upcoming months
+    first = conn.execute(text("SELECT min(processed_at) FROM transactions_legacy")).scalar()
+    if first is not None:
+        partitions.ensure_transaction_partitions(conn, start=first.date())
+
+    legacy_columns = {c["name"] for c in inspect(conn).get_columns("transactions_legacy")}
+    columns = ", ".join(c.name for c in models.Transaction.__table__.columns if c.name in legacy_columns)
+    conn.execute(text(f"""
+        INSERT INTO transactions ({columns})
+        SELECT {columns.replace("processed_at", "COALESCE(processed_at, now() AT TIME ZONE 'utc')")}
+        FROM transactions_legacy
+    """))
+    conn.execute(text("SELECT setval('transactions_id_seq', COALESCE((SELECT max(id) FROM transactions), 0) + 1, false)"))
+    conn.execute(text("DROP TABLE transactions_legacy"))
+
+
+def _m003_revenue_rollups(conn: Connection):
+    _create_tables(conn, models.RevenueDailyRollup.__table__)
+    rollups.rebuild(conn, include_archive=False)  # the archive tables come later (012)
+
+
+def _m004_inr_amounts(conn: Connection):
+    # Values are filled in once by migration 011, when the amounts are in their final minor-unit columns
+    _add_column(conn, "invoices", "amount_inr", "NUMERIC(16, 2)")
+    _add_column(conn, "transactions", "amount_inr", "NUMERIC(16, 2)")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_owner_status_amount_inr ON invoices (owner_id, status, amount_inr)"))
+
+
+def _m005_reconciliation(conn: Connection):
+    _create_tables(conn, models.UnmatchedCredit.__table__)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_virtual_accounts_account_number ON virtual_accounts (account_number)"))
+
+
+def _m006_search_indexes(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_owner_due_date ON invoices (owner_id, due_date)"))
+    search.ensure_search_indexes(conn)
+
+
+def _m007_ledger(conn: Connection):
+    _create_tables(conn, models.LedgerEntry.__table__, models.AccountBalance.__table__)
+    ledger.backfill_from_transactions(conn)
+
+
+def _m008_overdue_detection(conn: Connection):
+    _create_tables(conn, models.BatchJobRun.__table__, models.DunningEvent.__table__)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_status_due_date ON invoices (status, due_date)"))
+
+
+def _m009_recurring_invoices(conn: Connection):
+    _create_tables(conn, models.RecurringInvoiceTemplate.__table__, models.RecurringInvoiceTemplateItem.__table__)
+    _add_column(conn, "invoices", "template_id", "INTEGER REFERENCES recurring_invoice_templates (id)")
+    _add_column(conn, "invoices", "period_start", "DATE")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_invoices_template_period ON invoices (template_id, period_start)"))
+
+
+def _m010_virtual_account_pool(conn: Connection):
+    _create_tables(conn, models.VirtualAccountPool.__table__)
+    # account_number was only indexed; enforce uniqueness
+    conn.execute(text("DROP INDEX IF EXISTS ix_virtual_accounts_account_number"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_virtual_accounts_account_number ON virtual_accounts (account_number)"))
+
+
+def _to_minor_units(conn: Connection, table: str, numeric_column: str, minor_column: str, currency_sql: str):
+    # Convert a NUMERIC amount column to BIGINT minor units in place of it
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    _add_column(conn, table, minor_column, "BIGINT")
+    if numeric_column not in columns:
+        return
+    scale = " ".join(f"WHEN '{code}' THEN {10 ** places}" for code, places in money.EXPONENTS.items())
+    conn.execute(text(f"""
+        UPDATE {table} SET {minor_column} = ROUND({numeric_column} * (CASE {currency_sql} {scale} ELSE {10 ** money.DEFAULT_EXPONENT} END))
+        WHERE {numeric_column} IS NOT NULL
+    """))
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {numeric_column}"))
+
+
+def _m011_minor_units(conn: Connection):
+    conn.execute(text("DROP INDEX IF EXISTS ix_invoices_owner_status_amount_inr"))
+    _to_minor_units(conn, "invoices", "total_amount", "total_minor", "currency")
+    _to_minor_units(conn, "invoices", "amount_inr", "amount_inr_minor", "'INR'")
+    invoice_currency = "(SELECT currency FROM invoices WHERE invoices.id = invoice_items.invoice_id)"
+    _to_minor_units(conn, "invoice_items", "unit_price", "unit_price_minor", invoice_currency)
+    template_currency = (
+        "(SELECT currency FROM recurring_invoice_templates t WHERE t.id = recurring_invoice_template_items.template_id)"
+    )
+    _to_minor_units(conn, "recurring_invoice_template_items", "unit_price", "unit_price_minor", template_currency)
+    _to_minor_units(conn, "dunning_events", "amount", "amount_minor", "currency")
+    for table, column in (("invoices", "total_minor"), ("invoice_items", "unit_price_minor"),
+                          ("recurring_invoice_template_items", "unit_price_minor")):
+        conn.execute(text(f"UPDATE {table} SET {column} = 0 WHERE {column} IS NULL"))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_invoices_owner_status_amount_inr_minor ON invoices (owner_id, status, amount_inr_minor)"
+    ))
+    # INR amounts of rows written before migration 004 added them (a one-off;
+    # scripts.normalize_inr backfill does the same on demand)
+    inr_normalization.backfill(conn)
+
+
+def _m012_archive(conn: Connection):
+    _create_tables(conn, models.ArchivedInvoice.__table__, models.ArchivedTransaction.__table__,
+                   models.ArchivedRevenueTotal.__table__)
+
+
+def _m013_feed_cursor(conn: Connection):
+    # The change feed pages on (txid, id); checkpoints keep their old integer
+    # cursors as text, which outbox.parse_cursor() still understands
+    conn.execute(text("UPDATE outbox_events SET txid = 0 WHERE txid IS NULL"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_outbox_events_owner_id_txid_id ON outbox_events (owner_id, txid, id)"
+    ))
+    conn.execute(text(
+        "ALTER TABLE event_consumer_checkpoints ALTER COLUMN cursor TYPE VARCHAR USING cursor::text"
+    ))
+
+
+def _m014_archived_client_copy(conn: Connection):
+    _add_column(conn, "archived_invoices", "client_name", "VARCHAR")
+    _add_column(conn, "archived_invoices", "client_email", "VARCHAR")
+    _add_column(conn, "archived_invoices", "client_address", "TEXT")
+    conn.execute(text(
+        "UPDATE archived_invoices a SET client_name = c.name, client_email = c.email, client_address = c.address "
+        "FROM clients c WHERE c.id = a.client_id AND a.client_name IS NULL"
+    ))
+
+
+MIGRATIONS = [
+    (1, "outbox events and consumer checkpoints", _m001_outbox),
+    (2, "partition transactions by month", _m002_partition_transactions),
+    (3, "daily revenue rollups", _m003_revenue_rollups),
+    (4, "INR-normalized amounts", _m004_inr_amounts),
+    (5, "unmatched credit review queue", _m005_reconciliation),
+    (6, "client and invoice search indexes", _m006_search_indexes),
+    (7, "double-entry ledger and account balances", _m007_ledger),
+    (8, "overdue detection and dunning events", _m008_overdue_detection),
+    (9, "recurring invoice templates", _m009_recurring_invoices),
+    (10, "virtual account pool and unique account numbers", _m010_virtual_account_pool),
+    (11, "integer minor-unit amounts", _m011_minor_units),
+    (12, "cold-storage archive for settled invoices", _m012_archive),
+    (13, "change-feed cursors in commit order", _m013_feed_cursor),
+    (14, "client details copied into archived invoices", _m014_archived_client_copy),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_version(conn: Connection):
+    """Stored schema version, 0 for a pre-versioning database, None if empty."""
+    inspector = inspect(conn)
+    if inspector.has_table("schema_version"):
+        return conn.execute(text("SELECT version FROM schema_version")).scalar() or 0
+    if inspector.has_table("users"):
+        return 0
+    return None
+
+
+def _set_version(conn: Connection, version: int):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    if conn.execute(text("UPDATE schema_version SET version = :v"), {"v": version}).rowcount == 0:
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def upgrade(engine=None):
+    """
+    Bring the schema to LATEST_VERSION. Returns the list of (version, description,
+    seconds) applied; a fresh database is reported as a single "create schema" entry.
+    """
+    engine = engine or database.engine
+    applied = []
+
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            with engine.begin() as conn:
+                current = get_version(conn)
+                if current is None:
+                    started = time.perf_counter()
+                    database.Base.metadata.create_all(bind=conn)
+                    _set_version(conn, LATEST_VERSION)
+                    return [(LATEST_VERSION, "create schema", time.perf_counter() - started)]
+
+            for version, description, migrate in MIGRATIONS:
+                if version <= current:
+                    continue
+                started = time.perf_counter()
+                with engine.begin() as conn:
+                    migrate(conn)
+                    _set_version(conn, version)
+                applied.append((version, description, time.perf_counter() - started))
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+    return applied
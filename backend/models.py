@@ -1,7 +1,11 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text, ForeignKey, Date, Numeric, DateTime
+from sqlalchemy import Boolean, Column, Integer, BigInteger, String, Text, LargeBinary, ForeignKey, Date, Numeric, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
+from decimal import Decimal
+from typing import Optional
 import database
 import datetime
+from services import money
 
 class User(database.Base):
     __tablename__ = "users"
@@ -29,12 +33,29 @@ class VirtualAccount(database.Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     currency = Column(String(3), nullable=False)  # e.g., "USD", "EUR", "GBP"
     bank_name = Column(String, nullable=False)
-    account_number = Column(String, nullable=False)
+    account_number = Column(String, nullable=False, unique=True, index=True)
     routing_code = Column(String, nullable=False)  # ACH Routing, IBAN, Sort Code
     provider = Column(String, nullable=False)  # e.g., "Currencycloud", "Banking Circle"
 
     owner = relationship("User", back_populates="virtual_accounts")
 
+class VirtualAccountPool(database.Base):
+    """Pre-minted account numbers waiting to be assigned (see services/virtual_accounts.py)."""
+    __tablename__ = "virtual_account_pool"
+
+    id = Column(Integer, primary_key=True)
+    currency = Column(String(3), nullable=False)
+    provider = Column(String, nullable=False)
+    bank_name = Column(String, nullable=False)
+    account_number = Column(String, nullable=False, unique=True)
+    routing_code = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Claims take the oldest entry for a (currency, provider)
+        Index("ix_virtual_account_pool_currency_provider", "currency", "provider", "id"),
+    )
+
 class Client(database.Base):
     __tablename__ = "clients"
 
@@ -54,15 +75,45 @@ class Invoice(database.Base):
     status = Column(String, default="draft")
     due_date = Column(Date)
     currency = Column(String(3), default="USD") # e.g., "USD", "EUR", "GBP"
-    total_amount = Column(Numeric)
+    total_minor = Column(BigInteger, nullable=False, default=0)  # In minor units of `currency` (see services/money.py)
     client_id = Column(Integer, ForeignKey("clients.id"))
     owner_id = Column(Integer, ForeignKey("users.id"))
     payment_link_id = Column(String, unique=True, index=True, nullable=True)
+    # Total in paise: locked fx_rate once paid, bulk-refreshed snapshot rate while outstanding
+    amount_inr_minor = Column(BigInteger, nullable=True)
+    # Set on invoices generated from a recurring template: one invoice per template period
+    template_id = Column(Integer, ForeignKey("recurring_invoice_templates.id"), nullable=True)
+    period_start = Column(Date, nullable=True)
 
 
     owner = relationship("User", back_populates="invoices")
     client = relationship("Client", back_populates="invoices")
-    items = relationship("InvoiceItem", back_populates="invoice")
+    items = relationship("InvoiceItem", back_populates="invoice", order_by="InvoiceItem.id")
+
+    @property
+    def total_amount(self) -> Decimal:
+        return money.to_major(self.total_minor or 0, self.currency)
+
+    @property
+    def amount_inr(self) -> Optional[Decimal]:
+        return None if self.amount_inr_minor is None else money.to_major(self.amount_inr_minor, "INR")
+
+    __table_args__ = (
+        # Covers the KPI and client-revenue aggregates (index-only scans on Postgres)
+        Index("ix_invoices_owner_status_amount_inr_minor", "owner_id", "status", "amount_inr_minor"),
+        # Due-date range filters in /search
+        Index("ix_invoices_owner_due_date", "owner_id", "due_date"),
+        # Overdue detection: open statuses with a due date before the run date
+        Index("ix_invoices_status_due_date", "status", "due_date"),
+        # Makes recurring generation idempotent per period
+        UniqueConstraint("template_id", "period_start", name="uq_invoices_template_period"),
+    )
+
+@event.listens_for(Invoice.__table__, "after_create")
+def _create_search_indexes(target, connection, **kw):
+    # Trigram/prefix expression indexes on clients and invoices (created after clients)
+    from services import search
+    search.ensure_search_indexes(connection)
 
 class InvoiceItem(database.Base):
     __tablename__ = "invoice_items"
@@ -70,17 +121,23 @@ class InvoiceItem(database.Base):
     id = Column(Integer, primary_key=True, index=True)
     description = Column(String)
     quantity = Column(Integer)
-    unit_price = Column(Numeric)
+    unit_price_minor = Column(BigInteger, nullable=False, default=0)  # In minor units of the invoice currency
     invoice_id = Column(Integer, ForeignKey("invoices.id"))
 
     invoice = relationship("Invoice", back_populates="items")
 
+    @property
+    def unit_price(self) -> Decimal:
+        return money.to_major(self.unit_price_minor or 0, self.invoice.currency)
+
 class Transaction(database.Base):
     __tablename__ = "transactions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"))
-    processed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Range-partitioned by month on Postgres (see services/partitions.py), so the
+    # partition key has to be part of the primary key.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
+    processed_at = Column(DateTime, primary_key=True, default=datetime.datetime.utcnow)
     
     # Original payment info
     sender_name = Column(String, nullable=True)
@@ -95,8 +152,272 @@ class Transaction(database.Base):
     # Settlement fields
     amount = Column(Numeric(10, 2), nullable=False)  # Legacy: now stores net_payout_inr
     net_payout_inr = Column(Numeric(12, 2), nullable=True)  # Final settlement amount
+    amount_inr = Column(Numeric(16, 2), nullable=True)  # principal_amount * fx_rate (gross, before fees)
     status = Column(String, nullable=False)  # e.g., 'succeeded', 'failed'
     settlement_status = Column(String, default="PENDING")  # PENDING, PROCESSING, SETTLED
 
     invoice = relationship("Invoice")
 
+    __table_args__ = {"postgresql_partition_by": "RANGE (processed_at)"}
+
+@event.listens_for(Transaction.__table__, "after_create")
+def _create_transaction_partitions(target, connection, **kw):
+    from services import partitions
+    partitions.ensure_transaction_partitions(connection)
+
+
+class OutboxEvent(database.Base):
+    """Transactional outbox: written in the same transaction as the change it describes."""
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_type = Column(String, nullable=False)  # e.g., "invoice.paid", "settlement.updated"
+    aggregate_type = Column(String, nullable=False)  # e.g., "invoice", "transaction"
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    txid = Column(BigInteger, nullable=True)  # Postgres writing transaction id: the feed is read in (txid, id) order
+
+    __table_args__ = (
+        Index("ix_outbox_events_owner_id_id", "owner_id", "id"),
+        Index("ix_outbox_events_owner_id_txid_id", "owner_id", "txid", "id"),
+    )
+
+class EventConsumerCheckpoint(database.Base):
+    """Last change-feed cursor acknowledged by a named downstream consumer."""
+    __tablename__ = "event_consumer_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    consumer = Column(String, nullable=False)  # e.g., "erp-sync", "email-notifications"
+    cursor = Column(String, nullable=False, default="0-0")  # "<txid>-<id>", see services/outbox.py
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "consumer", name="uq_event_consumer_checkpoints_owner_consumer"),
+    )
+
+class RevenueDailyRollup(database.Base):
+    """Per-day payment totals per owner, currency and client, maintained by the payment webhook."""
+    __tablename__ = "revenue_daily_rollups"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    principal_amount = Column(Numeric(14, 2), nullable=False, default=0)  # in `currency`
+    net_payout_inr = Column(Numeric(16, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "day", "currency", "client_id", name="uq_revenue_daily_rollups_key"),
+    )
+
+class UnmatchedCredit(database.Base):
+    """Bank credit the webhook could not reconcile to an invoice; waits for manual review."""
+    __tablename__ = "unmatched_credits"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Unknown if the receiving account is unknown
+    account_number = Column(String, nullable=True)  # Receiving virtual account
+    sender_name = Column(String, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    currency = Column(String(3), nullable=False)
+    reference = Column(String, nullable=True)
+    suggestions = Column(JSON, nullable=True)  # Best-scoring candidate invoices, for the reviewer
+    status = Column(String, nullable=False, default="pending")  # pending, matched, dismissed
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)  # Set once matched
+    received_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    resolved_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_unmatched_credits_owner_status", "owner_id", "status"),
+    )
+
+class LedgerEntry(database.Base):
+    """
+    One leg of a double-entry journal, in INR. Append-only: debits are positive,
+    credits negative, and the legs of every journal sum to zero.
+    """
+    __tablename__ = "ledger_entries"
+
+    id = Column(BigInteger, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    journal_id = Column(String, nullable=False)  # e.g., "payment:42", "settlement:42"
+    account = Column(String, nullable=False)  # e.g., "revenue", "pending_settlement", "settled"
+    amount = Column(Numeric(16, 2), nullable=False)
+    transaction_id = Column(Integer, nullable=True)  # transactions.id (no FK: partitioned composite key)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # A journal posts each account once, so replaying a posting can't double count
+        UniqueConstraint("journal_id", "account", name="uq_ledger_entries_journal_account"),
+        Index("ix_ledger_entries_owner_id_id", "owner_id", "id"),
+    )
+
+@event.listens_for(LedgerEntry.__table__, "after_create")
+def _protect_ledger(target, connection, **kw):
+    from services import ledger
+    ledger.install_append_only_guard(connection)
+
+class AccountBalance(database.Base):
+    """Running balance of one ledger account per user, updated with every posting."""
+    __tablename__ = "account_balances"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    account = Column(String, nullable=False)
+    balance = Column(Numeric(16, 2), nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "account", name="uq_account_balances_owner_account"),
+    )
+
+class DunningEvent(database.Base):
+    """A dunning step taken for an invoice (e.g. marked overdue), recorded by the batch job."""
+    __tablename__ = "dunning_events"
+
+    id = Column(BigInteger, primary_key=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stage = Column(String, nullable=False)  # e.g., "overdue"
+    due_date = Column(Date, nullable=True)
+    days_overdue = Column(Integer, nullable=False, default=0)
+    amount_minor = Column(BigInteger, nullable=True)  # Invoice total, in minor units of `currency`
+    currency = Column(String(3), nullable=True)
+    run_id = Column(Integer, ForeignKey("batch_job_runs.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("invoice_id", "stage", name="uq_dunning_events_invoice_stage"),
+        Index("ix_dunning_events_owner_id_id", "owner_id", "id"),
+    )
+
+class BatchJobRun(database.Base):
+    """Progress of a batch job run; the checkpoint a crashed run resumes from."""
+    __tablename__ = "batch_job_runs"
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String, nullable=False)  # e.g., "overdue_detection"
+    as_of = Column(Date, nullable=False)  # Business date the run processes
+    status = Column(String, nullable=False, default="running")  # running, completed, failed
+    cursor = Column(JSON, nullable=True)  # Job-specific position of the last committed chunk
+    processed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_batch_job_runs_job_status", "job", "status"),
+    )
+
+class RecurringInvoiceTemplate(database.Base):
+    """An invoice that is generated again every period (e.g. a monthly retainer)."""
+    __tablename__ = "recurring_invoice_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    currency = Column(String(3), nullable=False, default="USD")
+    frequency = Column(String, nullable=False, default="monthly")  # weekly, monthly, quarterly, yearly
+    start_date = Column(Date, nullable=False)  # First period; also anchors the day of month
+    end_date = Column(Date, nullable=True)  # No periods start after this date
+    due_days = Column(Integer, nullable=False, default=15)  # Invoice due date = period start + due_days
+    next_run_date = Column(Date, nullable=True)  # Start of the next period to generate; NULL once finished
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    client = relationship("Client")
+    items = relationship("RecurringInvoiceTemplateItem", back_populates="template")
+
+    __table_args__ = (
+        # The scheduler's "due templates" scan
+        Index("ix_recurring_invoice_templates_active_next_run", "active", "next_run_date"),
+    )
+
+class RecurringInvoiceTemplateItem(database.Base):
+    __tablename__ = "recurring_invoice_template_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template_id = Column(Integer, ForeignKey("recurring_invoice_templates.id"), nullable=False, index=True)
+    description = Column(String)
+    quantity = Column(Integer)
+    unit_price_minor = Column(BigInteger, nullable=False, default=0)  # In minor units of the template currency
+
+    template = relationship("RecurringInvoiceTemplate", back_populates="items")
+
+    @property
+    def unit_price(self) -> Decimal:
+        return money.to_major(self.unit_price_minor or 0, self.template.currency)
+
+class ArchivedInvoice(database.Base):
+    """
+    A paid, settled invoice moved out of `invoices` by the archival job (see
+    services/archival.py), with its line items folded into one compressed blob.
+    """
+    __tablename__ = "archived_invoices"
+
+    id = Column(Integer, primary_key=True)  # The original invoices.id
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_id = Column(Integer, nullable=True)  # No FK: the client may be deleted later
+    client_name = Column(String, nullable=True)  # Copied at archive time, for when it is
+    client_email = Column(String, nullable=True)
+    client_address = Column(Text, nullable=True)
+    status = Column(String, nullable=False)
+    due_date = Column(Date)
+    currency = Column(String(3))
+    total_minor = Column(BigInteger, nullable=False, default=0)
+    payment_link_id = Column(String, unique=True, nullable=True)
+    amount_inr_minor = Column(BigInteger, nullable=True)
+    template_id = Column(Integer, nullable=True)
+    period_start = Column(Date, nullable=True)
+    items = Column(LargeBinary, nullable=False)  # zlib-compressed JSON: [[id, description, quantity, unit_price_minor], ...]
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_archived_invoices_owner_id_id", "owner_id", "id"),
+    )
+
+class ArchivedTransaction(database.Base):
+    """A transaction of an archived invoice, as it was in `transactions` plus the owner."""
+    __tablename__ = "archived_transactions"
+
+    id = Column(Integer, primary_key=True)  # The original transactions.id
+    invoice_id = Column(Integer, nullable=False, index=True)  # archived_invoices.id
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    processed_at = Column(DateTime, nullable=False)
+    sender_name = Column(String, nullable=True)
+    principal_amount = Column(Numeric(10, 2), nullable=True)
+    currency = Column(String(3), nullable=True)
+    fx_rate = Column(Numeric(10, 4), nullable=True)
+    flat_fee_usd = Column(Numeric(10, 2), nullable=True)
+    gst_on_fee_inr = Column(Numeric(10, 2), nullable=True)
+    amount = Column(Numeric(10, 2), nullable=False)
+    net_payout_inr = Column(Numeric(12, 2), nullable=True)
+    amount_inr = Column(Numeric(16, 2), nullable=True)
+    status = Column(String, nullable=False)
+    settlement_status = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Revenue charts over ranges that reach into the archive
+        Index("ix_archived_transactions_owner_processed_at", "owner_id", "processed_at"),
+    )
+
+class ArchivedRevenueTotal(database.Base):
+    """Count and INR total of the archived (paid) invoices per owner and client, for the KPIs."""
+    __tablename__ = "archived_revenue_totals"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    client_id = Column(Integer, nullable=False)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    amount_inr_minor = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "client_id", name="uq_archived_revenue_totals_owner_client"),
+    )
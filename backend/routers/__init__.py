@@ -1,2 +1,2 @@
-from . import auth, clients, invoices, mock_payments, public_invoices, analytics, documents, webhooks
+from . import auth, clients, invoices, mock_payments, public_invoices, analytics, documents, webhooks, streams, events, reconciliation, search, recurring_invoices, health
 
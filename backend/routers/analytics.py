@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 import database
 from . import auth
-from services import analytics
+from services import admission, analytics
 import models
+from datetime import date, datetime
+from typing import Literal, Optional
 
 router = APIRouter(
     prefix="/analytics",
@@ -19,13 +21,42 @@ def get_db():
         db.close()
 
 @router.get("/dashboard")
-def get_dashboard_data(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    kpis = analytics.get_kpis(db, current_user.id)
-    monthly_revenue = analytics.get_monthly_revenue(db, current_user.id)
-    client_revenue = analytics.get_client_revenue(db, current_user.id)
+def get_dashboard_data(db: Session = Depends(auth.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
+    admission.take(f"user:{current_user.id}", "dashboard")
+    with admission.heavy():
+        kpis = analytics.get_kpis(db, current_user.id)
+        monthly_revenue = analytics.get_monthly_revenue(db, current_user.id)
+        client_revenue = analytics.get_client_revenue(db, current_user.id)
     
     return {
         "kpis": kpis,
         "monthly_revenue": monthly_revenue,
         "client_revenue": client_revenue
     }
+
+@router.get("/timeseries")
+def get_timeseries(
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: Literal["none", "currency", "client"] = "none",
+    db: Session = Depends(auth.get_read_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Revenue time series for charting. `start` is inclusive and `end` exclusive
+    (defaults depend on granularity). Returns a `buckets` array plus one series
+    per group with parallel `count`, `net_payout_inr` and, for currency groups,
+    `principal_amount` arrays; empty buckets are zero-filled.
+    """
+    try:
+        return analytics.get_revenue_timeseries(
+            db,
+            current_user.id,
+            granularity=granularity,
+            start=datetime.combine(start, datetime.min.time()) if start else None,
+            end=datetime.combine(end, datetime.min.time()) if end else None,
+            group_by=group_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
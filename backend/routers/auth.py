@@ -8,6 +8,7 @@ import models
 import schemas
 import security
 import database
+from services import ledger, tracing, virtual_accounts
 
 router = APIRouter()
 
@@ -21,39 +22,45 @@ def get_db():
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with tracing.span("auth.get_current_user"):
+        try:
+            with tracing.span("auth.jwt_decode"):
+                payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+            token_data = schemas.TokenData(email=email)
+        except JWTError:
+            raise credentials_exception
+        user = crud.get_user_by_email(db, email=token_data.email)
+        if user is None:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    return user
+        return user
+
+# Read-only endpoints use the replica when it is safe to (see database.get_read_session)
+def get_read_db(current_user: models.User = Depends(get_current_user)):
+    db = database.get_read_session(current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
 
 @router.post("/auth/register", response_model=schemas.User)
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    new_user = crud.create_user(db=db, user=user)
-    
-    # Auto-provision a default USD Virtual Account for new users
-    crud.provision_default_virtual_account(db, new_user.id)
-    
-    return new_user
+    # Also provisions the default USD Virtual Account, from the pre-minted pool
+    return crud.create_user(db=db, user=user)
 
 @router.post("/auth/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = crud.get_user_by_email(db, email=form_data.username)
     if not user or not security.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -67,43 +74,66 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+@router.get("/users/me/balances", response_model=schemas.Balances)
+def get_my_balances(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Pending settlement, settled, fee and GST totals in INR, read from the ledger's running balances."""
+    return ledger.get_balances(db, current_user.id)
+
 @router.get("/users/me/virtual-accounts", response_model=List[schemas.VirtualAccount])
-async def get_my_virtual_accounts(
+def get_my_virtual_accounts(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all Virtual Accounts for the current user."""
     return crud.get_virtual_accounts_by_user(db, current_user.id)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class VACreateRequest(BaseModel):
     currency: str
 
+class VABatchCreateRequest(BaseModel):
+    currencies: List[str] = Field(..., min_length=1)
+
+def _check_new_currencies(db: Session, user_id: int, currencies: List[str]):
+    requested = [c.upper() for c in currencies]
+    unsupported = [c for c in requested if c not in virtual_accounts.VA_CONFIGS]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Currency {', '.join(unsupported)} not supported for Virtual Accounts.")
+    existing = {va.currency for va in crud.get_virtual_accounts_by_user(db, user_id)}
+    duplicates = sorted(existing.intersection(requested) | {c for c in requested if requested.count(c) > 1})
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Virtual Account for {', '.join(duplicates)} already exists.")
+
 
 @router.post("/users/me/virtual-accounts", response_model=schemas.VirtualAccount)
-async def request_new_virtual_account(
+def request_new_virtual_account(
     request: VACreateRequest,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Request a new Virtual Account for a specific currency."""
-    # Check if already exists
-    existing_vas = crud.get_virtual_accounts_by_user(db, current_user.id)
-    if any(va.currency == request.currency.upper() for va in existing_vas):
-        raise HTTPException(status_code=400, detail=f"Virtual Account for {request.currency.upper()} already exists.")
-    
-    new_va = crud.provision_virtual_account(db, current_user.id, request.currency)
-    if not new_va:
-        raise HTTPException(status_code=400, detail=f"Currency {request.currency} not supported for Virtual Accounts.")
-    
-    return new_va
+    _check_new_currencies(db, current_user.id, [request.currency])
+    return crud.provision_virtual_account(db, current_user.id, request.currency)
+
+@router.post("/users/me/virtual-accounts/batch", response_model=List[schemas.VirtualAccount])
+def request_new_virtual_accounts(
+    request: VABatchCreateRequest,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Request Virtual Accounts for several currencies at once (all or none)."""
+    _check_new_currencies(db, current_user.id, request.currencies)
+    return crud.provision_virtual_accounts(db, current_user.id, request.currencies)
 
 @router.put("/users/me/profile", response_model=schemas.User)
-async def update_user_profile(
+def update_user_profile(
     profile: schemas.UserProfileUpdate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
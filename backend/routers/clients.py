@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import crud
 import schemas
 import models
 import database
 from . import auth
+from services import list_responses
 
 router = APIRouter(
     prefix="/clients",
@@ -26,7 +27,14 @@ def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db), c
     return crud.create_client(db=db, client=client, user_id=current_user.id)
 
 @router.get("/", response_model=List[schemas.Client])
-def read_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+def read_clients(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """`fields` (e.g. "id,name") limits each client to those schema fields."""
+    if list_responses.ENABLED or fields:
+        try:
+            selected = list_responses.parse_fields(fields, list_responses.CLIENT_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return list_responses.FastJSONResponse(list_responses.client_page(db, current_user.id, skip, limit, selected))
     clients = crud.get_clients(db, user_id=current_user.id, skip=skip, limit=limit)
     return clients
 
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import database
 from . import auth
-from services import pdf_generator
+from services import admission, archival, pdf_generator
 import crud
 import models
 
@@ -20,22 +20,33 @@ def get_db():
     finally:
         db.close()
 
+def _pdf_response(buffer, filename: str) -> StreamingResponse:
+    # Sent straight from the rendered (spooled) file in chunks, without copying it
+    buffer.seek(0, 2)
+    size = buffer.tell()
+    buffer.seek(0)
+    return StreamingResponse(
+        pdf_generator.iter_file(buffer),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}", "Content-Length": str(size)}
+    )
+
 @router.get("/invoices/{invoice_id}/download")
-def download_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    invoice = crud.get_invoice(db, invoice_id=invoice_id, user_id=current_user.id)
+def download_invoice(invoice_id: int, db: Session = Depends(auth.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
+    invoice = crud.get_invoice_including_archived(db, invoice_id=invoice_id, user_id=current_user.id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
-    pdf_buffer = pdf_generator.generate_invoice_pdf(invoice)
-    return Response(
-        content=pdf_buffer.getvalue(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=invoice_{invoice.id}.pdf"}
-    )
+    # An archived invoice carries its items with it
+    items = None if archival.is_archived(invoice) else crud.iter_invoice_item_rows(db, invoice.id)
+    admission.take(f"user:{current_user.id}", "invoice_pdf")
+    with admission.heavy():
+        pdf_buffer = pdf_generator.generate_invoice_pdf(invoice, items)
+    return _pdf_response(pdf_buffer, f"invoice_{invoice.id}.pdf")
 
 @router.get("/invoices/{invoice_id}/fira")
-def download_fira(invoice_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    invoice = crud.get_invoice(db, invoice_id=invoice_id, user_id=current_user.id)
+def download_fira(invoice_id: int, db: Session = Depends(auth.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
+    invoice = crud.get_invoice_including_archived(db, invoice_id=invoice_id, user_id=current_user.id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
@@ -43,14 +54,10 @@ def download_fira(invoice_id: int, db: Session = Depends(get_db), current_user:
         raise HTTPException(status_code=400, detail="FIRA is only available for paid invoices")
     
     # Fetch transaction details for FX breakdown
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.invoice_id == invoice.id
-    ).first()
+    transaction = crud.get_invoice_transaction(db, invoice.id)
     
-    pdf_buffer = pdf_generator.generate_fira_pdf(invoice, transaction)
-    return Response(
-        content=pdf_buffer.getvalue(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=fira_{invoice.id}.pdf"}
-    )
+    admission.take(f"user:{current_user.id}", "fira_pdf")
+    with admission.heavy():
+        pdf_buffer = pdf_generator.generate_fira_pdf(invoice, transaction)
+    return _pdf_response(pdf_buffer, f"fira_{invoice.id}.pdf")
 
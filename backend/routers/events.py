@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import database
+import models
+import schemas
+from . import auth
+from services import outbox
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+    dependencies=[Depends(auth.get_current_user)],
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.get("/", response_model=schemas.EventFeed)
+def read_events(
+    after: Optional[str] = None,
+    consumer: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=outbox.MAX_BATCH_SIZE),
+    event_type: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Cursor-based change feed of payment and settlement events.
+    Pass `after` explicitly, or `consumer` to resume from its saved checkpoint.
+    """
+    if after is None:
+        checkpoint = outbox.get_checkpoint(db, current_user.id, consumer) if consumer else None
+        after = checkpoint.cursor if checkpoint else outbox.START_CURSOR
+
+    try:
+        events, next_cursor, has_more = outbox.read_feed(
+            db, current_user.id, after=after, limit=limit, event_types=event_type
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"events": events, "next_cursor": next_cursor, "has_more": has_more}
+
+@router.get("/checkpoints/{consumer}", response_model=schemas.EventCheckpoint)
+def read_checkpoint(consumer: str, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    checkpoint = outbox.get_checkpoint(db, current_user.id, consumer)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    return checkpoint
+
+@router.put("/checkpoints/{consumer}", response_model=schemas.EventCheckpoint)
+def update_checkpoint(
+    consumer: str,
+    checkpoint: schemas.EventCheckpointUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Acknowledge everything up to and including `cursor` for this consumer."""
+    try:
+        outbox.parse_cursor(db, current_user.id, checkpoint.cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return outbox.save_checkpoint(db, current_user.id, consumer, checkpoint.cursor)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services import health
+
+router = APIRouter(
+    tags=["health"],
+)
+
+@router.get("/healthz")
+def healthz():
+    """Liveness: the worker is up. Never touches the database."""
+    return health.liveness()
+
+@router.get("/readyz")
+def readyz():
+    """Readiness: 200 once every required check passes, 503 until then, with per-check latency."""
+    report = health.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
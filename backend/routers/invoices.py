@@ -6,6 +6,7 @@ import schemas
 import models
 import database
 from . import auth
+from services import list_responses
 
 router = APIRouter(
     prefix="/invoices",
@@ -31,29 +32,33 @@ def create_invoice(invoice: schemas.InvoiceCreate, db: Session = Depends(get_db)
     return crud.create_invoice(db=db, invoice=invoice, user_id=current_user.id)
 
 @router.get("/", response_model=List[schemas.Invoice])
-def read_invoices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+def read_invoices(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(auth.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
+    """`fields` (e.g. "id,status,total_amount") limits each invoice to those schema fields."""
+    if list_responses.ENABLED or fields:
+        # Same JSON as the response_model path, built from column-only queries
+        try:
+            selected = list_responses.parse_fields(fields, list_responses.INVOICE_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return list_responses.FastJSONResponse(list_responses.invoice_page(db, current_user.id, skip, limit, selected))
     invoices = crud.get_invoices(db, user_id=current_user.id, skip=skip, limit=limit)
     return invoices
 
 @router.get("/{invoice_id}", response_model=schemas.Invoice)
 def read_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_invoice = crud.get_invoice(db, invoice_id=invoice_id, user_id=current_user.id)
+    db_invoice = crud.get_invoice_including_archived(db, invoice_id=invoice_id, user_id=current_user.id)
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return db_invoice
 
 @router.get("/{invoice_id}/transaction", response_model=Optional[schemas.TransactionDetail])
-def get_invoice_transaction(invoice_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_invoice_transaction(invoice_id: int, db: Session = Depends(auth.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
     """Get the transaction details (FX breakdown) for an invoice."""
     # Verify invoice belongs to user
-    db_invoice = crud.get_invoice(db, invoice_id=invoice_id, user_id=current_user.id)
+    db_invoice = crud.get_invoice_including_archived(db, invoice_id=invoice_id, user_id=current_user.id)
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
     # Get transaction for this invoice
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.invoice_id == invoice_id
-    ).first()
-    
-    return transaction
+    return crud.get_invoice_transaction(db, invoice_id)
 
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, contains_eager
 from pydantic import BaseModel
 from typing import Optional
 import crud
@@ -7,6 +7,7 @@ import models
 import database
 from . import auth
 from .webhooks import handle_payment_received, PaymentReceivedPayload
+from services import admission, ledger, outbox
 
 router = APIRouter(
     prefix="/mock/payments",
@@ -31,14 +32,17 @@ def onboard_user(db: Session = Depends(get_db), current_user: models.User = Depe
     return {"message": "User successfully onboarded to mock payments", "user": user}
 
 @router.post("/trigger-payment")
-def trigger_payment(payment: PaymentTrigger, db: Session = Depends(get_db)):
+def trigger_payment(payment: PaymentTrigger, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Triggers a mock payment by simulating a bank webhook.
     This endpoint now uses the V1 FX Engine for realistic payment processing.
     """
-    invoice = crud.get_invoice_by_link_id(db, payment_link_id=payment.payment_link_id)
+    admission.take(admission.client_key(request), "trigger_payment")
+    # Locked from the first read, so a concurrent trigger can't act on a stale status
+    invoice = crud.get_invoice_by_link_id(db, payment_link_id=payment.payment_link_id, for_update=True)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    admission.take(f"link:{payment.payment_link_id}", "trigger_payment")
     
     if payment.status == "success":
         # Construct webhook payload as if from a bank
@@ -51,9 +55,18 @@ def trigger_payment(payment: PaymentTrigger, db: Session = Depends(get_db)):
 
         
         # Delegate to webhook handler (V1 FX flow)
-        return handle_payment_received(webhook_payload, db)
+        return handle_payment_received(webhook_payload, response, db)
     else:
         invoice.status = "failed"
+        outbox.record(
+            db,
+            "invoice.status_changed",
+            owner_id=invoice.owner_id,
+            aggregate_type="invoice",
+            aggregate_id=invoice.id,
+            payment_link_id=invoice.payment_link_id,
+            data={"invoice_id": invoice.id, "status": invoice.status},
+        )
         db.commit()
         return {"message": "Payment failed"}
 
@@ -63,7 +76,9 @@ def process_settlements(db: Session = Depends(get_db), current_user: models.User
     Simulates the 'Local-Out' settlement layer.
     Moves all PROCESSING transactions for the user to SETTLED.
     """
-    transactions = db.query(models.Transaction).join(models.Invoice).filter(
+    transactions = db.query(models.Transaction).join(models.Invoice).options(
+        contains_eager(models.Transaction.invoice)
+    ).filter(
         models.Invoice.owner_id == current_user.id,
         models.Transaction.settlement_status == "PROCESSING"
     ).all()
@@ -71,8 +86,18 @@ def process_settlements(db: Session = Depends(get_db), current_user: models.User
     count = 0
     for tx in transactions:
         tx.settlement_status = "SETTLED"
+        outbox.record(
+            db,
+            "settlement.updated",
+            owner_id=current_user.id,
+            aggregate_type="transaction",
+            aggregate_id=tx.id,
+            payment_link_id=tx.invoice.payment_link_id,
+            data={"invoice_id": tx.invoice_id, "transaction_id": tx.id, "settlement_status": tx.settlement_status},
+        )
         count += 1
-    
+
+    ledger.record_settlements(db, current_user.id, transactions)
     db.commit()
     return {"message": f"Successfully settled {count} transactions via NEFT/IMPS mock service."}
 
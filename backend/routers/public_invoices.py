@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 import crud
 import schemas
 import database
+from services import admission
 
 router = APIRouter(
     prefix="/invoices/public",
@@ -17,8 +18,10 @@ def get_db():
         db.close()
 
 @router.get("/{payment_link_id}", response_model=schemas.Invoice)
-def get_public_invoice(payment_link_id: str, db: Session = Depends(get_db)):
-    invoice = crud.get_invoice_by_link_id(db, payment_link_id=payment_link_id)
+def get_public_invoice(payment_link_id: str, request: Request, db: Session = Depends(get_db)):
+    admission.take(admission.client_key(request), "public_invoice")
+    invoice = crud.get_invoice_by_link_id_including_archived(db, payment_link_id=payment_link_id)
     if invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    admission.take(f"link:{payment_link_id}", "public_invoice")
     return invoice
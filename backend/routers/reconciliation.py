@@ -0,0 +1,102 @@
+# backend/routers/reconciliation.py
+"""
+Reconciliation Review Queue
+
+Bank credits the webhook could not match to an invoice (see
+services/reconciliation.py) wait here until the user assigns them to an
+invoice or dismisses them. Credits to an account nobody held yet are
+queued without an owner and show up here once the account is assigned, or
+when an operator assigns them (scripts/unmatched_credits.py).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import database
+import models
+import schemas
+from . import auth
+from .webhooks import apply_payment
+from services import reconciliation
+
+router = APIRouter(
+    prefix="/reconciliation",
+    tags=["reconciliation"],
+    dependencies=[Depends(auth.get_current_user)],
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _get_pending_credit(db: Session, credit_id: int, user_id: int) -> models.UnmatchedCredit:
+    credit = (
+        db.query(models.UnmatchedCredit)
+        .filter(models.UnmatchedCredit.id == credit_id, models.UnmatchedCredit.owner_id == user_id)
+        .with_for_update()
+        .first()
+    )
+    if credit is None:
+        raise HTTPException(status_code=404, detail="Unmatched credit not found")
+    if credit.status != "pending":
+        raise HTTPException(status_code=409, detail=f"Credit already {credit.status}")
+    return credit
+
+@router.get("/unmatched", response_model=List[schemas.UnmatchedCredit])
+def read_unmatched_credits(
+    status: Optional[str] = "pending",
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Credits waiting for review (pass status=matched/dismissed for history), newest first."""
+    query = db.query(models.UnmatchedCredit).filter(models.UnmatchedCredit.owner_id == current_user.id)
+    if status:
+        query = query.filter(models.UnmatchedCredit.status == status)
+    return query.order_by(models.UnmatchedCredit.id.desc()).offset(skip).limit(limit).all()
+
+@router.post("/unmatched/{credit_id}/match")
+def match_unmatched_credit(
+    credit_id: int,
+    body: schemas.UnmatchedCreditMatch,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Apply a queued credit to one of the user's unpaid invoices."""
+    credit = _get_pending_credit(db, credit_id, current_user.id)
+    invoice = (
+        db.query(models.Invoice)
+        .filter(models.Invoice.id == body.invoice_id, models.Invoice.owner_id == current_user.id)
+        .with_for_update()
+        .first()
+    )
+    if invoice is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    if invoice.status == "paid":
+        raise HTTPException(status_code=409, detail="Invoice already paid")
+    if credit.currency != invoice.currency:
+        # The payout and ledger would be computed at the wrong currency's rate
+        raise HTTPException(
+            status_code=409,
+            detail=f"Credit is in {credit.currency} but the invoice is in {invoice.currency}",
+        )
+
+    reconciliation.resolve(credit, "matched", invoice.id)
+    return apply_payment(db, invoice, credit.sender_name, credit.amount, credit.currency, matched_by="manual_review")
+
+@router.post("/unmatched/{credit_id}/dismiss", response_model=schemas.UnmatchedCredit)
+def dismiss_unmatched_credit(
+    credit_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Mark a queued credit as handled outside the app (e.g. refunded to the sender)."""
+    credit = _get_pending_credit(db, credit_id, current_user.id)
+    reconciliation.resolve(credit, "dismissed")
+    db.commit()
+    db.refresh(credit)
+    return credit
@@ -0,0 +1,78 @@
+# backend/routers/recurring_invoices.py
+"""
+Recurring Invoice Templates
+
+A template is generated into one invoice per period by the recurring
+invoices job (services/recurring_invoices.py). Deleting a template stops
+future invoices; invoices already generated are kept.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+import crud
+import database
+import models
+import schemas
+from . import auth
+
+router = APIRouter(
+    prefix="/recurring-invoices",
+    tags=["recurring-invoices"],
+    dependencies=[Depends(auth.get_current_user)],
+    responses={404: {"description": "Not found"}},
+)
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.post("/", response_model=schemas.RecurringInvoiceTemplate)
+def create_recurring_template(
+    template: schemas.RecurringInvoiceTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    if crud.get_client(db, client_id=template.client_id, user_id=current_user.id) is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    if template.end_date is not None and template.end_date < template.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return crud.create_recurring_template(db=db, template=template, user_id=current_user.id)
+
+@router.get("/", response_model=List[schemas.RecurringInvoiceTemplate])
+def read_recurring_templates(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    return crud.get_recurring_templates(db, user_id=current_user.id, skip=skip, limit=limit)
+
+@router.get("/{template_id}", response_model=schemas.RecurringInvoiceTemplate)
+def read_recurring_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    db_template = crud.get_recurring_template(db, template_id=template_id, user_id=current_user.id)
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="Recurring invoice template not found")
+    return db_template
+
+@router.delete("/{template_id}", response_model=schemas.RecurringInvoiceTemplate)
+def deactivate_recurring_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Stop generating invoices from the template."""
+    db_template = crud.get_recurring_template(db, template_id=template_id, user_id=current_user.id)
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="Recurring invoice template not found")
+    db_template.active = False
+    db.commit()
+    db.refresh(db_template)
+    return db_template
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import date
+from decimal import Decimal
+from typing import Literal, Optional
+import models
+import schemas
+from . import auth
+from services import search
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    dependencies=[Depends(auth.get_current_user)],
+)
+
+@router.get("/", response_model=schemas.SearchResults)
+def search_records(
+    q: Optional[str] = Query(None, max_length=200),
+    type: Literal["all", "clients", "invoices"] = "all",
+    mode: Literal["substring", "prefix"] = "substring",
+    status: Optional[str] = None,
+    currency: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    limit: int = Query(20, ge=1, le=search.MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(auth.get_read_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Ranked search over clients (name, email) and invoices (id, payment link
+    reference). Status, currency, due-date and amount filters restrict the
+    results to invoices and may be used without `q`.
+    """
+    try:
+        return search.search(
+            db,
+            current_user.id,
+            q=q,
+            type=type,
+            mode=mode,
+            status=status,
+            currency=currency,
+            due_from=due_from,
+            due_to=due_to,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
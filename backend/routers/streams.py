@@ -0,0 +1,104 @@
+# backend/routers/streams.py
+"""
+Server-Sent Events streams
+
+Pushes invoice status changes and settlement transitions to the dashboard and
+the public payment page, replacing client-side polling.
+
+  GET /streams/invoices                         all events for the current user
+  GET /streams/payment-links/{payment_link_id}  events for one payment link
+
+Browsers' EventSource cannot set an Authorization header, so the owner stream
+also accepts the JWT as an `access_token` query parameter.
+"""
+
+import asyncio
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+import crud
+import database
+from . import auth
+from services import event_bus
+
+router = APIRouter(prefix="/streams", tags=["streams"])
+
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+RETRY_MS = 3000
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
+
+
+def get_stream_user_id(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = None,
+):
+    # Use a short-lived session so the stream doesn't pin a pooled connection.
+    db = database.SessionLocal()
+    try:
+        user = auth.get_current_user(token or access_token or "", db)
+        return user.id
+    finally:
+        db.close()
+
+
+def get_payment_link_snapshot(payment_link_id: str) -> dict:
+    # A sync dependency, so the lookup runs in the threadpool rather than on the event loop
+    db = database.SessionLocal()
+    try:
+        invoice = crud.get_invoice_by_link_id(db, payment_link_id=payment_link_id)
+        if invoice is None:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        return {"type": "snapshot", "data": {"invoice_id": invoice.id, "status": invoice.status}}
+    finally:
+        db.close()
+
+
+def _format_sse(evt: dict) -> str:
+    payload = {"type": evt["type"], **evt.get("data", {})}
+    return f"event: {evt['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def _event_stream(request: Request, topics, initial: dict):
+    sub = event_bus.subscribe(topics)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        yield _format_sse(initial)
+        while True:
+            try:
+                evt = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": heartbeat\n\n"
+                continue
+            yield _format_sse(evt)
+    finally:
+        event_bus.unsubscribe(sub)
+
+
+def _sse_response(generator):
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/invoices")
+async def stream_my_invoices(request: Request, user_id: int = Depends(get_stream_user_id)):
+    """Stream status changes for all invoices owned by the current user."""
+    initial = {"type": "ready", "data": {"owner_id": user_id}}
+    return _sse_response(_event_stream(request, [f"owner:{user_id}"], initial))
+
+
+@router.get("/payment-links/{payment_link_id}")
+async def stream_payment_link(
+    payment_link_id: str, request: Request, initial: dict = Depends(get_payment_link_snapshot),
+):
+    """Stream status changes for a single public payment link."""
+    return _sse_response(_event_stream(request, [f"link:{payment_link_id}"], initial))
@@ -6,13 +6,14 @@ This router simulates receiving webhooks from Banking-as-a-Service providers
 (e.g., Currencycloud, Banking Circle) when funds arrive in a Virtual Account.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from decimal import Decimal
+from typing import Optional
 import database
 import models
-from services import fx_engine
+from services import fx_engine, ledger, outbox, reconciliation, rollups
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
@@ -30,51 +31,92 @@ class PaymentReceivedPayload(BaseModel):
     sender_name: str          # Name of the payer (for reconciliation)
     amount: Decimal           # Amount received in foreign currency
     currency: str             # e.g., "USD", "EUR"
-    reference: str            # Payment Link ID or Invoice reference
+    reference: str            # Payment Link ID or Invoice reference (may be mangled)
+    account_number: Optional[str] = None  # Receiving Virtual Account (for auto-reconciliation)
 
 
 @router.post("/payment-received", status_code=status.HTTP_200_OK)
 def handle_payment_received(
     payload: PaymentReceivedPayload,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
 ):
     """
     Webhook endpoint called when funds hit a Virtual Account.
     
     Flow:
     1. Find the Invoice by payment_link_id (reference)
-    2. Call FX Engine to lock rate and calculate payout
-    3. Create Transaction record with full FX breakdown
-    4. Update Invoice status to 'paid'
+    1b. Otherwise auto-reconcile by amount, currency, sender and receiving account;
+        credits that can't be matched confidently go to the review queue (202),
+        as do credits to an unknown or missing account (with no owner)
+    2-6. Apply the payment (see apply_payment)
     """
-    # 1. Reconciliation: Find the Invoice by payment link reference
+    # 1. Reconciliation: Find the Invoice by payment link reference. The row lock
+    # makes concurrent deliveries of the same credit (provider retries) wait here,
+    # so only the first one pays and the others see it paid. populate_existing
+    # reloads an invoice this session already holds, which FOR UPDATE alone doesn't.
     invoice = db.query(models.Invoice).filter(
         models.Invoice.payment_link_id == payload.reference
-    ).first()
+    ).with_for_update().populate_existing().first()
+    matched_by = "reference"
 
     if not invoice:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Invoice not found for reference: {payload.reference}"
-        )
+        owner_id = reconciliation.find_owner(db, payload.account_number)
+        candidates = []
+        if owner_id is not None:
+            invoice, candidates = reconciliation.match_credit(
+                db, owner_id, payload.sender_name, payload.amount, payload.currency, payload.reference
+            )
+        if not invoice:
+            # Never drop money: even a credit nobody can be identified for is kept for review
+            credit = reconciliation.queue_for_review(
+                db, owner_id, payload.account_number, payload.sender_name,
+                payload.amount, payload.currency, payload.reference, candidates,
+            )
+            if owner_id is not None:  # the change feed is per owner
+                suggested = [c.invoice_id for c in candidates[:reconciliation.MAX_SUGGESTIONS]]
+                outbox.record(db, *reconciliation.unmatched_event(credit, suggested))
+            db.commit()
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {
+                "message": "No confident match. Credit queued for review.",
+                "unmatched_credit_id": credit.id,
+            }
+        matched_by = "auto_reconciliation"
+        db.refresh(invoice, with_for_update=True)
 
     if invoice.status == "paid":
         return {"message": "Invoice already paid. Ignoring duplicate webhook."}
 
+    return apply_payment(db, invoice, payload.sender_name, payload.amount, payload.currency, matched_by)
+
+
+def apply_payment(db: Session, invoice: models.Invoice, sender_name: str, amount: Decimal,
+                  currency: str, matched_by: str = "reference"):
+    """
+    Settle an invoice with a received credit and commit.
+
+    2. Call FX Engine to lock rate and calculate payout
+    3. Create Transaction record with full FX breakdown
+    4. Update Invoice status to 'paid'
+    5. Add the payment to the daily revenue rollup and post it to the ledger
+    6. Append an outbox event (change feed + SSE)
+    """
     # 2. Treasury Lock: Calculate FX and Payout
-    payout = fx_engine.calculate_payout(payload.amount, payload.currency)
+    payout = fx_engine.calculate_payout(amount, currency)
 
     # 3. Create Transaction with full audit trail
     transaction = models.Transaction(
         invoice_id=invoice.id,
-        sender_name=payload.sender_name,
+        sender_name=sender_name,
         principal_amount=payout["principal_amount"],
-        currency=payload.currency,
+        currency=currency,
         amount=payout["net_payout_inr"],
         fx_rate=payout["fx_rate"],
         flat_fee_usd=payout["flat_fee_usd"],
         gst_on_fee_inr=payout["gst_on_fee_inr"],
         net_payout_inr=payout["net_payout_inr"],
+        amount_inr=fx_engine.to_inr(payout["principal_amount"], payout["fx_rate"]),
         status="succeeded",
         settlement_status="PROCESSING", # Funds detected, now processing for local payout
     )
@@ -83,10 +125,44 @@ def handle_payment_received(
 
     # 4. Update Invoice status
     invoice.status = "paid"
+    invoice.amount_inr_minor = fx_engine.to_inr_minor(invoice.total_minor, invoice.currency, payout["fx_rate"])
+    db.flush()
+
+    # 5. Daily revenue rollup (same transaction, so it can never drift on its own)
+    rollups.record_payment(
+        db,
+        owner_id=invoice.owner_id,
+        client_id=invoice.client_id,
+        currency=transaction.currency,
+        processed_at=transaction.processed_at,
+        principal_amount=transaction.principal_amount,
+        net_payout_inr=transaction.net_payout_inr,
+    )
+    ledger.record_payment(db, invoice.owner_id, transaction)
+
+    # 6. Outbox event for the change feed and SSE subscribers (same transaction)
+    outbox.record(
+        db,
+        "invoice.paid",
+        owner_id=invoice.owner_id,
+        aggregate_type="invoice",
+        aggregate_id=invoice.id,
+        payment_link_id=invoice.payment_link_id,
+        data={
+            "invoice_id": invoice.id,
+            "status": invoice.status,
+            "transaction_id": transaction.id,
+            "currency": transaction.currency,
+            "principal_amount": str(transaction.principal_amount),
+            "net_payout_inr": str(transaction.net_payout_inr),
+            "settlement_status": transaction.settlement_status,
+            "matched_by": matched_by,
+        },
+    )
 
-    
     db.commit()
     db.refresh(transaction)
+    reconciliation.open_invoices.discard(invoice.owner_id, invoice.id)
 
     return {
         "message": "Payment processed successfully.",
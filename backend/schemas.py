@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Any, Dict, Literal
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -77,6 +77,7 @@ class InvoiceItemCreate(InvoiceItemBase):
 class InvoiceItem(InvoiceItemBase):
     id: int
     invoice_id: int
+    unit_price_minor: int  # exact, in minor units of the invoice currency
 
     class Config:
         from_attributes = True
@@ -134,6 +135,7 @@ class Invoice(InvoiceBase):
     id: int
     status: str
     total_amount: float
+    total_minor: int  # exact, in minor units of `currency`
     owner_id: int
     payment_link_id: Optional[str] = None
     items: List[InvoiceItem] = []
@@ -142,3 +144,111 @@ class Invoice(InvoiceBase):
     class Config:
         from_attributes = True
 
+
+# --- Change Feed Schemas ---
+class OutboxEvent(BaseModel):
+    id: int
+    event_type: str
+    aggregate_type: str
+    aggregate_id: int
+    payload: Dict[str, Any]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class EventFeed(BaseModel):
+    events: List[OutboxEvent]
+    next_cursor: str
+    has_more: bool
+
+class EventCheckpointUpdate(BaseModel):
+    cursor: str
+
+class EventCheckpoint(BaseModel):
+    consumer: str
+    cursor: str
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# --- Reconciliation Schemas ---
+class UnmatchedCredit(BaseModel):
+    id: int
+    account_number: Optional[str] = None
+    sender_name: str
+    amount: Decimal
+    currency: str
+    reference: Optional[str] = None
+    suggestions: Optional[List[Dict[str, Any]]] = None
+    status: str
+    invoice_id: Optional[int] = None
+    received_at: datetime
+    resolved_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class UnmatchedCreditMatch(BaseModel):
+    invoice_id: int
+
+
+# --- Search Schemas ---
+class SearchResult(BaseModel):
+    type: str  # "client" or "invoice"
+    id: int
+    title: Optional[str] = None  # Client name
+    subtitle: Optional[str] = None  # Client email / invoice payment link reference
+    status: Optional[str] = None
+    currency: Optional[str] = None
+    amount: Optional[Decimal] = None
+    due_date: Optional[date] = None
+    rank: int
+
+class SearchResults(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    results: List[SearchResult]
+
+
+# --- Ledger Schemas ---
+class Balances(BaseModel):
+    currency: str
+    balances: Dict[str, Decimal]  # revenue, pending_settlement, settled, fees, gst
+    updated_at: Optional[datetime] = None
+
+
+# --- Recurring Invoice Schemas ---
+class RecurringInvoiceTemplateCreate(BaseModel):
+    client_id: int
+    currency: str = "USD"
+    frequency: Literal["weekly", "monthly", "quarterly", "yearly"] = "monthly"
+    start_date: date
+    end_date: Optional[date] = None
+    due_days: int = Field(15, ge=0, le=365)
+    items: List[InvoiceItemCreate] = Field(..., min_length=1)
+
+class RecurringInvoiceTemplateItem(InvoiceItemBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class RecurringInvoiceTemplate(BaseModel):
+    id: int
+    client_id: int
+    currency: str
+    frequency: str
+    start_date: date
+    end_date: Optional[date] = None
+    due_days: int
+    next_run_date: Optional[date] = None
+    active: bool
+    items: List[RecurringInvoiceTemplateItem] = []
+    client: Client
+
+    class Config:
+        from_attributes = True
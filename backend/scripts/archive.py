@@ -0,0 +1,48 @@
+# backend/scripts/archive.py
+"""
+Cold-storage archival job.
+
+Usage (from backend/):
+    python -m scripts.archive [--as-of YYYY-MM-DD] [--after-days 365] [--chunk-size 500] [--no-resume] [--json]
+
+Moves paid invoices whose payments all settled more than --after-days before
+the as-of date (default: today, UTC) into the archive tables, with their
+items and transactions. Progress is checkpointed per chunk; an interrupted run
+is resumed (with its original as-of date) unless --no-resume is given. Exits
+with status 2 if another process is already running the job.
+"""
+
+import argparse
+import datetime
+import json
+import sys
+
+from services import archival
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="business date (default: today, UTC)")
+    parser.add_argument("--after-days", type=int, default=archival.ARCHIVE_AFTER_DAYS,
+                        help="archive invoices settled more than this many days before the as-of date")
+    parser.add_argument("--chunk-size", type=int, default=archival.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-resume", action="store_true", help="abandon an interrupted run and start over")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = archival.run(as_of=args.as_of, chunk_size=args.chunk_size, after_days=args.after_days,
+                           resume=not args.no_resume)
+    if summary is None:
+        print("Archival is already running elsewhere.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        resumed = f" (resumed after {summary['resumed_from']})" if summary["resumed_from"] else ""
+        print(f"Run {summary['run_id']} as of {summary['as_of']}: archived {summary['processed']} invoices "
+              f"settled before {summary['horizon']} in {summary['chunks']} chunks{resumed}, {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# backend/scripts/bench_list_responses.py
+"""
+List serialization benchmark.
+
+Times building the GET /invoices/ response body for pages of 100 and 1000
+invoices, in-process against DATABASE_URL, both ways:
+
+  model  ORM rows (items lazy-loaded) validated through schemas.Invoice and
+         encoded like FastAPI's JSONResponse (the FAST_LIST_RESPONSES=0 path)
+  fast   services.list_responses: column-only queries, dicts, orjson
+
+and checks that both produce the same JSON. Uses the user with the most
+invoices unless --user-id is given (scripts.generate_data makes some).
+
+Usage (from backend/):
+    python -m scripts.bench_list_responses --runs 20
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+
+import crud
+import database
+import models
+import schemas
+from services import list_responses
+
+PAGE_SIZES = (100, 1000)
+
+_invoice_list = TypeAdapter(List[schemas.Invoice])
+
+
+def model_body(db, user_id: int, limit: int) -> bytes:
+    invoices = crud.get_invoices(db, user_id=user_id, limit=limit)
+    validated = _invoice_list.validate_python(invoices, from_attributes=True)
+    return JSONResponse(_invoice_list.dump_python(validated, mode="json")).body
+
+
+def fast_body(db, user_id: int, limit: int) -> bytes:
+    return list_responses.FastJSONResponse(list_responses.invoice_page(db, user_id, 0, limit)).body
+
+
+def time_path(build, user_id: int, limit: int, runs: int):
+    samples = []
+    for _ in range(runs):
+        db = database.SessionLocal()  # fresh identity map, as in a request
+        try:
+            started = time.perf_counter()
+            body = build(db, user_id, limit)
+            samples.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    ms = sorted(s * 1000 for s in samples)
+    return body, {"median_ms": round(statistics.median(ms), 2), "min_ms": round(ms[0], 2), "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args()
+
+    user_id = args.user_id
+    if user_id is None:
+        with database.engine.connect() as conn:
+            user_id = conn.execute(
+                select(models.Invoice.owner_id).group_by(models.Invoice.owner_id)
+                .order_by(func.count().desc()).limit(1)
+            ).scalar()
+    if user_id is None:
+        sys.exit("No invoices; generate some with scripts.generate_data.")
+
+    report = {"user_id": user_id, "encoder": "orjson" if list_responses.orjson else "json", "pages": {}}
+    for limit in PAGE_SIZES:
+        model, model_stats = time_path(model_body, user_id, limit, args.runs)
+        fast, fast_stats = time_path(fast_body, user_id, limit, args.runs)
+        if json.loads(model) != json.loads(fast):
+            sys.exit(f"Responses differ for a page of {limit}")
+        report["pages"][limit] = {
+            "invoices": len(json.loads(fast)),
+            "model": model_stats,
+            "fast": fast_stats,
+            "speedup": round(model_stats["median_ms"] / fast_stats["median_ms"], 1),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
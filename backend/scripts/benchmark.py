@@ -0,0 +1,437 @@
+# backend/scripts/benchmark.py
+"""
+End-to-end API benchmark.
+
+Seeds a database with synthetic tenants, starts the API under uvicorn and
+drives its hot paths over keep-alive HTTP connections, reporting throughput
+and latency percentiles per scenario:
+
+  login        POST /auth/token (bcrypt verify + JWT)
+  invoices     GET  /invoices/
+  dashboard    GET  /analytics/dashboard
+  webhook      POST /webhooks/payment-received (each request pays a distinct draft invoice)
+  pdf          GET  /documents/invoices/{id}/download
+  settlements  POST /mock/payments/process-settlements (one per tenant, settling its backlog)
+
+Results are written as JSON; pass --baseline to compare against an earlier
+run and exit non-zero when a scenario regressed by more than --threshold.
+Runs against DATABASE_URL, or against a throwaway local Postgres with
+--embedded (requires `pip install pgserver`). Use --reset, or a dedicated
+database, for numbers that are comparable between runs.
+
+Usage (from backend/):
+    python -m scripts.benchmark run --embedded --output bench.json
+    python -m scripts.benchmark run --reset --workers 4 --baseline bench.json
+    python -m scripts.benchmark compare bench.json new.json
+"""
+
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ("login", "invoices", "dashboard", "webhook", "pdf", "settlements")
+READ_ONLY = ("invoices", "dashboard", "pdf")
+PASSWORD = "benchmark-password"
+CURRENCIES = ("USD", "EUR", "GBP")
+PAID_SHARE = 0.6
+PROCESSING_SHARE = 0.3  # of paid invoices, still awaiting settlement
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_embedded_postgres(data_dir: str = None) -> str:
+    """Start a local Postgres via pgserver and return a psycopg2 URL for it."""
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--embedded needs the pgserver package: pip install pgserver")
+    server = pgserver.get_server(data_dir or tempfile.mkdtemp(prefix="skydo-bench-"), cleanup_mode="stop")
+    server.psql("CREATE DATABASE skydo_bench;")
+    return server.get_uri("skydo_bench").replace("postgresql://", "postgresql+psycopg2://", 1)
+
+
+# --- Seeding ---
+
+def seed(tenants: int, invoices_per_tenant: int, seed_value: int = 0) -> dict:
+    """
+    Insert synthetic tenants with clients, invoices, items and transactions
+    (set-based, one statement per table), then backfill the rollups and the
+    ledger. Returns what the scenarios need: tokens, credentials and ids.
+    """
+    from sqlalchemy import insert
+
+    import database
+    import models
+    import security
+    from services import fx_engine, ledger, money, partitions, rollups
+
+    rng = random.Random(seed_value)
+    tag = f"{int(time.time())}{rng.randrange(1000):03d}"
+    hashed = security.get_password_hash(PASSWORD)  # bcrypt once, shared by every tenant
+    today = datetime.date.today()
+    now = datetime.datetime.utcnow()
+    rates = {c: fx_engine.MOCK_BASE_RATES[f"{c}_INR"] for c in CURRENCIES}
+
+    with database.engine.begin() as conn:
+        partitions.ensure_transaction_partitions(conn, start=partitions.add_months(today, -12))
+
+        emails = [f"bench-{tag}-{i}@skydo.test" for i in range(tenants)]
+        user_ids = conn.execute(
+            insert(models.User.__table__).returning(models.User.id, sort_by_parameter_order=True),
+            [{"email": e, "hashed_password": hashed, "is_active": True, "is_payment_onboarded": True,
+              "business_name": f"Bench Studio {i}", "business_address": f"{i} Benchmark Road"}
+             for i, e in enumerate(emails)],
+        ).scalars().all()
+        conn.execute(insert(models.VirtualAccount.__table__), [
+            {"user_id": uid, "currency": "USD", "bank_name": "Bench Bank", "account_number": f"BENCH{tag}{i:06d}",
+             "routing_code": "000000000", "provider": "Bench"}
+            for i, uid in enumerate(user_ids)
+        ])
+        client_ids = conn.execute(
+            insert(models.Client.__table__).returning(models.Client.id, sort_by_parameter_order=True),
+            [{"name": f"Client {i}-{k}", "email": f"ap{k}@client{i}.test", "address": "1 Market St",
+              "owner_id": uid} for i, uid in enumerate(user_ids) for k in range(3)],
+        ).scalars().all()
+
+        invoice_rows = []
+        for i, uid in enumerate(user_ids):
+            for n in range(invoices_per_tenant):
+                currency = CURRENCIES[n % len(CURRENCIES)]
+                total_minor = rng.randrange(10_000, 500_000)
+                paid = rng.random() < PAID_SHARE
+                invoice_rows.append({
+                    "status": "paid" if paid else "draft",
+                    "due_date": today + datetime.timedelta(days=rng.randrange(-120, 60)),
+                    "currency": currency,
+                    "total_minor": total_minor,
+                    "amount_inr_minor": fx_engine.to_inr_minor(total_minor, currency, rates[currency]),
+                    "client_id": client_ids[i * 3 + n % 3],
+                    "owner_id": uid,
+                    "payment_link_id": f"bench-{tag}-{i}-{n}",
+                })
+        invoice_ids = conn.execute(
+            insert(models.Invoice.__table__).returning(models.Invoice.id, sort_by_parameter_order=True),
+            invoice_rows,
+        ).scalars().all()
+
+        items, transactions = [], []
+        for invoice_id, row in zip(invoice_ids, invoice_rows):
+            first = row["total_minor"] // 2
+            items.append({"description": "Design work", "quantity": 1, "unit_price_minor": first,
+                          "invoice_id": invoice_id})
+            items.append({"description": "Development", "quantity": 1,
+                          "unit_price_minor": row["total_minor"] - first, "invoice_id": invoice_id})
+            if row["status"] != "paid":
+                continue
+            principal = money.to_major(row["total_minor"], row["currency"])
+            payout = fx_engine.calculate_payout(principal, row["currency"])
+            transactions.append({
+                "invoice_id": invoice_id,
+                "processed_at": now - datetime.timedelta(minutes=rng.randrange(1, 365 * 24 * 60)),
+                "sender_name": "Bench Payer",
+                "principal_amount": principal,
+                "currency": row["currency"],
+                "fx_rate": payout["fx_rate"],
+                "flat_fee_usd": payout["flat_fee_usd"],
+                "gst_on_fee_inr": payout["gst_on_fee_inr"],
+                "amount": payout["net_payout_inr"],
+                "net_payout_inr": payout["net_payout_inr"],
+                "amount_inr": fx_engine.to_inr(principal, payout["fx_rate"]),
+                "status": "succeeded",
+                "settlement_status": "PROCESSING" if rng.random() < PROCESSING_SHARE else "SETTLED",
+            })
+        conn.execute(insert(models.InvoiceItem.__table__), items)
+        if transactions:
+            conn.execute(insert(models.Transaction.__table__), transactions)
+
+
+        # Derived tables, for the new tenants only
+        for uid in user_ids:
+            rollups.rebuild(conn, owner_id=uid)
+        ledger.backfill_from_transactions(conn, owner_ids=user_ids)
+
+    tokens = [security.create_access_token(data={"sub": e}) for e in emails]
+    drafts, paid = [], {}
+    for invoice_id, row in zip(invoice_ids, invoice_rows):
+        if row["status"] == "paid":
+            paid.setdefault(row["owner_id"], invoice_id)
+        else:
+            drafts.append({"reference": row["payment_link_id"], "currency": row["currency"],
+                           "amount": str(money.to_major(row["total_minor"], row["currency"]))})
+    rng.shuffle(drafts)
+    owner_token = dict(zip(user_ids, tokens))
+    return {
+        "emails": emails,
+        "tokens": tokens,
+        "drafts": drafts,
+        "pdfs": [(owner_token[owner], invoice_id) for owner, invoice_id in paid.items()],
+        "invoices": len(invoice_rows),
+        "transactions": len(transactions),
+    }
+
+
+# --- Load generation ---
+
+def _requests_for(scenario: str, data: dict, count: int):
+    """(method, path, body, headers) tuples for one scenario."""
+    auth = [{"Authorization": f"Bearer {t}"} for t in data["tokens"]]
+    if scenario == "login":
+        form = {"Content-Type": "application/x-www-form-urlencoded"}
+        return [("POST", "/auth/token", urllib.parse.urlencode({"username": e, "password": PASSWORD}), form)
+                for e in itertools.islice(itertools.cycle(data["emails"]), count)]
+    if scenario == "invoices":
+        return [("GET", "/invoices/?limit=100", None, h) for h in itertools.islice(itertools.cycle(auth), count)]
+    if scenario == "dashboard":
+        return [("GET", "/analytics/dashboard", None, h) for h in itertools.islice(itertools.cycle(auth), count)]
+    if scenario == "pdf":
+        return [("GET", f"/documents/invoices/{invoice_id}/download", None, {"Authorization": f"Bearer {token}"})
+                for token, invoice_id in itertools.islice(itertools.cycle(data["pdfs"]), count)]
+    if scenario == "webhook":
+        # Each draft can be paid once: take them off the shared list
+        drafts, data["drafts"] = data["drafts"][:count], data["drafts"][count:]
+        return [("POST", "/webhooks/payment-received",
+                 json.dumps({"sender_name": "Bench Payer", **d}), {"Content-Type": "application/json"})
+                for d in drafts]
+    if scenario == "settlements":
+        return [("POST", "/mock/payments/process-settlements", None, h) for h in auth[:count]]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(ordered, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def drive(base_url: str, requests, concurrency: int) -> dict:
+    """Send the requests from `concurrency` threads, one keep-alive connection each."""
+    url = urllib.parse.urlsplit(base_url)
+    pending = iter(requests)
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def worker():
+        conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        mine = []
+        try:
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    break
+                method, path, body, headers = request
+                started = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    ok = False
+                mine.append(time.perf_counter() - started)
+                if not ok:
+                    with lock:
+                        errors.append(path)
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    ms = sorted(s * 1000 for s in latencies)
+    if not ms:
+        return {"requests": 0, "concurrency": concurrency, "errors": 0}
+    return {
+        "requests": len(ms),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(ms) / elapsed, 1),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "mean_ms": round(sum(ms) / len(ms), 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+def start_server(database_url: str, workers: int, timeout: float = 60.0):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.setdefault("ADMISSION_CONTROL", "0")  # measure the routes, not the rate limits
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"{base_url}/", timeout=1):
+                return proc, base_url
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"server not ready after {timeout}s")
+
+
+# --- Baseline comparison ---
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Print a per-scenario comparison; returns the scenarios that regressed."""
+    regressions = []
+    print(f"{'scenario':<12} {'rps':>18} {'p95 ms':>20}")
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("requests") or not now.get("requests"):
+            continue
+        rps_change = now["rps"] / before["rps"] - 1
+        p95_change = now["p95_ms"] / before["p95_ms"] - 1
+        regressed = rps_change < -threshold or p95_change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<12} {before['rps']:>8} -> {now['rps']:<8} {before['p95_ms']:>9} -> {now['p95_ms']:<9}"
+              f" ({rps_change:+.0%} rps, {p95_change:+.0%} p95){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def run(args) -> dict:
+    database_url = args.database_url or os.getenv("DATABASE_URL")
+    if args.embedded:
+        database_url = start_embedded_postgres(args.data_dir)
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url  # before `database` is imported
+    sys.path.insert(0, BACKEND_DIR)
+
+    import init_db
+    import migrations
+    if args.reset:
+        init_db.reset_db()
+    else:
+        migrations.upgrade()
+
+    started = time.perf_counter()
+    data = seed(args.tenants, args.invoices_per_tenant, args.seed)
+    print(f"Seeded {args.tenants} tenants, {data['invoices']} invoices, {data['transactions']} transactions "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    proc = None
+    base_url = args.url
+    if not base_url:
+        proc, base_url = start_server(database_url or "", args.workers)
+    try:
+        scenarios = {}
+        for name in args.scenarios:
+            count = args.tenants if name == "settlements" else args.requests
+            if name in READ_ONLY and args.warmup:
+                drive(base_url, _requests_for(name, data, args.warmup), args.concurrency)
+            scenarios[name] = drive(base_url, _requests_for(name, data, count), args.concurrency)
+            print(f"{name}: {json.dumps(scenarios[name])}", file=sys.stderr)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "tenants": args.tenants,
+            "invoices_per_tenant": args.invoices_per_tenant,
+            "workers": args.workers if proc else None,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed, start the API and benchmark it")
+    target = run_parser.add_mutually_exclusive_group()
+    target.add_argument("--database-url", help="default: DATABASE_URL")
+    target.add_argument("--embedded", action="store_true", help="start a throwaway Postgres (pgserver)")
+    run_parser.add_argument("--data-dir", help="pgserver data directory for --embedded (default: a temp dir)")
+    run_parser.add_argument("--url", help="benchmark an already running server (sharing the database)")
+    run_parser.add_argument("--reset", action="store_true", help="drop and recreate the schema first (destructive)")
+    run_parser.add_argument("--tenants", type=int, default=50)
+    run_parser.add_argument("--invoices-per-tenant", type=int, default=200)
+    run_parser.add_argument("--requests", type=int, default=2000, help="per scenario (settlements: one per tenant)")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests before read scenarios")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run_parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    run_parser.add_argument("--baseline", help="earlier report to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="allowed rps drop / p95 rise")
+
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        baseline_path = args.baseline
+    else:
+        with open(args.current) as f:
+            report = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            sys.exit(f"Regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
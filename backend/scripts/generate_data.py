@@ -0,0 +1,273 @@
+# backend/scripts/generate_data.py
+"""
+Synthetic data generator.
+
+Bulk-loads realistic tenants for reproducing production-scale query plans:
+merchants with a virtual account, many clients each, a skewed (Pareto)
+number of invoices in mixed currencies, and paid invoices with their
+transaction (FX fields from fx_engine, settlement PROCESSING or SETTLED by
+age). The output is deterministic for a given --seed on an empty database
+(dates are relative to the day it runs).
+
+Rows are generated in chunks and streamed with COPY FROM STDIN. Ids are assigned up front with the tables locked
+against concurrent writers, so the loader never round-trips for RETURNING.
+The sequences are moved past the new ids at the end. The daily rollups and
+the ledger are rebuilt for the new tenants in the same transaction.
+
+Usage (from backend/):
+    python -m scripts.generate_data --users 1000 --invoices-per-user 40 --seed 7
+    python -m scripts.generate_data --users 100000 --invoices-per-user 100   # ~10M invoices + items
+
+Every generated user logs in with the password "password123".
+"""
+
+import argparse
+import datetime
+import io
+import json
+import random
+import sys
+import time
+
+from sqlalchemy import func, select, text
+
+import database
+import models
+import security
+from services import fx_engine, ledger, money, partitions, rollups, virtual_accounts
+
+PASSWORD = "password123"
+DEFAULT_CHUNK_ROWS = 50_000
+LEDGER_OWNER_BATCH = 10_000
+
+CURRENCY_WEIGHTS = {"USD": 0.6, "EUR": 0.2, "GBP": 0.15, "CAD": 0.05}
+INVOICE_PARETO_ALPHA = 1.5  # a few merchants issue most of the invoices
+MAX_INVOICES_FACTOR = 50  # cap on one merchant, as a multiple of the mean
+PAID_SHARE_PAST_DUE = 0.85
+PAID_SHARE_NOT_DUE = 0.35
+OVERDUE_SHARE_PAST_DUE = 0.10  # of unpaid past-due invoices the rest stay draft
+PROCESSING_DAYS = 3  # payments younger than this are still PROCESSING
+PAYMENT_TERMS_DAYS = 30
+ITEM_DESCRIPTIONS = ("Design sprint", "Backend development", "Consulting hours", "Retainer",
+                     "Content writing", "QA cycle", "Cloud setup", "Support plan")
+
+_TABLES = [models.User, models.VirtualAccount, models.Client, models.Invoice, models.InvoiceItem, models.Transaction]
+_COLUMNS = {
+    models.User: ["id", "email", "hashed_password", "is_active", "is_payment_onboarded", "business_name",
+                  "business_address"],
+    models.VirtualAccount: ["id", "user_id", "currency", "bank_name", "account_number", "routing_code", "provider"],
+    models.Client: ["id", "name", "email", "address", "owner_id"],
+    models.Invoice: ["id", "status", "due_date", "currency", "total_minor", "client_id", "owner_id",
+                     "payment_link_id", "amount_inr_minor"],
+    models.InvoiceItem: ["id", "description", "quantity", "unit_price_minor", "invoice_id"],
+    models.Transaction: ["id", "invoice_id", "processed_at", "sender_name", "principal_amount", "currency",
+                         "fx_rate", "flat_fee_usd", "gst_on_fee_inr", "amount", "net_payout_inr", "amount_inr",
+                         "status", "settlement_status"],
+}
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if value is True or value is False:
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class BulkWriter:
+    """
+    Per-table row buffers, flushed with COPY (Postgres) or executemany. Buffers
+    are always flushed parents first, so foreign keys hold at every flush.
+    """
+
+    def __init__(self, conn, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.conn = conn
+        self.chunk_rows = chunk_rows
+        self.rows = {model: [] for model in _TABLES}
+        self.counts = {model.__tablename__: 0 for model in _TABLES}
+
+    def add(self, model, row: tuple):
+        self.rows[model].append(row)
+        if len(self.rows[model]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        for model in _TABLES:
+            rows = self.rows[model]
+            if rows:
+                self._write(model, rows)
+                self.counts[model.__tablename__] += len(rows)
+                self.rows[model] = []
+
+    def _write(self, model, rows):
+        columns = _COLUMNS[model]
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(map(_copy_value, row)))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = self.conn.connection.driver_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+
+
+def _reserve_ids(conn) -> dict:
+    """Lock the tables against concurrent inserts and return the next free id of each."""
+    names = ", ".join(model.__tablename__ for model in _TABLES)
+    conn.execute(text(f"LOCK TABLE {names} IN SHARE ROW EXCLUSIVE MODE"))
+    return {model: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1 for model in _TABLES}
+
+
+def _advance_sequences(conn):
+    for model in _TABLES:
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+        ))
+
+
+def _pick(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def generate(users: int, clients_per_user: float = 8, invoices_per_user: float = 40, months: int = 12,
+             seed: int = 0, prefix: str = "gen", chunk_rows: int = DEFAULT_CHUNK_ROWS, engine=None) -> dict:
+    """Generate and load the data set in one transaction. Returns row counts and timings."""
+    engine = engine or database.engine
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    random.seed(seed)  # fx_engine draws its rate fluctuation from the global generator
+    snapshot = {c: money.scale_rate(r) for c, r in fx_engine.get_snapshot_rates().items()}
+    hashed = security.get_password_hash(PASSWORD)  # one bcrypt for every generated user
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    today = now.date()
+    first_day = today - datetime.timedelta(days=months * 30)
+    invoice_scale = invoices_per_user * (INVOICE_PARETO_ALPHA - 1) / INVOICE_PARETO_ALPHA  # Pareto mean = scale * a/(a-1)
+    max_invoices = int(invoices_per_user * MAX_INVOICES_FACTOR)
+    va = virtual_accounts.VA_CONFIGS["USD"]
+
+    with engine.begin() as conn:
+        partitions.ensure_transaction_partitions(conn, start=first_day)
+        next_id = _reserve_ids(conn)
+        writer = BulkWriter(conn, chunk_rows)
+        first_user = next_id[models.User]
+
+        for n in range(users):
+            user_id = next_id[models.User]
+            next_id[models.User] += 1
+            writer.add(models.User, (user_id, f"{prefix}{n}@example.com", hashed, True, True,
+                                     f"{prefix.title()} Studio {n}", f"{n} Export Lane, Bengaluru"))
+            writer.add(models.VirtualAccount, (next_id[models.VirtualAccount], user_id, "USD", va["bank_name"],
+                                               f"{va['prefix']}{prefix.upper()}{n:010d}", va["routing_code"],
+                                               va["provider"]))
+            next_id[models.VirtualAccount] += 1
+
+            client_ids = []
+            for k in range(max(1, int(rng.lognormvariate(0, 0.8) * clients_per_user / 1.377))):  # E[lognormal] = e^0.32
+                client_ids.append(next_id[models.Client])
+                writer.add(models.Client, (next_id[models.Client], f"Client {n}-{k}", f"ap@client{n}-{k}.example.com",
+                                           f"{k} Market Street", user_id))
+                next_id[models.Client] += 1
+
+            invoice_count = min(max_invoices, int(invoice_scale * rng.paretovariate(INVOICE_PARETO_ALPHA)))
+            for _ in range(invoice_count):
+                _add_invoice(writer, rng, next_id, user_id, rng.choice(client_ids), today, now, first_day, snapshot)
+
+        writer.flush()
+        _advance_sequences(conn)
+        loaded = time.perf_counter()
+
+        new_users = list(range(first_user, next_id[models.User]))
+        rollups.rebuild(conn)  # recomputed from transactions, so a full rebuild is always correct
+        for i in range(0, len(new_users), LEDGER_OWNER_BATCH):
+            ledger.backfill_from_transactions(conn, owner_ids=new_users[i:i + LEDGER_OWNER_BATCH])
+
+    return {
+        "rows": writer.counts,
+        "load_seconds": round(loaded - started, 1),
+        "derived_seconds": round(time.perf_counter() - loaded, 1),
+    }
+
+
+def _add_invoice(writer, rng, next_id, user_id, client_id, today, now, first_day, snapshot):
+    invoice_id = next_id[models.Invoice]
+    next_id[models.Invoice] += 1
+    currency = _pick(rng, CURRENCY_WEIGHTS)
+    issued = first_day + datetime.timedelta(days=rng.randrange((today - first_day).days + 1))
+    due_date = issued + datetime.timedelta(days=PAYMENT_TERMS_DAYS)
+
+    items = []
+    for _ in range(rng.randint(1, 4)):
+        quantity = rng.randint(1, 10)
+        unit_price_minor = money.to_minor(int(rng.lognormvariate(5.5, 1.0)) + 1, currency)  # ~$245 median
+        items.append((next_id[models.InvoiceItem], rng.choice(ITEM_DESCRIPTIONS), quantity, unit_price_minor,
+                      invoice_id))
+        next_id[models.InvoiceItem] += 1
+    total_minor = sum(quantity * price for _, _, quantity, price, _ in items)
+
+    past_due = due_date < today
+    paid = rng.random() < (PAID_SHARE_PAST_DUE if past_due else PAID_SHARE_NOT_DUE)
+    transaction = None
+    if paid:
+        status = "paid"
+        paid_on = min(today, issued + datetime.timedelta(days=rng.randrange(PAYMENT_TERMS_DAYS + 15)))
+        processed_at = datetime.datetime.combine(paid_on, datetime.time()) + datetime.timedelta(
+            seconds=rng.randrange(86400))
+        processed_at = min(processed_at, now)
+        principal = money.to_major(total_minor, currency)
+        payout = fx_engine.calculate_payout(principal, currency)
+        amount_inr_minor = fx_engine.to_inr_minor(total_minor, currency, payout["fx_rate"])
+        settlement = "PROCESSING" if now - processed_at < datetime.timedelta(days=PROCESSING_DAYS) else "SETTLED"
+        transaction = (next_id[models.Transaction], invoice_id, processed_at, "Remitter Inc", principal, currency,
+                       payout["fx_rate"], payout["flat_fee_usd"], payout["gst_on_fee_inr"], payout["net_payout_inr"],
+                       payout["net_payout_inr"], fx_engine.to_inr(principal, payout["fx_rate"]), "succeeded",
+                       settlement)
+        next_id[models.Transaction] += 1
+    else:
+        status = "overdue" if past_due and rng.random() < OVERDUE_SHARE_PAST_DUE else "draft"
+        amount_inr_minor = money.convert(total_minor, snapshot[currency], currency)
+
+    writer.add(models.Invoice, (invoice_id, status, due_date, currency, total_minor, client_id, user_id,
+                                f"{rng.getrandbits(96):024x}", amount_inr_minor))
+    for item in items:  # after their invoice: a flush may happen on any add()
+        writer.add(models.InvoiceItem, item)
+    if transaction:
+        writer.add(models.Transaction, transaction)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, required=True, help="merchants to create")
+    parser.add_argument("--clients-per-user", type=float, default=8, help="mean (log-normal)")
+    parser.add_argument("--invoices-per-user", type=float, default=40, help="mean (Pareto, heavily skewed)")
+    parser.add_argument("--months", type=int, default=12, help="history to spread invoices over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="gen", help="email prefix; use a new one to add more users")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per COPY")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    existing = None
+    with database.engine.connect() as conn:
+        existing = conn.execute(
+            select(models.User.id).where(models.User.email == f"{args.prefix}0@example.com")
+        ).first()
+    if existing:
+        sys.exit(f"Users with prefix '{args.prefix}' already exist; pass a different --prefix.")
+
+    summary = generate(
+        users=args.users, clients_per_user=args.clients_per_user, invoices_per_user=args.invoices_per_user,
+        months=args.months, seed=args.seed, prefix=args.prefix, chunk_rows=args.chunk_rows,
+    )
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        rows = ", ".join(f"{count} {table}" for table, count in summary["rows"].items())
+        print(f"Loaded {rows} in {summary['load_seconds']}s; rollups and ledger in {summary['derived_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
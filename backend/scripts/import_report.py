@@ -0,0 +1,82 @@
+# backend/scripts/import_report.py
+"""
+Import-time report.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+aggregates the cumulative import cost per top-level package, so a new heavy
+dependency on the boot path shows up immediately.
+
+Usage (from backend/):
+    python -m scripts.import_report [--top 20] [--budget-ms 1500] [--module main]
+
+With --budget-ms the script exits non-zero when the total exceeds the budget,
+which makes it usable as a CI gate.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def collect(module: str):
+    """Return [(module_name, self_us, cumulative_us, depth)] in import order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(errors[-5:]))
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def summarize(rows):
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+    return total_us, sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    total_us, packages = summarize(collect(args.module))
+    top = packages[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": round(total_us / 1000, 1),
+            "packages": [{"package": name, "ms": round(us / 1000, 1)} for name, us in top],
+        }, indent=2))
+    else:
+        print(f"import {args.module}: {total_us / 1000:.0f} ms total")
+        for name, us in top:
+            print(f"  {us / 1000:8.1f} ms  {us * 100 / total_us:5.1f}%  {name}")
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Import budget exceeded: {total_us / 1000:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
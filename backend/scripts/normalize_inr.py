@@ -0,0 +1,44 @@
+# backend/scripts/normalize_inr.py
+"""
+INR normalization jobs.
+
+Usage (from backend/):
+    python -m scripts.normalize_inr backfill [--batch-size 5000]
+    python -m scripts.normalize_inr refresh
+
+`backfill` fills the INR amounts on invoices and transactions written before the
+column existed, in committed id-range batches (safe to re-run). `refresh`
+revalues all outstanding invoices at the current snapshot rates; schedule it
+as often as the dashboard's INR figures should track the market.
+"""
+
+import argparse
+import time
+
+import database
+from services import fx_engine, inr_normalization
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="populate missing INR amounts")
+    backfill.add_argument("--batch-size", type=int, default=inr_normalization.DEFAULT_BATCH_SIZE)
+    sub.add_parser("refresh", help="revalue outstanding invoices at snapshot rates")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rates = fx_engine.get_snapshot_rates()
+    print("Snapshot rates: " + ", ".join(f"{c}={r}" for c, r in rates.items()))
+    if args.command == "backfill":
+        counts = inr_normalization.backfill(database.engine, batch_size=args.batch_size, rates=rates)
+        print(f"Backfilled {counts['invoices']} invoices and {counts['transactions']} transactions")
+    else:
+        with database.engine.begin() as conn:
+            updated = inr_normalization.refresh_outstanding(conn, rates)
+        print(f"Revalued {updated} outstanding invoices")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# backend/scripts/overdue.py
+"""
+Overdue detection job.
+
+Usage (from backend/):
+    python -m scripts.overdue [--as-of YYYY-MM-DD] [--chunk-size 5000] [--no-resume] [--json]
+
+Marks every draft or failed invoice whose due date is before the as-of date
+(default: today, UTC) as overdue and records a dunning event for each.
+Progress is checkpointed per chunk; an interrupted run is resumed (with its
+original as-of date) unless --no-resume is given. Exits with status 2 if
+another process is already running the job.
+"""
+
+import argparse
+import datetime
+import json
+import sys
+
+from services import dunning
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="business date (default: today, UTC)")
+    parser.add_argument("--chunk-size", type=int, default=dunning.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-resume", action="store_true", help="abandon an interrupted run and start over")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = dunning.run(as_of=args.as_of, chunk_size=args.chunk_size, resume=not args.no_resume)
+    if summary is None:
+        print("Overdue detection is already running elsewhere.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        resumed = f" (resumed after {summary['resumed_from']})" if summary["resumed_from"] else ""
+        print(f"Run {summary['run_id']} as of {summary['as_of']}: marked {summary['processed']} invoices "
+              f"overdue in {summary['chunks']} chunks{resumed}, {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# backend/scripts/partitions.py
+"""
+Transaction partition maintenance.
+
+Usage (from backend/):
+    python -m scripts.partitions maintain [--months-ahead 3]
+    python -m scripts.partitions retain --keep-months 24 [--drop]
+    python -m scripts.partitions list
+
+`maintain` creates upcoming monthly partitions; run it daily from cron (it is
+also run by init_db.py on every boot). `retain` detaches partitions older than
+the retention horizon. The detached tables are left in place for archival
+unless --drop is given.
+"""
+
+import argparse
+
+import database
+from services import partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    maintain = sub.add_parser("maintain", help="create upcoming monthly partitions")
+    maintain.add_argument("--months-ahead", type=int, default=partitions.MONTHS_AHEAD)
+    retain = sub.add_parser("retain", help="detach partitions older than the horizon")
+    retain.add_argument("--keep-months", type=int, required=True)
+    retain.add_argument("--drop", action="store_true", help="drop detached partitions instead of keeping them")
+    sub.add_parser("list", help="list attached partitions")
+    args = parser.parse_args()
+
+    with database.engine.begin() as conn:
+        if args.command == "maintain":
+            created = partitions.ensure_transaction_partitions(conn, months_ahead=args.months_ahead)
+            print(f"Created: {', '.join(created) or 'none'}")
+        elif args.command == "retain":
+            detached = partitions.detach_transaction_partitions(conn, args.keep_months, drop=args.drop)
+            print(f"{'Dropped' if args.drop else 'Detached'}: {', '.join(detached) or 'none'}")
+        else:
+            for name in partitions.list_partitions(conn):
+                print(name)
+
+
+if __name__ == "__main__":
+    main()
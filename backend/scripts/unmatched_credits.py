@@ -0,0 +1,93 @@
+# backend/scripts/unmatched_credits.py
+"""
+Owner-less unmatched credits.
+
+A credit to an unknown or missing receiving account is queued for review
+without an owner, so no user can see it in GET /reconciliation/unmatched.
+Assigning the account claims its credits automatically; this is the operator
+path for the rest.
+
+Usage (from backend/):
+    python -m scripts.unmatched_credits list [--json]
+    python -m scripts.unmatched_credits claim
+    python -m scripts.unmatched_credits assign CREDIT_ID OWNER_EMAIL
+
+list shows pending credits without an owner. claim hands every such credit
+whose account has been assigned since to the account's owner. assign puts one
+credit in the given user's review queue, where they can match or dismiss it.
+"""
+
+import argparse
+import json
+import sys
+
+import crud
+import database
+import models
+from services import reconciliation
+
+
+def list_orphans(db) -> list:
+    return (
+        db.query(models.UnmatchedCredit)
+        .filter(models.UnmatchedCredit.owner_id.is_(None), models.UnmatchedCredit.status == "pending")
+        .order_by(models.UnmatchedCredit.id)
+        .all()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="pending credits without an owner")
+    list_parser.add_argument("--json", action="store_true", help="print the credits as JSON")
+    commands.add_parser("claim", help="give credits to the owners their accounts now have")
+    assign_parser = commands.add_parser("assign", help="put a credit in a user's review queue")
+    assign_parser.add_argument("credit_id", type=int)
+    assign_parser.add_argument("owner_email")
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        if args.command == "list":
+            credits = list_orphans(db)
+            if args.json:
+                print(json.dumps([
+                    {
+                        "id": c.id,
+                        "account_number": c.account_number,
+                        "sender_name": c.sender_name,
+                        "amount": str(c.amount),
+                        "currency": c.currency,
+                        "reference": c.reference,
+                        "received_at": c.received_at.isoformat(),
+                    }
+                    for c in credits
+                ], indent=2))
+            else:
+                for c in credits:
+                    print(f"{c.id}\t{c.received_at:%Y-%m-%d %H:%M}\t{c.amount} {c.currency}\t"
+                          f"{c.account_number or '-'}\t{c.sender_name}\t{c.reference or ''}")
+                print(f"{len(credits)} credits without an owner", file=sys.stderr)
+
+        elif args.command == "claim":
+            claimed = reconciliation.claim_orphans(db)
+            db.commit()
+            print(f"Claimed {claimed} credits for the owners of their accounts")
+
+        else:
+            owner = crud.get_user_by_email(db, args.owner_email)
+            if owner is None:
+                sys.exit(f"No user {args.owner_email}")
+            try:
+                reconciliation.assign_owner(db, args.credit_id, owner.id)
+            except ValueError as exc:
+                sys.exit(str(exc))
+            db.commit()
+            print(f"Credit {args.credit_id} is now in {owner.email}'s review queue")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
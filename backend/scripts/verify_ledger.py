@@ -0,0 +1,61 @@
+# backend/scripts/verify_ledger.py
+"""
+Ledger verification job.
+
+Usage (from backend/):
+    python -m scripts.verify_ledger [--chunk-size 10000] [--owner ID] [--repair] [--json]
+
+Re-sums ledger_entries in id-ordered chunks and compares every account with
+its running balance in account_balances. Exits with status 1 if a balance
+drifted or an owner's entries don't net to zero. --repair recomputes the
+drifted owners' balances from the ledger.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import database
+from services import ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=ledger.VERIFY_CHUNK_SIZE)
+    parser.add_argument("--owner", type=int, help="verify a single user")
+    parser.add_argument("--repair", action="store_true", help="rebuild drifted balances from the ledger")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = ledger.verify(database.engine, chunk_size=args.chunk_size, owner_id=args.owner)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+
+    drifted_owners = sorted({d["owner_id"] for d in report["drift"]})
+    if args.repair and drifted_owners:
+        with database.engine.begin() as conn:
+            ledger.rebuild_balances(conn, drifted_owners)
+        report["repaired_owners"] = drifted_owners
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Scanned {report['entries_scanned']} entries across {report['accounts_checked']} accounts "
+              f"in {report['seconds']}s")
+        for d in report["drift"]:
+            print(f"  DRIFT owner={d['owner_id']} account={d['account']}: stored {d['stored_balance']} "
+                  f"({d['stored_entries']} entries), ledger {d['ledger_balance']} ({d['ledger_entries']} entries)")
+        for owner in report["unbalanced_owners"]:
+            print(f"  UNBALANCED owner={owner}: entries do not net to zero")
+        if args.repair and drifted_owners:
+            print(f"Repaired balances for owners: {', '.join(map(str, drifted_owners))}")
+        if not report["drift"] and not report["unbalanced_owners"]:
+            print("Ledger and balances agree.")
+
+    if report["unbalanced_owners"] or (report["drift"] and not args.repair):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
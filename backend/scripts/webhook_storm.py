@@ -0,0 +1,307 @@
+# backend/scripts/webhook_storm.py
+"""
+Webhook storm simulator.
+
+Behaves like a Banking-as-a-Service provider delivering credit notifications
+to POST /webhooks/payment-received, open loop at a target rate:
+
+  - bursts: every --burst-every seconds, --burst-size extra credits at once
+  - duplicates: a share of credits is delivered twice within --duplicate-window
+  - redeliveries: a share is delivered again later even though it was acked
+    (at-least-once providers do this), landing out of order among newer credits
+  - slow acknowledgements: a delivery not acked within --ack-timeout, or
+    answered with a 5xx, is retried with exponential backoff and jitter
+  - mock triggers: for a share of credits (--trigger-share), the same link is
+    also paid through POST /mock/payments/trigger-payment, racing the webhook;
+    whichever comes second must be a no-op
+
+Credits are the open invoices of the database (draft, failed, overdue), sent
+by payment link reference or, for --mangle-share of them, with a mangled
+reference and the receiving virtual account (the auto-reconciliation path).
+Reports achieved throughput, latency, dispatch lag and backlog, and checks the
+database afterwards for invoices that got more than one transaction.
+
+Usage (from backend/):
+    python -m scripts.webhook_storm --credits 2000 --rate 200 --duplicate-share 0.2 --ack-timeout 0.5
+    python -m scripts.webhook_storm --url http://127.0.0.1:8000 --credits 500 --burst-every 2 --burst-size 100
+"""
+
+import argparse
+import heapq
+import http.client
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+from sqlalchemy import func, select
+
+import database
+import models
+from services import money
+from scripts import benchmark
+
+OPEN_STATUSES = ("draft", "failed", "overdue")
+WEBHOOK_PATH = "/webhooks/payment-received"
+TRIGGER_PATH = "/mock/payments/trigger-payment"
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 0.2
+BACKLOG_SAMPLE_SECONDS = 0.1
+
+
+def load_credits(count: int, mangle_share: float, rng: random.Random) -> list:
+    """One (invoice id, webhook payload, payment link id) per open invoice, the oldest first."""
+    inv = models.Invoice.__table__
+    va = models.VirtualAccount.__table__
+    account = (
+        select(func.min(va.c.account_number))
+        .where(va.c.user_id == inv.c.owner_id)
+        .scalar_subquery()
+    )
+    with database.engine.connect() as conn:
+        rows = conn.execute(
+            select(inv.c.id, inv.c.payment_link_id, inv.c.currency, inv.c.total_minor,
+                   models.Client.__table__.c.name, account.label("account_number"))
+            .join(models.Client.__table__, models.Client.__table__.c.id == inv.c.client_id)
+            .where(inv.c.status.in_(OPEN_STATUSES), inv.c.payment_link_id.isnot(None))
+            .order_by(inv.c.id)
+            .limit(count)
+        ).all()
+
+    credits = []
+    for row in rows:
+        payload = {
+            "sender_name": row.name,
+            "amount": str(money.to_major(row.total_minor, row.currency)),
+            "currency": row.currency,
+            "reference": row.payment_link_id,
+        }
+        if row.account_number and rng.random() < mangle_share:
+            payload["reference"] = f"INV {row.id} payment"  # free text, no link id
+            payload["account_number"] = row.account_number
+        credits.append((row.id, json.dumps(payload), row.payment_link_id))
+    return credits
+
+
+class Storm:
+    """Open-loop delivery schedule, a dispatcher and a pool of sender threads."""
+
+    def __init__(self, base_url: str, connections: int, ack_timeout: float, rng: random.Random):
+        url = urllib.parse.urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port
+        self.connections = connections
+        self.ack_timeout = ack_timeout
+        self.rng = rng
+        self.schedule = []  # heap of (due, seq, invoice_id, body, kind, attempt, path)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.ready = queue.Queue()
+        self.pending = 0  # scheduled or in flight
+        self.done = threading.Event()
+        self.kinds = Counter()
+        self.responses = Counter()
+        self.latencies, self.lags, self.backlog = [], [], []
+        self.gave_up = 0
+
+    def add(self, due: float, invoice_id: int, body: str, kind: str, attempt: int = 1, path: str = WEBHOOK_PATH):
+        with self.lock:
+            heapq.heappush(self.schedule, (due, self.seq, invoice_id, body, kind, attempt, path))
+            self.seq += 1
+            self.pending += 1
+
+    def _dispatch(self, started: float):
+        next_sample = 0.0
+        while not self.done.is_set():
+            now = time.perf_counter() - started
+            with self.lock:
+                while self.schedule and self.schedule[0][0] <= now:
+                    self.ready.put(heapq.heappop(self.schedule))
+                wait = self.schedule[0][0] - now if self.schedule else BACKLOG_SAMPLE_SECONDS
+            if now >= next_sample:
+                self.backlog.append(self.ready.qsize())
+                next_sample = now + BACKLOG_SAMPLE_SECONDS
+            time.sleep(max(0.0, min(wait, BACKLOG_SAMPLE_SECONDS, 0.005)))
+
+    def _send(self, started: float):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.ack_timeout)
+        while True:
+            item = self.ready.get()
+            if item is None:
+                break
+            due, _, invoice_id, body, kind, attempt, path = item
+            sent = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body,
+                             headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                outcome = str(response.status)
+                retry = response.status >= 500
+            except TimeoutError:
+                outcome, retry = "timeout", True  # the server may still apply it: the retry is a duplicate
+                conn.close()
+            except (OSError, http.client.HTTPException):
+                outcome, retry = "error", True
+                conn.close()
+            elapsed = time.perf_counter() - sent
+
+            with self.lock:
+                self.kinds[kind] += 1
+                self.responses[outcome] += 1
+                self.latencies.append(elapsed)
+                self.lags.append(sent - started - due)
+            if retry and attempt < MAX_ATTEMPTS:
+                backoff = RETRY_BASE_SECONDS * 2 ** (attempt - 1) * (0.5 + self.rng.random())
+                self.add(time.perf_counter() - started + backoff, invoice_id, body, "retry", attempt + 1, path)
+            elif retry:
+                with self.lock:
+                    self.gave_up += 1
+            with self.lock:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.done.set()
+        conn.close()
+
+    def run(self) -> float:
+        if not self.pending:
+            return 0.0
+        started = time.perf_counter()
+        dispatcher = threading.Thread(target=self._dispatch, args=(started,), daemon=True)
+        senders = [threading.Thread(target=self._send, args=(started,), daemon=True) for _ in range(self.connections)]
+        dispatcher.start()
+        for t in senders:
+            t.start()
+        self.done.wait()
+        elapsed = time.perf_counter() - started
+        for _ in senders:
+            self.ready.put(None)
+        for t in senders:
+            t.join()
+        dispatcher.join()
+        return elapsed
+
+
+def plan(storm: Storm, credits: list, args):
+    """Schedule originals at the target rate plus bursts, duplicates, redeliveries and mock triggers."""
+    rng = storm.rng
+    offset, since_burst, i = 0.0, 0.0, 0
+    while i < len(credits):
+        if args.burst_every and since_burst >= args.burst_every:
+            since_burst = 0.0
+            for invoice_id, body, _ in credits[i:i + args.burst_size]:
+                storm.add(offset, invoice_id, body, "burst")
+            i += args.burst_size
+            continue
+        invoice_id, body, payment_link_id = credits[i]
+        storm.add(offset, invoice_id, body, "original")
+        if rng.random() < args.duplicate_share:
+            storm.add(offset + rng.uniform(0, args.duplicate_window), invoice_id, body, "duplicate")
+        if rng.random() < args.redelivery_share:
+            storm.add(offset + rng.uniform(args.redelivery_delay / 2, args.redelivery_delay), invoice_id, body,
+                      "redelivery")
+        if rng.random() < args.trigger_share:
+            trigger = json.dumps({"payment_link_id": payment_link_id, "status": "success"})
+            storm.add(offset + rng.uniform(0, args.duplicate_window), invoice_id, trigger, "trigger",
+                      path=TRIGGER_PATH)
+        i += 1
+        step = rng.expovariate(args.rate)  # Poisson arrivals
+        offset += step
+        since_burst += step
+
+
+def duplicate_transactions(invoice_ids) -> dict:
+    tx = models.Transaction.__table__
+    with database.engine.connect() as conn:
+        counts = conn.execute(
+            select(tx.c.invoice_id, func.count())
+            .where(tx.c.invoice_id.in_(invoice_ids), tx.c.status == "succeeded")
+            .group_by(tx.c.invoice_id)
+        ).all()
+    return {
+        "invoices_paid": len(counts),
+        "invoices_with_duplicate_transactions": sum(1 for _, n in counts if n > 1),
+        "duplicate_transactions": sum(n - 1 for _, n in counts if n > 1),
+    }
+
+
+def _ms(samples) -> dict:
+    ordered = sorted(s * 1000 for s in samples)
+    if not ordered:
+        return {}
+    return {
+        "p50": round(benchmark.percentile(ordered, 50), 2),
+        "p95": round(benchmark.percentile(ordered, 95), 2),
+        "p99": round(benchmark.percentile(ordered, 99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="running API (default: start uvicorn on DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting the API")
+    parser.add_argument("--credits", type=int, default=1000, help="distinct credits (open invoices) to deliver")
+    parser.add_argument("--rate", type=float, default=100, help="target credits per second")
+    parser.add_argument("--connections", type=int, default=32, help="concurrent deliveries")
+    parser.add_argument("--burst-every", type=float, default=0, help="seconds between bursts (0: none)")
+    parser.add_argument("--burst-size", type=int, default=100)
+    parser.add_argument("--duplicate-share", type=float, default=0.1)
+    parser.add_argument("--duplicate-window", type=float, default=0.05, help="seconds")
+    parser.add_argument("--redelivery-share", type=float, default=0.05)
+    parser.add_argument("--redelivery-delay", type=float, default=5, help="seconds, at most")
+    parser.add_argument("--mangle-share", type=float, default=0.0, help="credits sent without their link id")
+    parser.add_argument("--trigger-share", type=float, default=0.0,
+                        help="credits whose link is also paid through the mock trigger at the same time")
+    parser.add_argument("--ack-timeout", type=float, default=2.0, help="seconds before the provider retries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    credits = load_credits(args.credits, args.mangle_share, rng)
+    if not credits:
+        sys.exit("No open invoices to pay; generate some with scripts.generate_data.")
+
+    proc, base_url = None, args.url
+    if not base_url:
+        proc, base_url = benchmark.start_server(os.getenv("DATABASE_URL", ""), args.workers)
+    try:
+        storm = Storm(base_url, args.connections, args.ack_timeout, rng)
+        plan(storm, credits, args)
+        seconds = storm.run()
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    sent = sum(storm.kinds.values())
+    report = {
+        "credits": len(credits),
+        "target_rps": args.rate,
+        "seconds": round(seconds, 2),
+        "achieved_rps": round(sent / seconds, 1) if seconds else 0,
+        "deliveries": dict(storm.kinds),
+        "responses": dict(storm.responses),
+        "gave_up": storm.gave_up,
+        "latency_ms": _ms(storm.latencies),
+        "dispatch_lag_ms": _ms(storm.lags),
+        "backlog": {"max": max(storm.backlog, default=0),
+                    "mean": round(sum(storm.backlog) / len(storm.backlog), 1) if storm.backlog else 0},
+        **duplicate_transactions([invoice_id for invoice_id, _, _ in credits]),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if report["duplicate_transactions"]:
+        sys.exit(f"{report['duplicate_transactions']} duplicate transactions: webhook handling is not idempotent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/scripts/worker_memory.py
+"""
+Per-worker memory benchmark.
+
+Boots gunicorn with and without --preload, waits for every worker to come up,
+and reads /proc/<pid>/smaps_rollup for each worker:
+
+  rss      resident pages, shared ones counted in full
+  pss      proportional share: shared pages divided between the processes
+  private  pages only this worker uses (what each extra worker really costs)
+
+Usage (from backend/, Linux only):
+    python -m scripts.worker_memory --workers 4
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def _smaps_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def measure(workers: int, preload: bool, timeout: float = 60.0) -> dict:
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD="1" if preload else "0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        started = time.perf_counter()
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"workers not ready after {timeout}s")
+            try:
+                if len(_children(proc.pid)) == workers:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).close()
+                    break
+            except OSError:
+                pass
+            time.sleep(0.1)
+        boot_seconds = time.perf_counter() - started
+
+        # Let every worker finish its lifespan startup before sampling
+        time.sleep(1.0)
+
+        per_worker = [_smaps_kb(pid) for pid in _children(proc.pid)]
+        master = _smaps_kb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    def avg(key):
+        return round(sum(w[key] for w in per_worker) / len(per_worker) / 1024, 1)
+
+    return {
+        "preload": preload,
+        "workers": workers,
+        "boot_seconds": round(boot_seconds, 2),
+        "master_rss_mb": round(master["rss"] / 1024, 1),
+        "worker_rss_mb": avg("rss"),
+        "worker_pss_mb": avg("pss"),
+        "worker_private_mb": avg("private"),
+        "total_pss_mb": round((master["pss"] + sum(w["pss"] for w in per_worker)) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = [measure(args.workers, preload) for preload in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
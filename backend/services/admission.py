@@ -0,0 +1,276 @@
+# backend/services/admission.py
+"""
+Admission Control
+
+Keeps one tenant, or one heavy route, from taking every worker:
+
+  - rate limits: a token bucket per tenant ("user:<id>" for merchants,
+    "link:<payment link id>" for the public payment pages), refilled at
+    RATE_LIMIT_PER_SECOND up to RATE_LIMIT_BURST tokens. Each route takes
+    its weight from ROUTE_COSTS, so a PDF costs more than a page view.
+    An empty bucket raises RateLimited (429).
+  - the public routes also take from a bucket per client address
+    ("ip:<address>", see client_key()) before looking the link up, so
+    guessing payment link ids is throttled too; the link's bucket is only
+    charged once the link has resolved to an invoice.
+  - concurrency: at most MAX_HEAVY_CONCURRENCY CPU-heavy requests (PDF
+    rendering, dashboards) run at once across all workers; a request waits
+    up to HEAVY_QUEUE_SECONDS for a slot, then raises Overloaded (503)
+    rather than queueing until every request is slow.
+
+Both are kept in a small SQLite file (ADMISSION_STORE) that the workers on
+a host share; state is throwaway, so the file is never synced to disk. If
+the file can't be used, each worker falls back to limits in its own memory.
+Set ADMISSION_CONTROL=0 to turn it all off (e.g. for benchmarks).
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("ADMISSION_CONTROL", "1") != "0"
+STORE_PATH = os.getenv("ADMISSION_STORE", os.path.join(tempfile.gettempdir(), "skydo-admission.sqlite3"))
+RATE_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+BURST = float(os.getenv("RATE_LIMIT_BURST", "30"))
+MAX_HEAVY_CONCURRENCY = int(os.getenv("MAX_HEAVY_CONCURRENCY", str(os.cpu_count() or 4)))
+HEAVY_QUEUE_SECONDS = float(os.getenv("HEAVY_QUEUE_SECONDS", "0.25"))
+HEAVY_POLL_SECONDS = 0.02
+STORE_TIMEOUT_SECONDS = 1.0
+PRUNE_INTERVAL_SECONDS = 60
+
+# Tokens a request takes from its tenant's bucket
+ROUTE_COSTS = {
+    "public_invoice": 1,
+    "trigger_payment": 2,
+    "dashboard": 3,
+    "invoice_pdf": 5,
+    "fira_pdf": 5,
+}
+
+
+class RateLimited(Exception):
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("Too many expensive requests in progress")
+        self.retry_after = retry_after
+
+
+# --- Shared store ---
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS inflight (pid INTEGER PRIMARY KEY, count INTEGER NOT NULL)",
+)
+
+_local = threading.local()
+_store_failed = False
+_last_prune = 0.0
+_registered_pid = None
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(STORE_PATH, timeout=STORE_TIMEOUT_SECONDS, isolation_level=None,
+                           check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+@contextmanager
+def _transaction():
+    """A write-locked transaction on this thread's store connection; None if the store is unusable."""
+    global _store_failed
+    if _store_failed:
+        yield None
+        return
+    conn = getattr(_local, "conn", None)
+    try:
+        if conn is None:
+            conn = _local.conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError as e:
+        if conn is not None and "locked" in str(e):
+            yield None  # busy past STORE_TIMEOUT_SECONDS: the caller decides without it
+            return
+        _store_failed = True
+        logger.warning(f"Admission store {STORE_PATH} unavailable, limiting per worker: {e}")
+        yield None
+        return
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+# --- Rate limits ---
+
+_memory_lock = threading.Lock()
+_memory_buckets = {}  # key -> (tokens, updated), when the store is unusable
+
+
+def _refill(row, now: float) -> float:
+    if row is None:
+        return BURST
+    tokens, updated = row
+    return min(BURST, tokens + max(0.0, now - updated) * RATE_PER_SECOND)
+
+
+def _prune(conn, now: float):
+    # A bucket untouched long enough to be full again is the same as no bucket
+    global _last_prune
+    if now - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = now
+    conn.execute("DELETE FROM buckets WHERE updated < ?", (now - BURST / RATE_PER_SECOND,))
+
+
+def take(key: str, route: str):
+    """Take ROUTE_COSTS[route] tokens from `key`'s bucket; raises RateLimited if it has too few."""
+    if not ENABLED or RATE_PER_SECOND <= 0:
+        return
+    cost = min(ROUTE_COSTS[route], BURST)
+    now = time.time()
+    with _transaction() as conn:
+        if conn is None:
+            with _memory_lock:
+                tokens = _refill(_memory_buckets.get(key), now)
+                if tokens >= cost:
+                    _memory_buckets[key] = (tokens - cost, now)
+        else:
+            tokens = _refill(conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone(), now)
+            if tokens >= cost:
+                conn.execute(
+                    "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens - cost, now),
+                )
+            _prune(conn, now)
+    if tokens < cost:
+        raise RateLimited(key, (cost - tokens) / RATE_PER_SECOND)
+
+
+def client_key(request) -> str:
+    """The bucket key of an unauthenticated caller: its address as the server sees it."""
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+# --- Concurrency ---
+
+_memory_inflight = 0
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _try_acquire() -> bool:
+    global _memory_inflight, _registered_pid
+    pid = os.getpid()
+    with _transaction() as conn:
+        if conn is None:
+            if not _store_failed:
+                return False  # store busy: poll again
+            with _memory_lock:
+                if _memory_inflight >= MAX_HEAVY_CONCURRENCY:
+                    return False
+                _memory_inflight += 1
+                return True
+        if _registered_pid != pid:
+            # A recycled pid may have left a count behind
+            conn.execute("INSERT OR REPLACE INTO inflight (pid, count) VALUES (?, 0)", (pid,))
+            _registered_pid = pid
+        total = 0
+        for other, count in conn.execute("SELECT pid, count FROM inflight").fetchall():
+            if other != pid and not _alive(other):  # a worker that died mid-request
+                conn.execute("DELETE FROM inflight WHERE pid = ?", (other,))
+                continue
+            total += count
+        if total >= MAX_HEAVY_CONCURRENCY:
+            return False
+        conn.execute("UPDATE inflight SET count = count + 1 WHERE pid = ?", (pid,))
+        return True
+
+
+def _release():
+    global _memory_inflight
+    while True:  # a slot must not leak because the store was busy
+        with _transaction() as conn:
+            if conn is not None:
+                conn.execute("UPDATE inflight SET count = MAX(count - 1, 0) WHERE pid = ?", (os.getpid(),))
+                return
+            if _store_failed:
+                with _memory_lock:
+                    _memory_inflight = max(0, _memory_inflight - 1)
+                return
+
+
+@contextmanager
+def heavy(queue_seconds: float = HEAVY_QUEUE_SECONDS):
+    """Run a CPU-heavy block in one of the shared slots; raises Overloaded if none frees up in time."""
+    if not ENABLED:
+        yield
+        return
+    deadline = time.monotonic() + queue_seconds
+    while not _try_acquire():
+        if time.monotonic() >= deadline:
+            raise Overloaded()
+        time.sleep(HEAVY_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        _release()
+
+
+# --- HTTP ---
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def _rate_limited_response(request, exc: RateLimited):
+    return JSONResponse({"detail": "Too many requests"}, status_code=429, headers=_retry_after(exc.retry_after))
+
+
+def _overloaded_response(request, exc: Overloaded):
+    return JSONResponse({"detail": "Server busy, try again shortly"}, status_code=503,
+                        headers=_retry_after(exc.retry_after))
+
+
+def install(app):
+    """Answer RateLimited with 429 and Overloaded with 503, both with Retry-After."""
+    app.add_exception_handler(RateLimited, _rate_limited_response)
+    app.add_exception_handler(Overloaded, _overloaded_response)
+
+
+def _reset_after_fork():
+    # Never share a SQLite connection with the parent process
+    global _local, _memory_inflight
+    _local = threading.local()
+    _memory_inflight = 0
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,21 +1,27 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, literal, literal_column
 import models
-from datetime import datetime
+from datetime import datetime, timedelta
+from services import money, partitions
 
 def get_kpis(db: Session, user_id: int):
-    # Total Revenue (Paid Invoices)
-    total_revenue = db.query(func.sum(models.Invoice.total_amount))\
-        .filter(models.Invoice.owner_id == user_id, models.Invoice.status == 'paid')\
-        .scalar() or 0.0
-
-    # Outstanding Amount (Draft/Sent Invoices)
-    outstanding_amount = db.query(func.sum(models.Invoice.total_amount))\
-        .filter(models.Invoice.owner_id == user_id, models.Invoice.status != 'paid')\
-        .scalar() or 0.0
-
-    # Total Invoices
-    total_invoices = db.query(models.Invoice).filter(models.Invoice.owner_id == user_id).count()
+    # Revenue, outstanding and invoice count in one pass over the INR-normalized
+    # paise column (integer sums; covered by ix_invoices_owner_status_amount_inr_minor)
+    is_paid = models.Invoice.status == 'paid'
+    totals = db.query(
+            func.sum(models.Invoice.amount_inr_minor).filter(is_paid).label('total_revenue'),
+            func.sum(models.Invoice.amount_inr_minor).filter(~is_paid).label('outstanding_amount'),
+            func.count().label('total_invoices'),
+        )\
+        .filter(models.Invoice.owner_id == user_id)\
+        .one()
+    # Paid invoices moved to cold storage (see services/archival.py)
+    archived = db.query(
+            func.sum(models.ArchivedRevenueTotal.amount_inr_minor).label('revenue'),
+            func.sum(models.ArchivedRevenueTotal.invoice_count).label('invoices'),
+        )\
+        .filter(models.ArchivedRevenueTotal.owner_id == user_id)\
+        .one()
 
     # Pending Settlements (PROCESSING status)
     pending_settlements_count = db.query(models.Transaction).join(models.Invoice)\
@@ -23,35 +29,251 @@ def get_kpis(db: Session, user_id: int):
         .count()
 
     return {
-        "total_revenue": float(total_revenue),
-        "outstanding_amount": float(outstanding_amount),
-        "total_invoices": total_invoices,
+        "currency": "INR",
+        "total_revenue": money.to_float((totals.total_revenue or 0) + (archived.revenue or 0), "INR"),
+        "outstanding_amount": money.to_float(totals.outstanding_amount, "INR"),
+        "total_invoices": totals.total_invoices + (archived.invoices or 0),
         "pending_settlements_count": pending_settlements_count
     }
 
 
-def get_monthly_revenue(db: Session, user_id: int):
-    # Aggregate revenue by month using Transaction processed_at
+def get_monthly_revenue(db: Session, user_id: int, months: int = 12):
+    # Aggregate revenue by month over a bounded processed_at range, so Postgres
+    # only scans the monthly partitions that overlap it.
+    end = partitions.add_months(partitions.month_start(datetime.utcnow().date()), 1)
+    start = partitions.add_months(end, -months)
+    month = func.date_trunc(literal_column("'month'"), models.Transaction.processed_at).label('month')
+
     results = db.query(
-            func.to_char(models.Transaction.processed_at, 'YYYY-MM').label('month'),
+            month,
             func.sum(models.Transaction.amount).label('revenue')
         )\
         .join(models.Invoice)\
-        .filter(models.Invoice.owner_id == user_id)\
-        .group_by('month')\
-        .order_by('month')\
+        .filter(
+            models.Invoice.owner_id == user_id,
+            models.Transaction.processed_at >= start,
+            models.Transaction.processed_at < end,
+        )\
+        .group_by(month)\
+        .order_by(month)\
+        .all()
+
+    archived_tx = models.ArchivedTransaction
+    archived_month = func.date_trunc(literal_column("'month'"), archived_tx.processed_at).label('month')
+    archived = db.query(
+            archived_month,
+            func.sum(archived_tx.amount).label('revenue')
+        )\
+        .filter(
+            archived_tx.owner_id == user_id,
+            archived_tx.processed_at >= start,
+            archived_tx.processed_at < end,
+        )\
+        .group_by(archived_month)\
         .all()
-        
-    return [{"month": r.month, "revenue": float(r.revenue)} for r in results]
+
+    # Add the Decimal sums and convert once, so a month split across both stays exact
+    revenue = {}
+    for r in results + archived:
+        key = r.month.strftime('%Y-%m')
+        revenue[key] = revenue.get(key, 0) + (r.revenue or 0)
+    return [{"month": m, "revenue": float(revenue[m])} for m in sorted(revenue)]
 
 def get_client_revenue(db: Session, user_id: int):
     results = db.query(
             models.Client.name,
-            func.sum(models.Invoice.total_amount).label('revenue')
+            func.sum(models.Invoice.amount_inr_minor).label('revenue')
         )\
         .join(models.Invoice)\
         .filter(models.Invoice.owner_id == user_id, models.Invoice.status == 'paid')\
         .group_by(models.Client.name)\
         .all()
-        
-    return [{"name": r.name, "value": float(r.revenue)} for r in results]
+    archived = db.query(
+            models.Client.name,
+            func.sum(models.ArchivedRevenueTotal.amount_inr_minor).label('revenue')
+        )\
+        .join(models.Client, models.Client.id == models.ArchivedRevenueTotal.client_id)\
+        .filter(models.ArchivedRevenueTotal.owner_id == user_id)\
+        .group_by(models.Client.name)\
+        .all()
+
+    revenue = {}
+    for r in results + archived:
+        revenue[r.name] = revenue.get(r.name, 0) + int(r.revenue or 0)  # SUM() comes back as numeric
+    ranked = sorted(revenue.items(), key=lambda item: item[1], reverse=True)  # biggest clients first
+    return [{"name": name, "value": money.to_float(value, "INR")} for name, value in ranked]
+
+
+# --- Revenue time series ---
+GRANULARITIES = ("hour", "day", "week", "month")
+MAX_BUCKETS = 10000
+DEFAULT_SPAN = {
+    "hour": timedelta(days=2),
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=12),
+    "month": timedelta(days=365),
+}
+
+
+def bucket_floor(value: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = datetime(value.year, value.month, value.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday, like date_trunc
+    return day.replace(day=1)
+
+
+def next_bucket(value: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return value + timedelta(hours=1)
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    return datetime.combine(partitions.add_months(value.date(), 1), datetime.min.time())
+
+
+def get_revenue_timeseries(db: Session, user_id: int, granularity: str = "day", start: datetime = None,
+                           end: datetime = None, group_by: str = "none"):
+    """
+    Gap-filled revenue series in columnar form: one `buckets` array of bucket
+    starts and, per group, parallel arrays of counts and sums. Day and coarser
+    granularities read the daily rollup; hourly buckets scan transactions over a
+    bounded (partition-pruned) processed_at range.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    end = end or bucket_floor(datetime.utcnow(), "day") + timedelta(days=1)
+    start = start or end - DEFAULT_SPAN[granularity]
+    start = bucket_floor(start, granularity)
+    if start >= end:
+        raise ValueError("start must be before end")
+
+    buckets = []
+    bucket = start
+    while bucket < end:
+        buckets.append(bucket)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f"Range too large: more than {MAX_BUCKETS} {granularity} buckets")
+        bucket = next_bucket(bucket, granularity)
+    end = bucket
+
+    if granularity == "hour":
+        source = "transactions"
+        rows = _timeseries_from_transactions(db, user_id, start, end, group_by) \
+            + _timeseries_from_archive(db, user_id, start, end, group_by)
+    else:
+        source = "rollup"
+        rows = _timeseries_from_rollup(db, user_id, granularity, start, end, group_by)
+
+    position = {b: i for i, b in enumerate(buckets)}
+    size = len(buckets)
+    series = {}
+    for r in rows:
+        s = series.get(r.key)
+        if s is None:
+            s = series[r.key] = {
+                "key": r.key,
+                "label": r.label,
+                "count": [0] * size,
+                "net_payout_inr": [0.0] * size,
+            }
+            if group_by == "currency":
+                s["principal_amount"] = [0.0] * size
+        i = position[bucket_floor(r.bucket, granularity)]
+        s["count"][i] += int(r.count)
+        s["net_payout_inr"][i] = round(s["net_payout_inr"][i] + float(r.net_payout_inr or 0), 2)
+        if group_by == "currency":
+            s["principal_amount"][i] = round(s["principal_amount"][i] + float(r.principal_amount or 0), 2)
+
+    return {
+        "granularity": granularity,
+        "group_by": group_by,
+        "source": source,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": [b.isoformat() for b in buckets],
+        "series": sorted(series.values(), key=lambda s: str(s["key"])),
+    }
+
+
+def _group_columns(group_by: str, currency_col, client_id_col):
+    """(key, label, extra GROUP BY columns) for a grouping mode."""
+    if group_by == "currency":
+        return currency_col, currency_col, [currency_col]
+    if group_by == "client":
+        return client_id_col, models.Client.name, [client_id_col, models.Client.name]
+    return literal("all"), literal("All"), []
+
+
+def _timeseries_from_rollup(db, user_id, granularity, start, end, group_by):
+    rollup = models.RevenueDailyRollup
+    # granularity is one of GRANULARITIES, so it is safe to inline (a bound parameter
+    # would make the SELECT and GROUP BY expressions differ on server-side binding)
+    bucket = func.date_trunc(literal_column(f"'{granularity}'"), rollup.day).label("bucket")
+    key, label, group_columns = _group_columns(group_by, rollup.currency, rollup.client_id)
+    query = db.query(
+            bucket,
+            key.label("key"),
+            label.label("label"),
+            func.sum(rollup.transaction_count).label("count"),
+            func.sum(rollup.principal_amount).label("principal_amount"),
+            func.sum(rollup.net_payout_inr).label("net_payout_inr"),
+        )\
+        .filter(rollup.owner_id == user_id, rollup.day >= start.date(), rollup.day < end.date())
+    if group_by == "client":
+        query = query.join(models.Client, models.Client.id == rollup.client_id)
+    return query.group_by(bucket, *group_columns).all()
+
+
+def _timeseries_from_transactions(db, user_id, start, end, group_by):
+    tx = models.Transaction
+    bucket = func.date_trunc(literal_column("'hour'"), tx.processed_at).label("bucket")
+    key, label, group_columns = _group_columns(group_by, tx.currency, models.Invoice.client_id)
+    query = db.query(
+            bucket,
+            key.label("key"),
+            label.label("label"),
+            func.count(tx.id).label("count"),
+            func.sum(tx.principal_amount).label("principal_amount"),
+            func.sum(tx.net_payout_inr).label("net_payout_inr"),
+        )\
+        .join(models.Invoice, models.Invoice.id == tx.invoice_id)\
+        .filter(
+            models.Invoice.owner_id == user_id,
+            tx.status == "succeeded",
+            tx.processed_at >= start,
+            tx.processed_at < end,
+        )
+    if group_by == "client":
+        query = query.join(models.Client, models.Client.id == models.Invoice.client_id)
+    return query.group_by(bucket, *group_columns).all()
+
+
+def _timeseries_from_archive(db, user_id, start, end, group_by):
+    # Same as _timeseries_from_transactions, over transactions of archived invoices
+    tx = models.ArchivedTransaction
+    inv = models.ArchivedInvoice
+    bucket = func.date_trunc(literal_column("'hour'"), tx.processed_at).label("bucket")
+    key, label, group_columns = _group_columns(group_by, tx.currency, inv.client_id)
+    query = db.query(
+            bucket,
+            key.label("key"),
+            label.label("label"),
+            func.count(tx.id).label("count"),
+            func.sum(tx.principal_amount).label("principal_amount"),
+            func.sum(tx.net_payout_inr).label("net_payout_inr"),
+        )\
+        .join(inv, inv.id == tx.invoice_id)\
+        .filter(
+            tx.owner_id == user_id,
+            tx.status == "succeeded",
+            tx.processed_at >= start,
+            tx.processed_at < end,
+        )
+    if group_by == "client":
+        query = query.join(models.Client, models.Client.id == inv.client_id)
+    return query.group_by(bucket, *group_columns).all()
@@ -0,0 +1,285 @@
+# backend/services/archival.py
+"""
+Cold Storage Archival
+
+A batch job that moves paid invoices out of the hot tables once all of their
+money has settled and their last transaction is older than the archive horizon
+(ARCHIVE_AFTER_DAYS before the run's as-of date):
+
+  - Candidates are paid invoices whose transactions are all older than the
+    horizon and whose succeeded payments are all SETTLED, in chunks ordered
+    by id. Each chunk is one transaction:
+      1. lock the next chunk of candidates (SKIP LOCKED)
+      2. copy them to archived_invoices, each with its line items as one
+         zlib-compressed JSON blob and a copy of its client's name, email and
+         address, and their transactions to archived_transactions
+      3. add them to archived_revenue_totals (per owner and client), so the
+         dashboard KPIs and client revenue still count them
+      4. delete the items, transactions and invoices from the hot tables
+      5. the run's checkpoint (cursor = last invoice id)
+  - Invoices still referenced by a dunning event or an unmatched credit (both
+    keep a foreign key to `invoices`) stay where they are.
+  - Daily revenue rollups are left alone, and rollups.rebuild() reads the
+    archive too, so no total changes when a record is archived.
+
+Archived records are read back with get_archived_invoice() and
+get_archived_transaction(), which return detached model instances, so a single
+invoice, its PDF and its FIRA work the same after archival, even once the
+client has been deleted. Listings and search
+only cover the hot tables.
+
+Run it from cron (`python -m scripts.archive`) or in-process by setting
+ARCHIVE_JOB_INTERVAL_SECONDS.
+"""
+
+import datetime
+import json
+import os
+import time
+import zlib
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import and_, delete, exists, insert, or_, select
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+import database
+import models
+from services import batch_jobs
+
+JOB_NAME = "archival"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+DEFAULT_CHUNK_SIZE = int(os.getenv("ARCHIVE_JOB_CHUNK_SIZE", "500"))
+INTERVAL_SECONDS = float(os.getenv("ARCHIVE_JOB_INTERVAL_SECONDS", "0"))  # 0 disables the in-process scheduler
+
+_invoices = models.Invoice.__table__
+_items = models.InvoiceItem.__table__
+_transactions = models.Transaction.__table__
+_archived_invoices = models.ArchivedInvoice.__table__
+_archived_transactions = models.ArchivedTransaction.__table__
+_totals = models.ArchivedRevenueTotal.__table__
+_clients = models.Client.__table__
+
+_INVOICE_COLUMNS = ("id", "owner_id", "client_id", "status", "due_date", "currency", "total_minor",
+                    "payment_link_id", "amount_inr_minor", "template_id", "period_start")
+_TRANSACTION_COLUMNS = tuple(c.name for c in _transactions.columns)
+
+
+def horizon(as_of: datetime.date, after_days: int = ARCHIVE_AFTER_DAYS) -> datetime.datetime:
+    return datetime.datetime.combine(as_of - datetime.timedelta(days=after_days), datetime.time.min)
+
+
+def _pack_items(items) -> bytes:
+    return zlib.compress(json.dumps(items, separators=(",", ":")).encode())
+
+
+def _unpack_items(blob: bytes) -> list:
+    return json.loads(zlib.decompress(blob))
+
+
+def _candidates(cutoff: datetime.datetime, after_id: int, chunk_size: int):
+    tx = _transactions
+    settled_before_cutoff = exists().where(
+        tx.c.invoice_id == _invoices.c.id,
+        tx.c.status == "succeeded",
+        tx.c.settlement_status == "SETTLED",
+        tx.c.processed_at < cutoff,
+    )
+    recent_or_unsettled = exists().where(
+        tx.c.invoice_id == _invoices.c.id,
+        or_(
+            tx.c.processed_at >= cutoff,
+            and_(tx.c.status == "succeeded", tx.c.settlement_status != "SETTLED"),
+        ),
+    )
+    dunned = exists().where(models.DunningEvent.__table__.c.invoice_id == _invoices.c.id)
+    credited = exists().where(models.UnmatchedCredit.__table__.c.invoice_id == _invoices.c.id)
+    return (
+        select(
+            *(_invoices.c[name] for name in _INVOICE_COLUMNS),
+            _clients.c.name.label("client_name"),
+            _clients.c.email.label("client_email"),
+            _clients.c.address.label("client_address"),
+        )
+        .join(_clients, _clients.c.id == _invoices.c.client_id)
+        .where(
+            _invoices.c.status == "paid",
+            _invoices.c.client_id.isnot(None),
+            _invoices.c.id > after_id,
+            settled_before_cutoff,
+            ~recent_or_unsettled,
+            ~dunned,
+            ~credited,
+        )
+        .order_by(_invoices.c.id)
+        .limit(chunk_size)
+        .with_for_update(of=_invoices, skip_locked=True)
+    )
+
+
+def _add_to_totals(db: Session, rows):
+    totals = defaultdict(lambda: [0, 0])
+    for r in rows:
+        total = totals[(r.owner_id, r.client_id)]
+        total[0] += 1
+        total[1] += r.amount_inr_minor or 0
+
+    stmt = pg_insert(_totals)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "client_id"],
+        set_={
+            "invoice_count": _totals.c.invoice_count + stmt.excluded.invoice_count,
+            "amount_inr_minor": _totals.c.amount_inr_minor + stmt.excluded.amount_inr_minor,
+        },
+    )
+    db.execute(stmt, [
+        {"owner_id": owner_id, "client_id": client_id, "invoice_count": count, "amount_inr_minor": amount}
+        for (owner_id, client_id), (count, amount) in totals.items()
+    ])
+
+
+def _process_chunk(db: Session, run: models.BatchJobRun, cutoff: datetime.datetime, chunk_size: int) -> int:
+    cursor = run.cursor or {}
+    rows = db.execute(_candidates(cutoff, cursor.get("id", 0), chunk_size)).all()
+    if not rows:
+        return 0
+
+    ids = [r.id for r in rows]
+    owners = {r.id: r.owner_id for r in rows}
+    items = defaultdict(list)
+    for item in db.execute(
+        select(_items.c.invoice_id, _items.c.id, _items.c.description, _items.c.quantity, _items.c.unit_price_minor)
+        .where(_items.c.invoice_id.in_(ids))
+        .order_by(_items.c.id)
+    ):
+        items[item.invoice_id].append([item.id, item.description, item.quantity, item.unit_price_minor])
+    transactions = db.execute(select(_transactions).where(_transactions.c.invoice_id.in_(ids))).all()
+
+    archived_at = datetime.datetime.utcnow()
+    db.execute(insert(_archived_invoices), [
+        {**r._asdict(), "items": _pack_items(items[r.id]), "archived_at": archived_at} for r in rows
+    ])
+    if transactions:
+        db.execute(insert(_archived_transactions), [
+            {**t._asdict(), "owner_id": owners[t.invoice_id]} for t in transactions
+        ])
+    _add_to_totals(db, rows)
+
+    db.execute(delete(_items).where(_items.c.invoice_id.in_(ids)))
+    db.execute(delete(_transactions).where(_transactions.c.invoice_id.in_(ids)))
+    db.execute(delete(_invoices).where(_invoices.c.id.in_(ids)))
+
+    batch_jobs.checkpoint(db, run, {"id": ids[-1]}, len(rows))
+    db.commit()
+    return len(rows)
+
+
+def run(as_of: Optional[datetime.date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+        after_days: int = ARCHIVE_AFTER_DAYS, resume: bool = True, engine=None) -> Optional[dict]:
+    """
+    Archive every eligible invoice settled more than `after_days` before `as_of`
+    (default: today, UTC). Returns a summary, or None if another process is
+    already running the job.
+    """
+    engine = engine or database.engine
+    as_of = as_of or datetime.datetime.utcnow().date()
+
+    with batch_jobs.exclusive(engine, JOB_NAME) as acquired:
+        if not acquired:
+            return None
+
+        started = time.perf_counter()
+        with Session(bind=engine) as db:
+            job_run = batch_jobs.start_or_resume(db, JOB_NAME, as_of, resume=resume)
+            cutoff = horizon(job_run.as_of, after_days)
+            resumed_from = job_run.processed or 0
+            chunks = 0
+            try:
+                while True:
+                    archived = _process_chunk(db, job_run, cutoff, chunk_size)
+                    if not archived:
+                        break
+                    chunks += 1
+            except Exception as e:
+                db.rollback()
+                batch_jobs.finish(db, job_run, "failed", error=str(e))
+                raise
+            batch_jobs.finish(db, job_run)
+
+            return {
+                "run_id": job_run.id,
+                "as_of": job_run.as_of.isoformat(),
+                "horizon": cutoff.isoformat(),
+                "resumed_from": resumed_from,
+                "processed": job_run.processed - resumed_from,
+                "chunks": chunks,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+
+
+def start_scheduler(interval: float = INTERVAL_SECONDS):
+    """Run the job every `interval` seconds on a daemon thread (no-op if interval is 0)."""
+    batch_jobs.start_scheduler(JOB_NAME, run, interval)
+
+
+# --- Reading the archive ---
+
+def is_archived(instance) -> bool:
+    """True for the detached instances returned by the lookups below."""
+    return sa_inspect(instance).transient
+
+
+def get_archived_invoice(db: Session, invoice_id: int = None, user_id: int = None,
+                         payment_link_id: str = None) -> Optional[models.Invoice]:
+    """
+    An archived invoice by id (and owner) or payment link, as a detached
+    models.Invoice with its items, client and owner set; None if not archived.
+    """
+    query = select(_archived_invoices)
+    if invoice_id is not None:
+        query = query.where(_archived_invoices.c.id == invoice_id)
+    if user_id is not None:
+        query = query.where(_archived_invoices.c.owner_id == user_id)
+    if payment_link_id is not None:
+        query = query.where(_archived_invoices.c.payment_link_id == payment_link_id)
+    row = db.execute(query).first()
+    if row is None:
+        return None
+
+    invoice = models.Invoice(**{name: getattr(row, name) for name in _INVOICE_COLUMNS})
+    items = []
+    for item_id, description, quantity, unit_price_minor in _unpack_items(row.items):
+        item = models.InvoiceItem(id=item_id, description=description, quantity=quantity,
+                                  unit_price_minor=unit_price_minor, invoice_id=row.id)
+        set_committed_value(item, "invoice", invoice)
+        items.append(item)
+    # Set without backref events, so nothing here can be flushed into the hot tables
+    set_committed_value(invoice, "items", items)
+    set_committed_value(invoice, "client", _archived_client(db, row))
+    set_committed_value(invoice, "owner", db.get(models.User, row.owner_id))
+    return invoice
+
+
+def _archived_client(db: Session, row) -> Optional[models.Client]:
+    # The live client when it still exists, else a detached one from the copy
+    client = db.get(models.Client, row.client_id) if row.client_id else None
+    if client is None and row.client_id is not None:
+        client = models.Client(id=row.client_id, owner_id=row.owner_id, name=row.client_name or "Deleted client",
+                               email=row.client_email or "", address=row.client_address)
+    return client
+
+
+def get_archived_transaction(db: Session, invoice_id: int) -> Optional[models.Transaction]:
+    """The (first) archived transaction of an invoice, as a detached models.Transaction."""
+    row = db.execute(
+        select(_archived_transactions)
+        .where(_archived_transactions.c.invoice_id == invoice_id)
+        .order_by(_archived_transactions.c.id)
+        .limit(1)
+    ).first()
+    if row is None:
+        return None
+    return models.Transaction(**{name: getattr(row, name) for name in _TRANSACTION_COLUMNS})
@@ -0,0 +1,121 @@
+# backend/services/batch_jobs.py
+"""
+Batch Job Runs & Checkpoints
+
+Shared plumbing for chunked batch jobs (overdue detection, recurring invoice
+generation):
+
+  - exclusive(): a Postgres advisory lock per job name, so only one process
+    across all workers and cron hosts runs a given job at a time.
+  - start_or_resume(): picks up the interrupted run of a job (status
+    "running" while nobody holds the lock means the process died) or starts
+    a new one.
+  - checkpoint(): stores the job's cursor and progress. Call it in the same
+    transaction as the chunk it describes, so a crash can never lose or
+    repeat a committed chunk.
+  - start_scheduler(): runs a job periodically on a daemon thread, for
+    deployments without an external cron.
+"""
+
+import datetime
+import logging
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+_schedulers = {}  # job name -> thread
+
+
+def _lock_id(job: str) -> int:
+    # Stable across processes and releases (unlike hash())
+    return zlib.crc32(f"batch_job:{job}".encode())
+
+
+@contextmanager
+def exclusive(engine: Engine, job: str):
+    """Yield True if this process now owns the job, False if another process does."""
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": _lock_id(job)}).scalar()
+        lock_conn.commit()  # session-level lock: don't sit idle in a transaction while the job runs
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _lock_id(job)})
+                lock_conn.commit()
+
+
+def start_or_resume(db: Session, job: str, as_of: datetime.date, resume: bool = True) -> models.BatchJobRun:
+    """
+    The job's interrupted run if there is one (and `resume`), else a new run for
+    `as_of`. Call while holding exclusive(); commits.
+    """
+    interrupted = (
+        db.query(models.BatchJobRun)
+        .filter(models.BatchJobRun.job == job, models.BatchJobRun.status == "running")
+        .order_by(models.BatchJobRun.id.desc())
+        .first()
+    )
+    if interrupted is not None:
+        if resume:
+            return interrupted
+        finish(db, interrupted, "failed", error="Abandoned: a new run was started without resuming")
+
+    run = models.BatchJobRun(job=job, as_of=as_of, status="running", processed=0)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def checkpoint(db: Session, run: models.BatchJobRun, cursor: dict, processed: int):
+    """Record progress; commit it together with the chunk it describes."""
+    run.cursor = cursor
+    run.processed = (run.processed or 0) + processed
+    run.updated_at = datetime.datetime.utcnow()
+
+
+def finish(db: Session, run: models.BatchJobRun, status: str = "completed", error: Optional[str] = None):
+    run.status = status
+    run.error = error
+    run.finished_at = run.updated_at = datetime.datetime.utcnow()
+    db.commit()
+
+
+def last_run(db: Session, job: str) -> Optional[models.BatchJobRun]:
+    return (
+        db.query(models.BatchJobRun)
+        .filter(models.BatchJobRun.job == job)
+        .order_by(models.BatchJobRun.id.desc())
+        .first()
+    )
+
+
+def _scheduler_loop(job: str, run: Callable[[], Optional[dict]], interval: float):
+    while True:
+        try:
+            summary = run()
+            if summary and summary.get("processed"):
+                logger.info(f"{job}: {summary}")
+        except Exception as e:
+            logger.error(f"{job} failed: {e}")
+        time.sleep(interval)
+
+
+def start_scheduler(job: str, run: Callable[[], Optional[dict]], interval: float):
+    """Call `run` every `interval` seconds on a daemon thread (no-op if interval is 0 or already started)."""
+    thread = _schedulers.get(job)
+    if interval <= 0 or (thread is not None and thread.is_alive()):
+        return
+    thread = threading.Thread(target=_scheduler_loop, args=(job, run, interval), name=f"{job}-scheduler", daemon=True)
+    _schedulers[job] = thread
+    thread.start()
@@ -0,0 +1,108 @@
+# backend/services/compression.py
+"""
+Response Compression
+
+ASGI middleware that compresses response bodies with the best encoding the
+client accepts: brotli ("br", when the optional `brotli` package is
+installed) or gzip. Bodies under COMPRESSION_MIN_BYTES are sent as is, as
+are already-compressed types (PDFs, images) and server-sent event streams,
+which must reach the client unbuffered.
+
+Built on Starlette's GZip responders, so streaming responses are compressed
+chunk by chunk and large bodies are compressed off the event loop.
+"""
+
+import os
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipResponder, IdentityResponder
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 4-5: close to gzip -9 ratio, much faster
+THREAD_MIN_BYTES = 128 * 1024  # compress bodies larger than this in a worker thread
+EXCLUDED_CONTENT_TYPES = DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/pdf",)
+
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    """Accept-Encoding as {coding: q}, e.g. "gzip, br;q=0.8" -> {"gzip": 1.0, "br": 0.8}."""
+    encodings = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip()] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: str):
+    """The preferred supported encoding ("br" or "gzip"), or None for identity."""
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:  # on equal q, the first (smaller output) wins
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = BROTLI_QUALITY, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self.compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self.compressor is None:
+            self.compressor = brotli.Compressor(quality=self.quality)
+        if len(body) >= THREAD_MIN_BYTES:
+            return await anyio.to_thread.run_sync(self._compress, body, more_body)
+        return self._compress(body, more_body)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        out = self.compressor.process(body)
+        # Flush each streamed chunk so the client can decode it as it arrives
+        return out + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_BYTES, gzip_level: int = GZIP_LEVEL,
+                 brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality,
+                                        exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level,
+                                      thread_minimum_size=THREAD_MIN_BYTES,
+                                      exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size, exclude_content_types=EXCLUDED_CONTENT_TYPES)
+        await responder(scope, receive, send)
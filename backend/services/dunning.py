@@ -0,0 +1,151 @@
+# backend/services/dunning.py
+"""
+Overdue Detection & Dunning
+
+A batch job that marks open invoices (draft or failed) whose due date has
+passed as "overdue", across every tenant in one pass:
+
+  - Candidates come from the (status, due_date) index, in chunks ordered by
+    (due_date, id). Each chunk is one transaction:
+      1. lock the next chunk of candidates (SKIP LOCKED: a payment in
+         flight is left for the next run)
+      2. one bulk UPDATE to "overdue"
+      3. one INSERT ... SELECT of "overdue" dunning events (idempotent per invoice)
+      4. one bulk INSERT of invoice.status_changed outbox events, plus one
+         "invoices.overdue" live event per owner for SSE subscribers
+      5. the run's checkpoint (cursor = last (due_date, id))
+  - A crashed run is resumed from its checkpoint, with its original as-of
+    date, the next time the job starts.
+
+Run it from cron (`python -m scripts.overdue`) or in-process by setting
+OVERDUE_JOB_INTERVAL_SECONDS; either way the job's advisory lock keeps it to
+one runner at a time.
+"""
+
+import datetime
+import os
+import time
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import Date, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import database
+import models
+from services import batch_jobs, event_bus, outbox
+
+JOB_NAME = "overdue_detection"
+OPEN_STATUSES = ("draft", "failed")
+OVERDUE = "overdue"
+DEFAULT_CHUNK_SIZE = int(os.getenv("OVERDUE_JOB_CHUNK_SIZE", "5000"))
+SUMMARY_MAX_IDS = 100  # invoice ids listed in a live "invoices.overdue" event
+INTERVAL_SECONDS = float(os.getenv("OVERDUE_JOB_INTERVAL_SECONDS", "0"))  # 0 disables the in-process scheduler
+
+_invoices = models.Invoice.__table__
+_dunning = models.DunningEvent.__table__
+
+def _insert_dunning_events(db: Session, run: models.BatchJobRun, ids):
+    """One INSERT ... SELECT for the chunk; an invoice already dunned at this stage is skipped."""
+    days_overdue = literal(run.as_of, Date) - _invoices.c.due_date
+    stmt = pg_insert(_dunning).from_select(
+        ["invoice_id", "owner_id", "stage", "due_date", "days_overdue", "amount_minor", "currency", "run_id", "created_at"],
+        select(
+            _invoices.c.id, _invoices.c.owner_id, literal(OVERDUE), _invoices.c.due_date, days_overdue,
+            _invoices.c.total_minor, _invoices.c.currency, literal(run.id), literal(datetime.datetime.utcnow()),
+        ).where(_invoices.c.id.in_(ids)),
+    )
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["invoice_id", "stage"]))
+
+
+def _process_chunk(db: Session, run: models.BatchJobRun, chunk_size: int) -> int:
+    cursor = run.cursor or {}
+    query = (
+        select(
+            _invoices.c.id, _invoices.c.owner_id, _invoices.c.payment_link_id,
+            _invoices.c.due_date, _invoices.c.currency,
+        )
+        .where(_invoices.c.status.in_(OPEN_STATUSES), _invoices.c.due_date < run.as_of)
+        .order_by(_invoices.c.due_date, _invoices.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    )
+    if cursor:
+        last = (datetime.date.fromisoformat(cursor["due_date"]), cursor["id"])
+        query = query.where(tuple_(_invoices.c.due_date, _invoices.c.id) > last)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+
+    ids = [r.id for r in rows]
+    db.execute(
+        update(_invoices)
+        .where(_invoices.c.id.in_(ids), _invoices.c.status.in_(OPEN_STATUSES))
+        .values(status=OVERDUE)
+    )
+    _insert_dunning_events(db, run, ids)
+
+    # Change feed: one event per invoice. Live SSE subscribers get one summary per owner instead.
+    outbox.record_many(db, [
+        (
+            "invoice.status_changed", r.owner_id, "invoice", r.id, r.payment_link_id,
+            {"invoice_id": r.id, "status": OVERDUE, "due_date": r.due_date.isoformat()},
+        )
+        for r in rows
+    ], publish=False)
+    by_owner = defaultdict(list)
+    for r in rows:
+        by_owner[r.owner_id].append(r.id)
+    event_bus.publish_many(db, [
+        ("invoices.overdue", owner_id, None, {"count": len(owner_ids), "invoice_ids": owner_ids[:SUMMARY_MAX_IDS]})
+        for owner_id, owner_ids in by_owner.items()
+    ])
+    batch_jobs.checkpoint(db, run, {"due_date": rows[-1].due_date.isoformat(), "id": rows[-1].id}, len(rows))
+    db.commit()
+    return len(rows)
+
+
+def run(as_of: Optional[datetime.date] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+        resume: bool = True, engine=None) -> Optional[dict]:
+    """
+    Mark every open invoice due before `as_of` (default: today, UTC) as overdue.
+    Returns a summary, or None if another process is already running the job.
+    """
+    engine = engine or database.engine
+    as_of = as_of or datetime.datetime.utcnow().date()
+
+    with batch_jobs.exclusive(engine, JOB_NAME) as acquired:
+        if not acquired:
+            return None
+
+        started = time.perf_counter()
+        with Session(bind=engine) as db:
+            job_run = batch_jobs.start_or_resume(db, JOB_NAME, as_of, resume=resume)
+            resumed_from = job_run.processed or 0
+            chunks = 0
+            try:
+                while True:
+                    marked = _process_chunk(db, job_run, chunk_size)
+                    if not marked:
+                        break
+                    chunks += 1
+            except Exception as e:
+                db.rollback()
+                batch_jobs.finish(db, job_run, "failed", error=str(e))
+                raise
+            batch_jobs.finish(db, job_run)
+
+            return {
+                "run_id": job_run.id,
+                "as_of": job_run.as_of.isoformat(),
+                "resumed_from": resumed_from,
+                "processed": job_run.processed - resumed_from,
+                "chunks": chunks,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+
+
+def start_scheduler(interval: float = INTERVAL_SECONDS):
+    """Run the job every `interval` seconds on a daemon thread (no-op if interval is 0)."""
+    batch_jobs.start_scheduler(JOB_NAME, run, interval)
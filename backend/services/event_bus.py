@@ -0,0 +1,195 @@
+# backend/services/event_bus.py
+"""
+Invoice Event Bus
+
+In-process pub/sub that feeds the Server-Sent Events streams with invoice
+status changes and settlement transitions.
+
+Topics:
+  owner:<user_id>           every event for a merchant's invoices
+  link:<payment_link_id>    events for one public payment link
+
+Cross-worker fan-out:
+  Events are sent with pg_notify inside the writing transaction, so they are
+  only delivered once the payment/settlement commits. Each worker runs one
+  LISTEN thread that re-dispatches notifications to its local subscribers.
+
+Backpressure:
+  Every subscriber has a bounded queue. A consumer that falls behind has its
+  queue dropped and receives a single "resync" event telling it to refetch
+  state, so one slow client can never grow memory without bound.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+NOTIFY_CHANNEL = "skydo_invoice_events"
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+LISTEN_POLL_SECONDS = 5.0
+
+_subscribers = {}  # topic -> set of Subscription
+_lock = threading.Lock()
+_listener_thread = None
+
+
+class Subscription:
+    """A single SSE client's bounded queue, bound to the event loop serving it."""
+
+    def __init__(self, topics, loop: asyncio.AbstractEventLoop, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, evt: dict):
+        """Thread-safe: hand an event to the subscriber's loop."""
+        self.loop.call_soon_threadsafe(self._put, evt)
+
+    def _put(self, evt: dict):
+        try:
+            self.queue.put_nowait(evt)
+        except asyncio.QueueFull:
+            # Slow consumer: discard its backlog and ask it to refetch.
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "data": {"dropped": self.dropped}})
+
+
+def subscribe(topics) -> Subscription:
+    sub = Subscription(topics, asyncio.get_running_loop())
+    with _lock:
+        for topic in sub.topics:
+            _subscribers.setdefault(topic, set()).add(sub)
+    _ensure_listener()
+    return sub
+
+
+def unsubscribe(sub: Subscription):
+    with _lock:
+        for topic in sub.topics:
+            subs = _subscribers.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del _subscribers[topic]
+
+
+def dispatch(evt: dict):
+    """Deliver an event to every local subscriber of its topics (once each)."""
+    with _lock:
+        targets = set()
+        for topic in evt.get("topics", ()):
+            targets.update(_subscribers.get(topic, ()))
+    for sub in targets:
+        sub.offer(evt)
+
+
+def publish(db: Session, event_type: str, owner_id: int, payment_link_id: Optional[str] = None, data: Optional[dict] = None):
+    """
+    Queue an event on the current transaction. Nothing is delivered unless the
+    transaction commits.
+    """
+    topics = [f"owner:{owner_id}"]
+    if payment_link_id:
+        topics.append(f"link:{payment_link_id}")
+    evt = {
+        "type": event_type,
+        "topics": topics,
+        "data": data or {},
+        "ts": time.time(),
+    }
+
+    _send(db, [evt])
+
+
+def publish_many(db: Session, events):
+    """
+    publish() for a batch of (event_type, owner_id, payment_link_id, data)
+    tuples, sent with a single statement.
+    """
+    now = time.time()
+    _send(db, [
+        {
+            "type": event_type,
+            "topics": [f"owner:{owner_id}"] + ([f"link:{payment_link_id}"] if payment_link_id else []),
+            "data": data or {},
+            "ts": now,
+        }
+        for event_type, owner_id, payment_link_id, data in events
+    ])
+
+
+def _send(db: Session, events):
+    if not events:
+        return
+    payloads = [json.dumps(evt, default=str) for evt in events]
+    if len(payloads) == 1:
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": payloads[0]},
+        )
+    else:
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": NOTIFY_CHANNEL, "payloads": payloads},
+        )
+
+
+# --- Postgres LISTEN thread (one per worker, started on first subscriber) ---
+
+def _ensure_listener():
+    global _listener_thread
+    with _lock:
+        if _listener_thread is not None and _listener_thread.is_alive():
+            return
+        _listener_thread = threading.Thread(target=_listen_forever, name="event-bus-listener", daemon=True)
+        _listener_thread.start()
+
+
+def _listen_forever():
+    backoff = 1.0
+    while True:
+        try:
+            _listen_once()
+            backoff = 1.0
+        except Exception:
+            logger.exception("Event bus listener failed; reconnecting in %.0fs", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def _listen_once():
+    proxy = database.engine.raw_connection()
+    proxy.detach()  # dedicated connection, kept out of the request pool
+    conn = proxy.dbapi_connection
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        while True:
+            if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    dispatch(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning("Dropping malformed event payload: %r", notify.payload[:200])
+    finally:
+        proxy.close()
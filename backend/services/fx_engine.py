@@ -6,10 +6,17 @@ This service handles real-time exchange rate locking and payout calculations.
 It implements the core Skydo formula:
   Net_INR = (Principal_USD - Flat_Fee_USD) * Mid_Market_Rate
   Payout = Net_INR - GST_on_Fee
+
+The arithmetic runs on integer minor units and fixed-point rates (see
+services/money.py); Decimals appear only in the returned breakdown.
 """
 
 from decimal import Decimal, ROUND_HALF_UP
 import random
+import threading
+import time
+
+from services import money, tracing
 
 # --- Configuration ---
 FLAT_FEE_USD = Decimal("29.00")
@@ -23,6 +30,27 @@ MOCK_BASE_RATES = {
     "CAD_INR": Decimal("61.50"),
 }
 
+# Base rates of every supported pair, loaded once per process by load_rates()
+_rate_cache = {}
+_rate_cache_lock = threading.Lock()
+_rates_loaded_at = None
+
+
+def load_rates() -> int:
+    """
+    Fill the base-rate cache for every supported pair (in production, one
+    provider call per pair). Returns the number of pairs loaded.
+    """
+    global _rates_loaded_at
+    with _rate_cache_lock:
+        _rate_cache.update(MOCK_BASE_RATES)
+        _rates_loaded_at = time.time()
+    return len(_rate_cache)
+
+
+def rates_loaded() -> bool:
+    return _rates_loaded_at is not None and len(_rate_cache) == len(MOCK_BASE_RATES)
+
 
 def get_mid_market_rate(currency_pair: str) -> Decimal:
     """
@@ -35,12 +63,37 @@ def get_mid_market_rate(currency_pair: str) -> Decimal:
     Returns:
         Decimal: The mid-market exchange rate
     """
-    base_rate = MOCK_BASE_RATES.get(currency_pair, Decimal("1.0"))
+    if _rates_loaded_at is None:
+        load_rates()
+    base_rate = _rate_cache.get(currency_pair, Decimal("1.0"))
     # Simulate minor fluctuation (+/- 0.05)
     fluctuation = Decimal(str(random.uniform(-0.05, 0.05))).quantize(Decimal("0.01"))
     return base_rate + fluctuation
 
 
+def get_snapshot_rates() -> dict:
+    """
+    One mid-market INR rate per supported currency, taken together.
+    Used to value outstanding invoices in INR until a rate is locked at payment.
+
+    Returns:
+        dict: e.g. {"USD": Decimal("83.51"), "EUR": Decimal("90.22"), ...}
+    """
+    return {pair.split("_")[0]: get_mid_market_rate(pair) for pair in MOCK_BASE_RATES}
+
+
+def to_inr(amount: Decimal, fx_rate: Decimal) -> Decimal:
+    """Convert a foreign amount to INR at the given rate, rounded to paise."""
+    return (Decimal(amount) * Decimal(fx_rate)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def to_inr_minor(amount_minor: int, currency: str, fx_rate) -> int:
+    """Convert minor units of `currency` to paise. `fx_rate` is a Decimal or a money.scale_rate() integer."""
+    rate = fx_rate if isinstance(fx_rate, int) else money.scale_rate(fx_rate)
+    return money.convert(amount_minor, rate, currency, "INR")
+
+
+@tracing.traced("fx.calculate_payout")
 def calculate_payout(principal_amount: Decimal, currency: str = "USD") -> dict:
     """
     Calculates the final INR payout amount after fees and FX conversion.
@@ -61,23 +114,26 @@ def calculate_payout(principal_amount: Decimal, currency: str = "USD") -> dict:
     """
     currency_pair = f"{currency}_INR"
     fx_rate = get_mid_market_rate(currency_pair)
+    rate = money.scale_rate(fx_rate)
 
-    net_foreign = principal_amount - FLAT_FEE_USD
-    gross_inr = (net_foreign * fx_rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    principal_minor = money.to_minor(principal_amount, currency)
+    fee_minor = money.to_minor(FLAT_FEE_USD, currency)
+    gross_inr = money.convert(principal_minor - fee_minor, rate, currency)
 
     # GST is calculated on the flat fee (converted to INR)
-    flat_fee_inr = (FLAT_FEE_USD * fx_rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    gst_on_fee_inr = (flat_fee_inr * GST_RATE).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    flat_fee_inr = money.convert(fee_minor, rate, currency)
+    gst_on_fee_inr = money.apply_ratio(flat_fee_inr, *GST_RATE.as_integer_ratio())
 
-    net_payout_inr = (gross_inr - gst_on_fee_inr).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    net_payout_inr = gross_inr - gst_on_fee_inr
 
     return {
         "principal_amount": principal_amount,
         "currency": currency,
         "flat_fee_usd": FLAT_FEE_USD,
         "fx_rate": fx_rate,
-        "gross_inr": gross_inr,
-        "flat_fee_inr": flat_fee_inr,
-        "gst_on_fee_inr": gst_on_fee_inr,
-        "net_payout_inr": net_payout_inr,
+        "gross_inr": money.to_major(gross_inr, "INR"),
+        "flat_fee_inr": money.to_major(flat_fee_inr, "INR"),
+        "gst_on_fee_inr": money.to_major(gst_on_fee_inr, "INR"),
+        "net_payout_inr": money.to_major(net_payout_inr, "INR"),
+        "net_payout_inr_minor": net_payout_inr,
     }
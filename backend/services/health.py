@@ -0,0 +1,131 @@
+# backend/services/health.py
+"""
+Health and Readiness
+
+Liveness says the worker process is up; readiness says it can serve a request
+without paying for setup first:
+
+  - database: the primary answers SELECT 1
+  - pool: at least DB_POOL_PREWARM connections are open in this worker's pool
+  - schema: the database is at migrations.LATEST_VERSION
+  - fx_rates: fx_engine's base-rate cache is loaded
+  - pdf_styles: ReportLab is imported and the PDF styles are built
+  - replica (when configured): reachable and within REPLICA_MAX_LAG_SECONDS;
+    reported but not required, since reads fall back to the primary
+
+Each check warms what it checks when it isn't ready yet (opens the pool
+connections, loads the rates, builds the styles), so a worker that started
+before the database was up becomes ready on a later probe. Every check
+reports its own latency, per worker, so a slow worker shows up as one.
+"""
+
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+import database
+import migrations
+from services import fx_engine, pdf_generator
+
+logger = logging.getLogger(__name__)
+
+_schema_ready = False  # the schema never goes back a version, so one success is enough
+
+
+class NotReady(Exception):
+    pass
+
+
+def _check_database():
+    with database.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {}
+
+
+def _check_pool():
+    pool = database.engine.pool
+    wanted = min(database.POOL_PREWARM_SIZE, getattr(pool, "size", lambda: database.POOL_PREWARM_SIZE)())
+    opened = pool.checkedin() + pool.checkedout() if hasattr(pool, "checkedin") else wanted
+    if opened < wanted:
+        database.prewarm_pool()
+        opened = pool.checkedin() + pool.checkedout()
+    detail = {"open": opened, "wanted": wanted}
+    if opened < wanted:
+        raise NotReady(f"{opened} of {wanted} pooled connections open")
+    return detail
+
+
+def _check_schema():
+    global _schema_ready
+    if not _schema_ready:
+        with database.engine.connect() as conn:
+            version = migrations.get_version(conn)
+        if version != migrations.LATEST_VERSION:
+            raise NotReady(f"schema at version {version}, expected {migrations.LATEST_VERSION}")
+        _schema_ready = True
+    return {"version": migrations.LATEST_VERSION}
+
+
+def _check_fx_rates():
+    if not fx_engine.rates_loaded():
+        fx_engine.load_rates()
+    return {"pairs": len(fx_engine.MOCK_BASE_RATES)}
+
+
+def _check_pdf_styles():
+    if not pdf_generator.styles_ready():
+        pdf_generator.warm_up()
+    return {}
+
+
+def _check_replica():
+    lag = database.replica_lag_seconds()
+    if lag > database.REPLICA_MAX_LAG_SECONDS:
+        raise NotReady(f"replica lag {lag}s, reading from the primary")
+    return {"lag_seconds": lag}
+
+
+# (name, check, required for readiness)
+CHECKS = [
+    ("database", _check_database, True),
+    ("pool", _check_pool, True),
+    ("schema", _check_schema, True),
+    ("fx_rates", _check_fx_rates, True),
+    ("pdf_styles", _check_pdf_styles, True),
+    ("replica", _check_replica, False),
+]
+
+
+def liveness() -> dict:
+    return {"status": "ok", "pid": os.getpid()}
+
+
+def readiness() -> dict:
+    """Run every check in order; `ready` is False if a required one failed."""
+    ready = True
+    checks = {}
+    for name, check, required in CHECKS:
+        if name == "replica" and database.replica_engine is None:
+            continue
+        started = time.perf_counter()
+        try:
+            result = {"ok": True, **check()}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+            if required:
+                ready = False
+        result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+        result["required"] = required
+        checks[name] = result
+    return {"status": "ready" if ready else "not_ready", "ready": ready, "pid": os.getpid(), "checks": checks}
+
+
+def warm_up() -> dict:
+    """Readiness at worker startup, logging whatever isn't ready yet."""
+    report = readiness()
+    for name, result in report["checks"].items():
+        if not result["ok"]:
+            logger.warning(f"Not ready at startup: {name}: {result['error']}")
+    return report
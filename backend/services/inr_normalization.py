@@ -0,0 +1,110 @@
+# backend/services/inr_normalization.py
+"""
+INR-Normalized Amounts
+
+Invoices and transactions carry an INR amount, so cross-currency analytics
+can sum a single column instead of converting row by row:
+
+  - Transaction.amount_inr = principal_amount * locked fx_rate  (set by the webhook)
+  - Paid Invoice.amount_inr_minor = total_minor * locked fx_rate, in paise
+      (set by the webhook)
+  - Outstanding Invoice.amount_inr_minor = total_minor * snapshot rate
+      (set at creation, refreshed in bulk by refresh_outstanding())
+
+backfill() populates rows written before the columns existed. It runs once
+in migration 011, inside the migration's transaction, and on demand from
+scripts.normalize_inr. Given an engine it works in id-range batches with one
+commit per batch, so it can run against a live database and be resumed at
+any point.
+"""
+
+from contextlib import nullcontext
+from typing import Union
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.engine import Connection, Engine
+
+import models
+from services import fx_engine, money
+
+DEFAULT_BATCH_SIZE = 5000
+
+_invoices = models.Invoice.__table__
+_transactions = models.Transaction.__table__
+
+
+def refresh_outstanding(conn, rates: dict = None) -> int:
+    """Revalue every unpaid invoice at the current snapshot rates: one UPDATE per currency."""
+    rates = rates or fx_engine.get_snapshot_rates()
+    updated = 0
+    for currency, rate in rates.items():
+        result = conn.execute(
+            update(_invoices)
+            .where(_invoices.c.currency == currency, _invoices.c.status != "paid")
+            .values(amount_inr_minor=money.sql_convert(_invoices.c.total_minor, rate, currency))
+        )
+        updated += result.rowcount
+    return updated
+
+
+def _locked_rate(invoice_id_col):
+    # The rate locked by the webhook for this invoice's (first) transaction
+    return (
+        select(_transactions.c.fx_rate)
+        .where(_transactions.c.invoice_id == invoice_id_col)
+        .order_by(_transactions.c.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _batch(bind: Union[Engine, Connection]):
+    # An engine commits every batch; a connection keeps them in its own transaction
+    return bind.begin() if isinstance(bind, Engine) else nullcontext(bind)
+
+
+def _backfill_table(bind: Union[Engine, Connection], table, column, build_updates, batch_size: int):
+    with _batch(bind) as conn:
+        max_id = conn.execute(select(func.max(table.c.id))).scalar()
+    if max_id is None:
+        return 0
+
+    updated = 0
+    for lower in range(0, max_id + 1, batch_size):
+        in_batch = and_(table.c.id >= lower, table.c.id < lower + batch_size, column.is_(None))
+        with _batch(bind) as conn:
+            for stmt in build_updates(in_batch):
+                updated += conn.execute(stmt).rowcount
+    return updated
+
+
+def backfill(bind: Union[Engine, Connection], batch_size: int = DEFAULT_BATCH_SIZE, rates: dict = None) -> dict:
+    """Fill the INR amounts where they are NULL. Returns the number of rows updated per table."""
+    rates = rates or fx_engine.get_snapshot_rates()
+
+    def transaction_updates(in_batch):
+        yield (
+            update(_transactions)
+            .where(in_batch, _transactions.c.fx_rate.isnot(None))
+            .values(amount_inr=func.round(_transactions.c.principal_amount * _transactions.c.fx_rate, 2))
+        )
+
+    def invoice_updates(in_batch):
+        yield (
+            update(_invoices)
+            .where(in_batch, _invoices.c.status == "paid")
+            .values(amount_inr_minor=money.sql_convert(
+                _invoices.c.total_minor, _locked_rate(_invoices.c.id), _invoices.c.currency,
+            ))
+        )
+        for currency, rate in rates.items():
+            yield (
+                update(_invoices)
+                .where(in_batch, _invoices.c.status != "paid", _invoices.c.currency == currency)
+                .values(amount_inr_minor=money.sql_convert(_invoices.c.total_minor, rate, currency))
+            )
+
+    return {
+        "transactions": _backfill_table(bind, _transactions, _transactions.c.amount_inr, transaction_updates, batch_size),
+        "invoices": _backfill_table(bind, _invoices, _invoices.c.amount_inr_minor, invoice_updates, batch_size),
+    }
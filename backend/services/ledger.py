@@ -0,0 +1,271 @@
+# backend/services/ledger.py
+"""
+Double-Entry Ledger
+
+Every money movement is posted as a journal of INR entries whose legs sum
+to zero (debits positive, credits negative):
+
+  payment:<transaction_id>     revenue             -gross (principal * locked rate)
+                               pending_settlement  +net payout
+                               fees                +gross - net - gst
+                               gst                 +GST on the fee
+  settlement:<transaction_id>  pending_settlement  -net payout
+                               settled             +net payout
+
+ledger_entries is append-only (a trigger rejects UPDATE and DELETE on
+Postgres). account_balances holds one running balance per (user, account),
+upserted in the same transaction as the entries, so reading a user's
+balances costs a single indexed lookup regardless of history.
+
+verify() re-sums the ledger in id-ordered chunks inside one snapshot and
+reports balances that drifted from their entries; rebuild_balances() repairs
+them.
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, cast, delete, func, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import models
+
+REVENUE = "revenue"
+PENDING_SETTLEMENT = "pending_settlement"
+SETTLED = "settled"
+FEES = "fees"
+GST = "gst"
+
+# Sign that presents each account's balance as a positive amount (revenue is a credit)
+NORMAL_SIGN = {REVENUE: -1, PENDING_SETTLEMENT: 1, SETTLED: 1, FEES: 1, GST: 1}
+
+VERIFY_CHUNK_SIZE = 10000
+
+_entries = models.LedgerEntry.__table__
+_balances = models.AccountBalance.__table__
+
+
+class UnbalancedJournal(ValueError):
+    pass
+
+
+def install_append_only_guard(conn: Connection):
+    """Reject UPDATE/DELETE on ledger_entries (idempotent)."""
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION ledger_entries_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'ledger_entries is append-only; post a reversing journal instead';
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text("DROP TRIGGER IF EXISTS ledger_entries_append_only ON ledger_entries"))
+    conn.execute(text("""
+        CREATE TRIGGER ledger_entries_append_only
+        BEFORE UPDATE OR DELETE ON ledger_entries
+        FOR EACH ROW EXECUTE FUNCTION ledger_entries_append_only()
+    """))
+
+
+def _upsert_balance(db, owner_id: int, account: str, delta: Decimal, count: int):
+    now = datetime.datetime.utcnow()
+    stmt = pg_insert(_balances).values(
+        owner_id=owner_id, account=account, balance=delta, entry_count=count, updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "account"],
+        set_={
+            "balance": _balances.c.balance + stmt.excluded.balance,
+            "entry_count": _balances.c.entry_count + stmt.excluded.entry_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+
+def post(db: Session, owner_id: int, journals: Iterable[Tuple[str, Optional[int], Dict[str, Decimal]]]):
+    """
+    Append journals of (journal_id, transaction_id, {account: amount}) for one
+    owner and update the running balances. Must run inside the caller's
+    transaction; raises UnbalancedJournal if any journal does not sum to zero.
+    """
+    rows = []
+    deltas: Dict[str, Decimal] = defaultdict(Decimal)
+    counts: Dict[str, int] = defaultdict(int)
+    for journal_id, transaction_id, legs in journals:
+        if sum(legs.values(), Decimal(0)) != 0:
+            raise UnbalancedJournal(f"Journal {journal_id} does not balance: {legs}")
+        for account, amount in legs.items():
+            rows.append({
+                "owner_id": owner_id,
+                "journal_id": journal_id,
+                "account": account,
+                "amount": amount,
+                "transaction_id": transaction_id,
+            })
+            deltas[account] += amount
+            counts[account] += 1
+    if not rows:
+        return
+
+    db.execute(insert(_entries), rows)
+    for account in sorted(deltas):  # fixed order, so concurrent postings lock rows alike
+        _upsert_balance(db, owner_id, account, deltas[account], counts[account])
+
+
+def _payment_legs(gross: Decimal, net: Decimal, gst: Decimal) -> Dict[str, Decimal]:
+    return {REVENUE: -gross, PENDING_SETTLEMENT: net, FEES: gross - net - gst, GST: gst}
+
+
+def record_payment(db: Session, owner_id: int, transaction: models.Transaction):
+    """Post the payment journal for a newly received (flushed) transaction."""
+    net = Decimal(transaction.net_payout_inr)
+    gross = Decimal(transaction.amount_inr if transaction.amount_inr is not None else net)
+    gst = Decimal(transaction.gst_on_fee_inr or 0)
+    post(db, owner_id, [(f"payment:{transaction.id}", transaction.id, _payment_legs(gross, net, gst))])
+
+
+def record_settlements(db: Session, owner_id: int, transactions: List[models.Transaction]):
+    """Post one settlement journal per transaction moved to SETTLED."""
+    post(db, owner_id, [
+        (
+            f"settlement:{tx.id}",
+            tx.id,
+            {PENDING_SETTLEMENT: -Decimal(tx.net_payout_inr), SETTLED: Decimal(tx.net_payout_inr)},
+        )
+        for tx in transactions
+    ])
+
+
+def get_balances(db: Session, owner_id: int) -> dict:
+    """All account balances for a user, presented as positive INR amounts."""
+    rows = db.query(models.AccountBalance).filter(models.AccountBalance.owner_id == owner_id).all()
+    balances = {account: Decimal("0.00") for account in NORMAL_SIGN}
+    updated_at = None
+    for row in rows:
+        balances[row.account] = row.balance * NORMAL_SIGN.get(row.account, 1)
+        updated_at = max(updated_at, row.updated_at) if updated_at else row.updated_at
+    return {"currency": "INR", "balances": balances, "updated_at": updated_at}
+
+
+def backfill_from_transactions(conn: Connection, owner_ids: Optional[List[int]] = None):
+    """
+    Post journals for every transaction received before the ledger existed
+    (set-based: one INSERT ... SELECT per leg), then rebuild the balances.
+    Pass owner_ids to limit it to users that have no journals yet.
+    """
+    tx = models.Transaction.__table__
+    inv = models.Invoice.__table__
+    net = func.coalesce(tx.c.net_payout_inr, tx.c.amount)
+    gross = func.coalesce(tx.c.amount_inr, func.round(tx.c.principal_amount * tx.c.fx_rate, 2), net)
+    gst = func.coalesce(tx.c.gst_on_fee_inr, 0)
+    succeeded = tx.c.status == "succeeded"
+    settled = tx.c.settlement_status == "SETTLED"
+
+    legs = [("payment:", account, amount, succeeded) for account, amount in _payment_legs(gross, net, gst).items()]
+    legs += [
+        ("settlement:", PENDING_SETTLEMENT, -net, succeeded & settled),
+        ("settlement:", SETTLED, net, succeeded & settled),
+    ]
+    for prefix, account, amount, condition in legs:
+        if owner_ids is not None:
+            condition = condition & inv.c.owner_id.in_(owner_ids)
+        conn.execute(insert(_entries).from_select(
+            ["owner_id", "journal_id", "account", "amount", "transaction_id", "created_at"],
+            select(
+                inv.c.owner_id,
+                literal(prefix) + cast(tx.c.id, String),
+                literal(account),
+                amount,
+                tx.c.id,
+                tx.c.processed_at,
+            )
+            .select_from(tx.join(inv, tx.c.invoice_id == inv.c.id))
+            .where(condition),
+        ))
+    rebuild_balances(conn, owner_ids)
+
+
+def rebuild_balances(conn: Connection, owner_ids: Optional[List[int]] = None):
+    """Recompute running balances from the entries (all owners, or some)."""
+    source = select(
+        _entries.c.owner_id,
+        _entries.c.account,
+        func.sum(_entries.c.amount),
+        func.count(),
+        func.max(_entries.c.created_at),
+    ).group_by(_entries.c.owner_id, _entries.c.account)
+    clear = delete(_balances)
+    if owner_ids is not None:
+        source = source.where(_entries.c.owner_id.in_(owner_ids))
+        clear = clear.where(_balances.c.owner_id.in_(owner_ids))
+    conn.execute(clear)
+    conn.execute(insert(_balances).from_select(
+        ["owner_id", "account", "balance", "entry_count", "updated_at"], source,
+    ))
+
+
+def verify(engine: Engine, chunk_size: int = VERIFY_CHUNK_SIZE, owner_id: Optional[int] = None) -> dict:
+    """
+    Re-sum the ledger in id-ordered chunks (constant memory per account) and
+    compare with account_balances. Entries and balances are read from one
+    snapshot, so concurrent postings don't show up as drift.
+    """
+    sums: Dict[Tuple[int, str], Decimal] = defaultdict(Decimal)
+    counts: Dict[Tuple[int, str], int] = defaultdict(int)
+    scanned = 0
+
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn, conn.begin():
+        last_id = 0
+        while True:
+            query = (
+                select(_entries.c.id, _entries.c.owner_id, _entries.c.account, _entries.c.amount)
+                .where(_entries.c.id > last_id)
+                .order_by(_entries.c.id)
+                .limit(chunk_size)
+            )
+            if owner_id is not None:
+                query = query.where(_entries.c.owner_id == owner_id)
+            rows = conn.execute(query).all()
+            if not rows:
+                break
+            for row in rows:
+                key = (row.owner_id, row.account)
+                sums[key] += row.amount
+                counts[key] += 1
+            scanned += len(rows)
+            last_id = rows[-1].id
+
+        balance_query = select(_balances.c.owner_id, _balances.c.account, _balances.c.balance, _balances.c.entry_count)
+        if owner_id is not None:
+            balance_query = balance_query.where(_balances.c.owner_id == owner_id)
+        stored = {(r.owner_id, r.account): (r.balance, r.entry_count) for r in conn.execute(balance_query)}
+
+    drift = []
+    for key in sorted(set(sums) | set(stored)):
+        balance, entry_count = stored.get(key, (Decimal(0), 0))
+        if balance != sums.get(key, Decimal(0)) or entry_count != counts.get(key, 0):
+            drift.append({
+                "owner_id": key[0],
+                "account": key[1],
+                "stored_balance": str(balance),
+                "ledger_balance": str(sums.get(key, Decimal(0))),
+                "stored_entries": entry_count,
+                "ledger_entries": counts.get(key, 0),
+            })
+
+    # Every journal sums to zero, so each owner's accounts must too
+    owner_totals: Dict[int, Decimal] = defaultdict(Decimal)
+    for (owner, _), amount in sums.items():
+        owner_totals[owner] += amount
+    unbalanced = sorted(owner for owner, total in owner_totals.items() if total != 0)
+
+    return {
+        "entries_scanned": scanned,
+        "accounts_checked": len(set(sums) | set(stored)),
+        "drift": drift,
+        "unbalanced_owners": unbalanced,
+    }
@@ -0,0 +1,103 @@
+# backend/services/money.py
+"""
+Money in Integer Minor Units
+
+Invoice amounts are stored as BIGINT minor units of their currency (cents,
+pence, paise). Totals, aggregates and FX conversions are plain integer
+arithmetic: exact, and cheaper for Postgres to SUM than NUMERIC. Decimal
+appears only at the edges, when parsing input or presenting a major amount.
+
+  - to_minor() / to_major(): parse an amount, present one
+  - convert(): FX conversion with a fixed-point rate (RATE_SCALE), rounded
+    half up like the Decimal code it replaces
+  - format_amount(): "1,234.50" straight from the integer, for PDFs
+  - sql_to_major() / sql_convert(): the same conversions in SQL
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+from sqlalchemy import BigInteger, Numeric, case, cast, func, literal
+
+DEFAULT_EXPONENT = 2
+EXPONENTS = {"JPY": 0, "KRW": 0, "BHD": 3, "KWD": 3, "OMR": 3}  # everything else has 2 decimals
+RATE_SCALE = 10_000  # fx rates carry 4 decimal places (Transaction.fx_rate is Numeric(10, 4))
+
+Amount = Union[int, str, float, Decimal]
+
+
+def exponent(currency: Optional[str]) -> int:
+    return EXPONENTS.get(currency.upper(), DEFAULT_EXPONENT) if currency else DEFAULT_EXPONENT
+
+
+def _div_round(numerator: int, denominator: int) -> int:
+    """Integer division rounded half away from zero (ROUND_HALF_UP); denominator > 0."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_minor(amount: Amount, currency: Optional[str]) -> int:
+    """Major units (e.g. "19.99" USD) to minor units (1999), rounded half up."""
+    if isinstance(amount, int):
+        return amount * 10 ** exponent(currency)
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))  # str(): 19.99, not its binary float
+    return int(value.scaleb(exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_major(minor: int, currency: Optional[str]) -> Decimal:
+    return Decimal(minor).scaleb(-exponent(currency))
+
+
+def to_float(minor: Optional[int], currency: Optional[str]) -> float:
+    """For JSON responses that already report floats (analytics)."""
+    return (minor or 0) / 10 ** exponent(currency)
+
+
+def scale_rate(rate: Amount) -> int:
+    """A decimal fx rate as a RATE_SCALE fixed-point integer."""
+    value = rate if isinstance(rate, Decimal) else Decimal(str(rate))
+    return int((value * RATE_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def convert(minor: int, rate: int, from_currency: str, to_currency: str = "INR") -> int:
+    """Convert minor units at a scaled rate (see scale_rate) into the target currency's minor units."""
+    return _div_round(
+        minor * rate * 10 ** exponent(to_currency),
+        RATE_SCALE * 10 ** exponent(from_currency),
+    )
+
+
+def apply_ratio(minor: int, numerator: int, denominator: int) -> int:
+    """minor * numerator / denominator, rounded half up (e.g. 18% GST: apply_ratio(fee, 18, 100))."""
+    return _div_round(minor * numerator, denominator)
+
+
+def format_amount(minor: int, currency: Optional[str], grouping: bool = False) -> str:
+    places = exponent(currency)
+    units, fraction = divmod(abs(minor), 10 ** places)
+    whole = f"{units:,}" if grouping else str(units)
+    sign = "-" if minor < 0 else ""
+    return f"{sign}{whole}.{fraction:0{places}d}" if places else f"{sign}{whole}"
+
+
+def _sql_scale(currency):
+    """10 ** exponent for a currency column (or a fixed currency code)."""
+    if isinstance(currency, str):
+        return literal(10 ** exponent(currency))
+    return case(
+        *[(currency == code, 10 ** places) for code, places in EXPONENTS.items()],
+        else_=10 ** DEFAULT_EXPONENT,
+    )
+
+
+def sql_to_major(minor_column, currency):
+    return cast(minor_column, Numeric) / _sql_scale(currency)
+
+
+def sql_convert(minor_column, rate, from_currency, to_currency: str = "INR"):
+    """SQL for convert() with a decimal rate (a value or a rate column), rounded half away from zero."""
+    return cast(func.round(
+        cast(minor_column, Numeric) * rate * 10 ** exponent(to_currency) / _sql_scale(from_currency)
+    ), BigInteger)
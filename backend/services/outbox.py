@@ -0,0 +1,190 @@
+# backend/services/outbox.py
+"""
+Transactional Outbox & Change Feed
+
+Every payment and settlement change appends an OutboxEvent row in the same
+transaction as the change itself, so downstream consumers (ERP sync,
+dashboards, email notifications) can follow a cursor instead of re-scanning
+invoices and transactions.
+
+Cursor semantics:
+  Ids are allocated before commit, so id order is not commit order: a
+  transaction still in flight can hold a lower id than an event that is
+  already visible. The feed is therefore read in (txid, id) order, and only
+  events written by transactions older than every in-flight transaction
+  (txid < the snapshot's xmin) are returned. Any event that becomes visible
+  later has a txid of at least that xmin, so it always sorts after a cursor
+  already handed out.
+
+  The cursor is the "<txid>-<id>" of the last event a consumer has
+  processed. A plain event id (the earlier cursor format) is still accepted
+  and resumes at the oldest transaction that wrote a later event, which may
+  repeat some events but never skips one.
+"""
+
+import datetime
+from typing import Optional
+
+from sqlalchemy import func, insert, text, tuple_
+from sqlalchemy.orm import Session
+
+import models
+from services import event_bus
+
+MAX_BATCH_SIZE = 1000
+START_CURSOR = "0-0"
+
+
+def record(
+    db: Session,
+    event_type: str,
+    owner_id: int,
+    aggregate_type: str,
+    aggregate_id: int,
+    payment_link_id: Optional[str] = None,
+    data: Optional[dict] = None,
+) -> models.OutboxEvent:
+    """
+    Append an event to the outbox and queue it for SSE subscribers.
+    Must be called before the surrounding transaction commits.
+    """
+    payload = dict(data or {})
+    if payment_link_id:
+        payload["payment_link_id"] = payment_link_id
+
+    outbox_event = models.OutboxEvent(
+        owner_id=owner_id,
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=payload,
+    )
+    outbox_event.txid = func.txid_current()
+    db.add(outbox_event)
+    db.flush()
+
+    event_bus.publish(
+        db,
+        event_type,
+        owner_id=owner_id,
+        payment_link_id=payment_link_id,
+        data={**payload, "event_id": outbox_event.id},
+    )
+    return outbox_event
+
+
+def record_many(db: Session, events, publish: bool = True) -> int:
+    """
+    Bulk record(): append (event_type, owner_id, aggregate_type, aggregate_id,
+    payment_link_id, data) tuples with one INSERT and, unless `publish` is
+    False, queue each for SSE subscribers. Used by batch jobs; returns the
+    number of events written.
+    """
+    if not events:
+        return 0
+    table = models.OutboxEvent.__table__
+    stmt = insert(table)
+    if publish:
+        stmt = stmt.returning(table.c.id, sort_by_parameter_order=True)
+    stmt = stmt.values(txid=func.txid_current())
+    payloads = [
+        {**(data or {}), **({"payment_link_id": payment_link_id} if payment_link_id else {})}
+        for _, _, _, _, payment_link_id, data in events
+    ]
+    now = datetime.datetime.utcnow()
+    result = db.execute(stmt, [
+        {
+            "owner_id": owner_id,
+            "event_type": event_type,
+            "aggregate_type": aggregate_type,
+            "aggregate_id": aggregate_id,
+            "payload": payload,
+            "created_at": now,
+        }
+        for (event_type, owner_id, aggregate_type, aggregate_id, _, _), payload in zip(events, payloads)
+    ])
+    if not publish:
+        return len(events)
+
+    ids = result.scalars().all()
+    event_bus.publish_many(db, [
+        (event_type, owner_id, payment_link_id, {**payload, "event_id": event_id})
+        for (event_type, owner_id, _, _, payment_link_id, _), payload, event_id in zip(events, payloads, ids)
+    ])
+    return len(ids)
+
+
+def format_cursor(txid: int, event_id: int) -> str:
+    return f"{txid}-{event_id}"
+
+
+def parse_cursor(db: Session, owner_id: int, cursor: str, xmin: int = None):
+    """(txid, id) of a feed cursor; raises ValueError if it is malformed."""
+    txid, sep, event_id = cursor.strip().partition("-")
+    if sep:
+        position = (int(txid), int(event_id))
+        if position[0] < 0 or position[1] < 0:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return position
+
+    # A plain event id: resume at the oldest transaction that wrote a later event
+    after = int(txid)
+    if after < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    oldest = db.query(func.min(models.OutboxEvent.txid)).filter(
+        models.OutboxEvent.owner_id == owner_id,
+        models.OutboxEvent.id > after,
+    ).scalar()
+    if oldest is None:
+        oldest = xmin if xmin is not None else _snapshot_xmin(db)
+    return oldest, 0
+
+
+def _snapshot_xmin(db: Session) -> int:
+    return db.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+
+
+def read_feed(db: Session, owner_id: int, after: str = START_CURSOR, limit: int = 100, event_types=None):
+    """
+    Return up to `limit` committed events after the cursor `after`, in (txid, id)
+    order. Returns (events, next_cursor, has_more); raises ValueError for a
+    malformed cursor.
+    """
+    limit = max(1, min(limit, MAX_BATCH_SIZE))
+    xmin = _snapshot_xmin(db)
+    position = parse_cursor(db, owner_id, after, xmin)
+
+    event = models.OutboxEvent
+    query = db.query(event).filter(
+        event.owner_id == owner_id,
+        event.txid < xmin,
+        tuple_(event.txid, event.id) > tuple_(*position),
+    )
+    if event_types:
+        query = query.filter(event.event_type.in_(event_types))
+    rows = query.order_by(event.txid, event.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = format_cursor(rows[-1].txid, rows[-1].id) if rows else format_cursor(*position)
+    return rows, next_cursor, has_more
+
+
+def get_checkpoint(db: Session, owner_id: int, consumer: str):
+    return db.query(models.EventConsumerCheckpoint).filter(
+        models.EventConsumerCheckpoint.owner_id == owner_id,
+        models.EventConsumerCheckpoint.consumer == consumer,
+    ).first()
+
+
+def save_checkpoint(db: Session, owner_id: int, consumer: str, cursor: str):
+    checkpoint = get_checkpoint(db, owner_id, consumer)
+    if checkpoint is None:
+        checkpoint = models.EventConsumerCheckpoint(owner_id=owner_id, consumer=consumer, cursor=cursor)
+        db.add(checkpoint)
+    else:
+        checkpoint.cursor = cursor
+    db.commit()
+    db.refresh(checkpoint)
+    return checkpoint
+
@@ -0,0 +1,124 @@
+# backend/services/partitions.py
+"""
+Monthly Partitions for `transactions`
+
+`transactions` is range-partitioned by `processed_at`, one
+partition per calendar month (transactions_pYYYYMM), plus a DEFAULT
+partition that catches anything outside the prepared months so an insert
+never fails.
+
+  - ensure_transaction_partitions() creates the partitions for the months
+    ahead. It runs at bootstrap (init_db.py) and from the
+    scripts.partitions maintenance command.
+  - detach_transaction_partitions() detaches months older than the retention
+    horizon. The detached tables stay in place as plain tables, available for
+    archival, unless drop=True.
+
+Queries that filter on a processed_at range only scan the matching months.
+"""
+
+import datetime
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARENT_TABLE = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+MONTHS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(r"^transactions_p(\d{4})(\d{2})$")
+
+
+def month_start(d: datetime.date) -> datetime.date:
+    return datetime.date(d.year, d.month, 1)
+
+
+def add_months(d: datetime.date, months: int) -> datetime.date:
+    index = d.year * 12 + (d.month - 1) + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def list_partitions(conn: Connection):
+    """Names of the partitions currently attached to `transactions`."""
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+        ORDER BY c.relname
+    """), {"parent": PARENT_TABLE})
+    return [r[0] for r in rows]
+
+
+def ensure_transaction_partitions(conn: Connection, start: datetime.date = None, months_ahead: int = MONTHS_AHEAD):
+    """
+    Create the default partition and one partition per month from `start`
+    (default: this month) through `months_ahead` months ahead. Idempotent.
+    Returns the names of the partitions created.
+    """
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+    existing = set(list_partitions(conn))
+    this_month = month_start(datetime.datetime.utcnow().date())
+    month = month_start(start) if start else this_month
+    last = add_months(this_month, months_ahead)
+
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            _create_partition(conn, name, month, add_months(month, 1))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _create_partition(conn: Connection, name: str, lower: datetime.date, upper: datetime.date):
+    bounds = f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    in_default = conn.execute(
+        text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE processed_at >= :lower AND processed_at < :upper LIMIT 1"),
+        {"lower": lower, "upper": upper},
+    ).first()
+    if in_default is None:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}"))
+        return
+
+    # Rows for this month already landed in the default partition: move them into
+    # a standalone table first, then attach it (a plain CREATE ... PARTITION OF
+    # would fail the default partition's constraint check).
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE processed_at >= :lower AND processed_at < :upper
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"lower": lower, "upper": upper})
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}"))
+
+
+def detach_transaction_partitions(conn: Connection, keep_months: int, drop: bool = False):
+    """
+    Detach monthly partitions that end before the first of the month `keep_months`
+    months ago. Returns the names of the partitions detached (or dropped).
+    """
+    horizon = add_months(month_start(datetime.datetime.utcnow().date()), -keep_months)
+    detached = []
+    for name in list_partitions(conn):
+        match = _PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(month, 1) <= horizon:
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+    return detached
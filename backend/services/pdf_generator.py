@@ -1,76 +1,174 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+# ReportLab is imported inside the generators: it is only needed for downloads
+# and importing it at module level adds noticeably to every worker's boot time.
+import functools
+import itertools
+import tempfile
+from xml.sax.saxutils import escape
 from io import BytesIO
 from datetime import datetime
 import models
+from services import money, tracing
+
+ITEM_ROWS_PER_TABLE = 100  # line items per Table flowable (layout and page splits stay per-chunk)
+ITEM_COL_WIDTHS = (216, 64, 94, 94)  # points, fixed so the chunks line up (6.5in of letter width)
+SPOOL_MAX_BYTES = 1024 * 1024  # rendered PDFs larger than this go to a temp file instead of memory
+STREAM_CHUNK_BYTES = 64 * 1024
+FLOWABLE_LOOKAHEAD = 4  # flowables pulled ahead of the layout (room for keepWithNext and splits)
+
+def warm_up():
+    """
+    Import ReportLab and build the styles ahead of the first download. Called in
+    the gunicorn master when preloading, so every worker shares them copy-on-write.
+    """
+    from reportlab.pdfgen import canvas  # noqa: F401
+    from reportlab.platypus import SimpleDocTemplate, Table  # noqa: F401
+    _styles()
+
+def styles_ready() -> bool:
+    return _styles.cache_info().currsize > 0
+
+@functools.lru_cache(maxsize=None)
+def _styles():
+    """Paragraph and table styles, built once per process rather than per document."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    sheet = getSampleStyleSheet()
+    body = [
+        ('BACKGROUND', (0, 0), (-1, -1), colors.beige),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]
+    header = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ]
+    return {
+        "title": sheet['Title'],
+        "heading": sheet['Heading3'],
+        "normal": sheet['Normal'],
+        "first_table": TableStyle(body + header),
+        "next_table": TableStyle(body),
+    }
+
+@functools.lru_cache(maxsize=None)
+def _streaming_doc_template():
+    """SimpleDocTemplate whose build() takes an iterable and pulls flowables as the layout needs them."""
+    from reportlab.platypus import SimpleDocTemplate
+
+    class StreamingDocTemplate(SimpleDocTemplate):
+        def build(self, flowables, *args, **kwargs):
+            # ReportLab lays out from the front of a list and stops once it is empty;
+            # filterFlowables() runs before each one is handled and keeps it topped up
+            self._pending = iter(flowables)
+            self._queue = list(itertools.islice(self._pending, FLOWABLE_LOOKAHEAD))
+            super().build(self._queue, *args, **kwargs)
+
+        def filterFlowables(self, flowables):
+            # Also called for ReportLab's internal lists (page-begin actions); leave those alone
+            if flowables is self._queue and len(flowables) < FLOWABLE_LOOKAHEAD:
+                flowables.extend(itertools.islice(self._pending, FLOWABLE_LOOKAHEAD - len(flowables)))
+
+    return StreamingDocTemplate
 
 def get_currency_symbol(currency: str):
     symbols = {"EUR": "€", "GBP": "£", "USD": "$"}
     return symbols.get(currency.upper(), "$")
 
-def generate_invoice_pdf(invoice: models.Invoice):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+def _item_tables(items, currency: str, symbol: str, total_minor: int):
+    """The line items as a run of fixed-width tables of ITEM_ROWS_PER_TABLE rows each."""
+    from reportlab.platypus import Paragraph, Table
+
+    styles = _styles()
+    rows = [['Description', 'Quantity', 'Unit Price', 'Total']]
+    first = True
+    for description, quantity, unit_price_minor in items:
+        rows.append([
+            # A Paragraph wraps within the fixed column instead of running past it
+            Paragraph(escape(description or ""), styles['normal']),
+            str(quantity),
+            f"{symbol}{money.format_amount(unit_price_minor, currency)}",
+            f"{symbol}{money.format_amount(quantity * unit_price_minor, currency)}"
+        ])
+        if len(rows) >= ITEM_ROWS_PER_TABLE:
+            yield Table(rows, colWidths=ITEM_COL_WIDTHS, style=styles["first_table" if first else "next_table"])
+            rows, first = [], False
+
+    # Total Row
+    rows.append(['', '', 'Total', f"{symbol}{money.format_amount(total_minor, currency)}"])
+    yield Table(rows, colWidths=ITEM_COL_WIDTHS, style=styles["first_table" if first else "next_table"])
+
+@tracing.traced("pdf.generate_invoice")
+def generate_invoice_pdf(invoice: models.Invoice, items=None):
+    """
+    Render the invoice into a spooled file (in memory up to SPOOL_MAX_BYTES) and
+    return it rewound. `items` is an iterable of (description, quantity,
+    unit_price_minor) rows, e.g. crud.iter_invoice_item_rows(); defaults to
+    invoice.items. Items are read and laid out one table at a time, so only a
+    few tables' worth of flowables exist at once; ReportLab still keeps the
+    finished (compressed) pages in memory until the document is saved.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import Paragraph, Spacer
+
+    if items is None:
+        items = ((item.description, item.quantity, item.unit_price_minor) for item in invoice.items)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    doc = _streaming_doc_template()(buffer, pagesize=letter)
     elements = []
-    styles = getSampleStyleSheet()
+    styles = _styles()
     symbol = get_currency_symbol(invoice.currency)
 
     # Header
-    elements.append(Paragraph(f"INVOICE #{invoice.id}", styles['Title']))
+    elements.append(Paragraph(f"INVOICE #{invoice.id}", styles['title']))
     elements.append(Spacer(1, 12))
 
     # Business Info (Seller)
     if invoice.owner.business_name:
-        elements.append(Paragraph(f"From: {invoice.owner.business_name}", styles['Heading3']))
+        elements.append(Paragraph(f"From: {invoice.owner.business_name}", styles['heading']))
         if invoice.owner.gstin:
-            elements.append(Paragraph(f"GSTIN: {invoice.owner.gstin}", styles['Normal']))
-        elements.append(Paragraph(f"{invoice.owner.business_address}", styles['Normal']))
+            elements.append(Paragraph(f"GSTIN: {invoice.owner.gstin}", styles['normal']))
+        elements.append(Paragraph(f"{invoice.owner.business_address}", styles['normal']))
         elements.append(Spacer(1, 12))
 
     # Client Info (Buyer)
-    elements.append(Paragraph(f"Bill To: {invoice.client.name}", styles['Heading3']))
-    elements.append(Paragraph(f"{invoice.client.address}", styles['Normal']))
+    elements.append(Paragraph(f"Bill To: {invoice.client.name}", styles['heading']))
+    elements.append(Paragraph(f"{invoice.client.address}", styles['normal']))
     elements.append(Spacer(1, 12))
 
-
-    # Items Table
-    data = [['Description', 'Quantity', 'Unit Price', 'Total']]
-    for item in invoice.items:
-        data.append([
-            item.description,
-            str(item.quantity),
-            f"{symbol}{item.unit_price:.2f}",
-            f"{symbol}{(item.quantity * item.unit_price):.2f}"
-        ])
-    
-    # Total Row
-    data.append(['', '', 'Total', f"{symbol}{invoice.total_amount:.2f}"])
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 24))
+    # Items: one big Table is re-measured on every page split (quadratic in the
+    # row count), so it is emitted in chunks, generated as the layout reaches them
+    item_tables = _item_tables(items, invoice.currency, symbol, invoice.total_minor)
+    footer = [Spacer(1, 24)]
 
     # LUT Declaration
-    elements.append(Paragraph("<b>Declaration:</b> Supply of services intended for export under Bond or Letter of Undertaking (LUT) without payment of integrated tax.", styles['Normal']))
+    footer.append(Paragraph("<b>Declaration:</b> Supply of services intended for export under Bond or Letter of Undertaking (LUT) without payment of integrated tax.", styles['normal']))
 
 
-    doc.build(elements)
+    doc.build(itertools.chain(elements, item_tables, footer))
     buffer.seek(0)
     return buffer
 
+def iter_file(buffer, chunk_size: int = STREAM_CHUNK_BYTES):
+    """Yield a rendered document in chunks for a StreamingResponse, then close it."""
+    try:
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        buffer.close()
+
+@tracing.traced("pdf.generate_fira")
 def generate_fira_pdf(invoice: models.Invoice, transaction: models.Transaction = None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -119,7 +217,7 @@ def generate_fira_pdf(invoice: models.Invoice, transaction: models.Transaction =
     line_y = y
     details = [
         ("Invoice Reference", f"#{invoice.id}"),
-        ("Principal Amount", f"{symbol}{invoice.total_amount:.2f} {invoice.currency}"),
+        ("Principal Amount", f"{symbol}{money.format_amount(invoice.total_minor, invoice.currency)} {invoice.currency}"),
     ]
     
     if transaction:
@@ -0,0 +1,366 @@
+# backend/services/reconciliation.py
+"""
+Auto-Reconciliation Engine
+
+Bank credits often arrive with a mangled or missing reference, so an exact
+payment_link_id lookup fails. This engine matches such a credit against the
+receiving owner's open invoices by:
+
+  - receiving virtual account  -> which owner's invoices to search
+  - currency + amount          -> candidate bucket (within AMOUNT_TOLERANCE)
+  - sender_name vs Client.name -> name similarity after normalization
+  - reference vs payment_link_id -> partial reference similarity
+
+Open invoices are kept in a per-owner in-memory index, bucketed by currency
+and amount in minor units, so a lookup only scores the few invoices with a
+matching amount. The index is a cache: it is loaded lazily per owner,
+expires after INDEX_TTL_SECONDS, is invalidated locally when invoices are
+created, and is reloaded once on a miss in case another worker created the
+invoice. Every match is re-checked against the database before it is used.
+
+A credit is matched only when the best candidate is similar enough and
+clearly ahead of the runner-up; otherwise it goes to the review queue
+(UnmatchedCredit) with the best candidates attached as suggestions. A credit
+to an account nobody holds yet is queued without an owner: it is claimed by
+whoever is assigned the account (claim_orphans), or handed to an owner by an
+operator (assign_owner, see scripts/unmatched_credits.py).
+"""
+
+import bisect
+import datetime
+import os
+import re
+import threading
+import time
+from decimal import Decimal
+from difflib import SequenceMatcher
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import models
+from services import money, outbox
+
+INDEX_TTL_SECONDS = float(os.getenv("RECONCILIATION_INDEX_TTL_SECONDS", "300"))
+MISS_RELOAD_SECONDS = float(os.getenv("RECONCILIATION_MISS_RELOAD_SECONDS", "2"))
+AMOUNT_TOLERANCE = Decimal(os.getenv("RECONCILIATION_AMOUNT_TOLERANCE", "0.01"))  # 1%: intermediary bank fees
+MIN_SIMILARITY = float(os.getenv("RECONCILIATION_MIN_SIMILARITY", "0.85"))
+MIN_MARGIN = float(os.getenv("RECONCILIATION_MIN_MARGIN", "0.1"))
+MIN_REFERENCE_OVERLAP = 8  # characters of a payment_link_id found in the reference
+MAX_SUGGESTIONS = 5
+
+_LEGAL_SUFFIXES = {
+    "the", "inc", "llc", "llp", "ltd", "limited", "corp", "corporation", "co", "company",
+    "gmbh", "plc", "pvt", "private", "sa", "sas", "bv", "ag", "pty",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, strip punctuation and legal suffixes, sort tokens ("ACME Corp." == "acme")."""
+    tokens = _NON_ALNUM.sub(" ", (name or "").lower()).split()
+    return " ".join(sorted(t for t in tokens if t not in _LEGAL_SUFFIXES))
+
+
+def _normalize_reference(reference: Optional[str]) -> str:
+    return _NON_ALNUM.sub("", (reference or "").lower())
+
+
+def _similarity_to(matcher: SequenceMatcher, a: str) -> float:
+    b = matcher.b
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    matcher.set_seq1(a)
+    return matcher.ratio()
+
+
+def _reference_similarity(matcher: SequenceMatcher, link: str) -> float:
+    ref = matcher.b
+    if not ref or not link:
+        return 0.0
+    if link in ref:
+        return 1.0
+    matcher.set_seq1(link)
+    # Payment link ids are random tokens, so a long shared run means a truncated or wrapped reference
+    if matcher.find_longest_match(0, len(link), 0, len(ref)).size >= MIN_REFERENCE_OVERLAP:
+        return 1.0
+    return matcher.ratio()
+
+
+class OpenInvoice(NamedTuple):
+    invoice_id: int
+    currency: str
+    amount: int  # minor units
+    client_name: str  # normalized
+    reference: str  # normalized payment_link_id
+
+
+class Candidate(NamedTuple):
+    invoice_id: int
+    score: float
+    name_similarity: float
+    reference_similarity: float
+    amount_delta: Decimal
+
+
+class _OwnerIndex:
+    # Copy-on-write: discard() builds new dicts and swaps them in as one tuple,
+    # so in_range() can iterate a snapshot without taking the index lock.
+    def __init__(self, invoices: List[OpenInvoice]):
+        self.loaded_at = time.monotonic()
+        buckets: Dict[str, Dict[int, List[OpenInvoice]]] = {}
+        for invoice in invoices:
+            buckets.setdefault(invoice.currency, {}).setdefault(invoice.amount, []).append(invoice)
+        amounts = {currency: sorted(bucket) for currency, bucket in buckets.items()}
+        self._state = (buckets, amounts)
+
+    def in_range(self, currency: str, low: int, high: int):
+        buckets, amounts = self._state
+        sorted_amounts = amounts.get(currency, [])
+        bucket = buckets.get(currency, {})
+        for amount in sorted_amounts[bisect.bisect_left(sorted_amounts, low):bisect.bisect_right(sorted_amounts, high)]:
+            yield from bucket[amount]
+
+    def discard(self, invoice_id: int):
+        """Drop an invoice; call with OpenInvoiceIndex._lock held."""
+        buckets, amounts = self._state
+        for currency, bucket in buckets.items():
+            for amount, invoices in bucket.items():
+                remaining = [i for i in invoices if i.invoice_id != invoice_id]
+                if len(remaining) == len(invoices):
+                    continue
+                new_bucket = dict(bucket)
+                if remaining:
+                    new_bucket[amount] = remaining
+                else:
+                    del new_bucket[amount]
+                    amounts = {**amounts, currency: [a for a in amounts[currency] if a != amount]}
+                self._state = ({**buckets, currency: new_bucket}, amounts)
+                return
+
+
+class OpenInvoiceIndex:
+    """Per-owner cache of open (unpaid) invoices, bucketed by currency and amount."""
+
+    def __init__(self):
+        self._owners: Dict[int, _OwnerIndex] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, owner_id: int) -> _OwnerIndex:
+        rows = (
+            db.query(
+                models.Invoice.id,
+                models.Invoice.currency,
+                models.Invoice.total_minor,
+                models.Invoice.payment_link_id,
+                models.Client.name,
+            )
+            .join(models.Client, models.Client.id == models.Invoice.client_id)
+            .filter(models.Invoice.owner_id == owner_id, models.Invoice.status != "paid")
+            .all()
+        )
+        index = _OwnerIndex([
+            OpenInvoice(id, currency, total or 0, normalize_name(name), _normalize_reference(link))
+            for id, currency, total, link, name in rows
+        ])
+        with self._lock:
+            self._owners[owner_id] = index
+        return index
+
+    def get(self, db: Session, owner_id: int, max_age: float = INDEX_TTL_SECONDS) -> _OwnerIndex:
+        index = self._owners.get(owner_id)
+        if index is None or time.monotonic() - index.loaded_at > max_age:
+            index = self._load(db, owner_id)
+        return index
+
+    def invalidate(self, owner_id: int):
+        with self._lock:
+            self._owners.pop(owner_id, None)
+
+    def discard(self, owner_id: int, invoice_id: int):
+        with self._lock:
+            index = self._owners.get(owner_id)
+            if index is not None:
+                index.discard(invoice_id)
+
+    def clear(self):
+        with self._lock:
+            self._owners.clear()
+
+
+open_invoices = OpenInvoiceIndex()
+
+
+def find_owner(db: Session, account_number: Optional[str]) -> Optional[int]:
+    """Owner of the receiving virtual account, if known."""
+    if not account_number:
+        return None
+    return (
+        db.query(models.VirtualAccount.user_id)
+        .filter(models.VirtualAccount.account_number == account_number)
+        .scalar()
+    )
+
+
+def score_candidates(index: _OwnerIndex, sender_name: str, amount: Decimal, currency: str,
+                     reference: Optional[str] = None, tolerance: Decimal = AMOUNT_TOLERANCE) -> List[Candidate]:
+    """Open invoices within the amount tolerance, best first."""
+    target = money.to_minor(amount, currency)
+    spread = int(target * tolerance)
+    ref = _normalize_reference(reference)
+    # SequenceMatcher caches its analysis of the second sequence, so reuse one per credit
+    name_matcher = SequenceMatcher(None, "", normalize_name(sender_name))
+    ref_matcher = SequenceMatcher(None, "", ref)
+
+    candidates = []
+    for invoice in index.in_range(currency, target - spread, target + spread):
+        name_score = _similarity_to(name_matcher, invoice.client_name)
+        ref_score = _reference_similarity(ref_matcher, invoice.reference)
+        closeness = 1.0 - abs(invoice.amount - target) / spread if spread else 1.0
+        candidates.append(Candidate(
+            invoice_id=invoice.invoice_id,
+            score=round(0.7 * max(name_score, ref_score) + 0.3 * closeness, 4),
+            name_similarity=round(name_score, 4),
+            reference_similarity=round(ref_score, 4),
+            amount_delta=money.to_major(invoice.amount - target, currency),
+        ))
+    candidates.sort(key=lambda c: c.score, reverse=True)
+    return candidates
+
+
+def _is_confident(candidates: List[Candidate]) -> bool:
+    if not candidates:
+        return False
+    best = candidates[0]
+    if max(best.name_similarity, best.reference_similarity) < MIN_SIMILARITY:
+        return False
+    return len(candidates) == 1 or best.score - candidates[1].score >= MIN_MARGIN
+
+
+def match_credit(db: Session, owner_id: int, sender_name: str, amount: Decimal, currency: str,
+                 reference: Optional[str] = None):
+    """
+    Best open invoice for a credit, locked for update, or None.
+    Returns (invoice, candidates); candidates are kept as review suggestions.
+    """
+    def search(index):
+        # Exact amount first (a handful of invoices); widen to the tolerance only if that is not conclusive
+        candidates = score_candidates(index, sender_name, amount, currency, reference, tolerance=Decimal(0))
+        if _is_confident(candidates):
+            return candidates
+        return score_candidates(index, sender_name, amount, currency, reference)
+
+    index = open_invoices.get(db, owner_id)
+    candidates = search(index)
+    if not _is_confident(candidates) and time.monotonic() - index.loaded_at > MISS_RELOAD_SECONDS:
+        # The invoice may have been created on another worker since the index was loaded
+        candidates = search(open_invoices.get(db, owner_id, max_age=0))
+
+    while _is_confident(candidates):
+        invoice = (
+            db.query(models.Invoice)
+            .filter(models.Invoice.id == candidates[0].invoice_id, models.Invoice.owner_id == owner_id)
+            .with_for_update()
+            .first()
+        )
+        if invoice is not None and invoice.status != "paid":
+            return invoice, candidates
+        # Paid since the index was loaded (e.g. on another worker)
+        open_invoices.discard(owner_id, candidates[0].invoice_id)
+        candidates = candidates[1:]
+    return None, candidates
+
+
+def queue_for_review(db: Session, owner_id: Optional[int], account_number: Optional[str], sender_name: str,
+                     amount: Decimal, currency: str, reference: Optional[str],
+                     candidates: List[Candidate]) -> models.UnmatchedCredit:
+    credit = models.UnmatchedCredit(
+        owner_id=owner_id,
+        account_number=account_number,
+        sender_name=sender_name,
+        amount=amount,
+        currency=currency,
+        reference=reference,
+        suggestions=[
+            {
+                "invoice_id": c.invoice_id,
+                "score": c.score,
+                "name_similarity": c.name_similarity,
+                "reference_similarity": c.reference_similarity,
+                "amount_delta": str(c.amount_delta),
+            }
+            for c in candidates[:MAX_SUGGESTIONS]
+        ],
+        status="pending",
+    )
+    db.add(credit)
+    db.flush()
+    return credit
+
+
+def unmatched_event(credit, suggested_invoice_ids=()) -> tuple:
+    """The credit.unmatched change-feed event of a queued credit, as an outbox.record_many() tuple."""
+    return (
+        "credit.unmatched", credit.owner_id, "unmatched_credit", credit.id, None,
+        {
+            "unmatched_credit_id": credit.id,
+            "sender_name": credit.sender_name,
+            "currency": credit.currency,
+            "amount": str(credit.amount),
+            "suggested_invoice_ids": list(suggested_invoice_ids),
+        },
+    )
+
+
+def claim_orphans(db: Session, account_numbers: Optional[List[str]] = None) -> int:
+    """
+    Hand pending credits that were queued without an owner (their receiving
+    account was not assigned yet) to the owner the account now has, so they
+    reach that owner's review queue. Limited to `account_numbers` if given.
+    Runs in the caller's transaction; returns the number of credits claimed.
+    """
+    credits = models.UnmatchedCredit.__table__
+    accounts = models.VirtualAccount.__table__
+    stmt = (
+        update(credits)
+        .where(
+            credits.c.owner_id.is_(None),
+            credits.c.status == "pending",
+            credits.c.account_number == accounts.c.account_number,
+        )
+        .values(owner_id=accounts.c.user_id)
+        .returning(credits.c.id, credits.c.owner_id, credits.c.sender_name, credits.c.currency, credits.c.amount)
+    )
+    if account_numbers is not None:
+        stmt = stmt.where(accounts.c.account_number.in_(account_numbers))
+    claimed = db.execute(stmt).all()
+    outbox.record_many(db, [unmatched_event(c) for c in claimed])
+    return len(claimed)
+
+
+def assign_owner(db: Session, credit_id: int, owner_id: int) -> models.UnmatchedCredit:
+    """
+    Operator path for a pending credit nobody could be identified for: put it
+    in `owner_id`'s review queue. Raises ValueError unless the credit is
+    pending and has no owner yet. Runs in the caller's transaction.
+    """
+    credit = db.execute(
+        select(models.UnmatchedCredit).where(models.UnmatchedCredit.id == credit_id).with_for_update()
+    ).scalar_one_or_none()
+    if credit is None:
+        raise ValueError(f"Unmatched credit {credit_id} not found")
+    if credit.owner_id is not None or credit.status != "pending":
+        raise ValueError(f"Unmatched credit {credit_id} is already {'assigned' if credit.owner_id else credit.status}")
+    credit.owner_id = owner_id
+    db.flush()
+    outbox.record(db, *unmatched_event(credit))
+    return credit
+
+
+def resolve(credit: models.UnmatchedCredit, status: str, invoice_id: Optional[int] = None):
+    credit.status = status
+    credit.invoice_id = invoice_id
+    credit.resolved_at = datetime.datetime.utcnow()
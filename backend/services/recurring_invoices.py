@@ -0,0 +1,205 @@
+# backend/services/recurring_invoices.py
+"""
+Recurring Invoice Generation
+
+A recurring template (client, currency, items, frequency) produces one
+invoice per period. The scheduler generates every due invoice in set-based
+batches of templates, one transaction per batch:
+
+  1. lock the next batch of due templates (active, next_run_date <= as-of)
+  2. one bulk INSERT of invoices (payment_link_ids generated for the whole
+     batch up front), skipping periods that already have an invoice
+  3. one INSERT ... SELECT copying the template items onto the new invoices
+  4. advance next_run_date (one UPDATE per distinct next date)
+  5. bulk outbox events, and the run checkpoint
+
+Idempotency: invoices carry (template_id, period_start) under a unique
+constraint, so a re-run, a resumed run or two overlapping runs can never
+create a second invoice for the same period. A template that fell behind
+catches up on up to MAX_CATCH_UP_PERIODS periods per run.
+
+The job pauses BATCH_PAUSE_SECONDS between batches, so a large run on the
+1st of the month leaves room for interactive traffic on the primary.
+"""
+
+import calendar
+import datetime
+import os
+import secrets
+import time
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import database
+import models
+from services import batch_jobs, event_bus, fx_engine, money, outbox, partitions, reconciliation
+
+JOB_NAME = "recurring_invoices"
+FREQUENCY_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}  # plus "weekly"
+MAX_CATCH_UP_PERIODS = 12
+DEFAULT_BATCH_SIZE = int(os.getenv("RECURRING_BATCH_SIZE", "500"))
+BATCH_PAUSE_SECONDS = float(os.getenv("RECURRING_BATCH_PAUSE_SECONDS", "0.1"))
+SUMMARY_MAX_IDS = 100  # invoice ids listed in a live "invoices.generated" event
+INTERVAL_SECONDS = float(os.getenv("RECURRING_JOB_INTERVAL_SECONDS", "0"))  # 0 disables the in-process scheduler
+
+_templates = models.RecurringInvoiceTemplate.__table__
+_template_items = models.RecurringInvoiceTemplateItem.__table__
+_invoices = models.Invoice.__table__
+_items = models.InvoiceItem.__table__
+
+
+def next_period(start_date: datetime.date, period: datetime.date, frequency: str) -> datetime.date:
+    """Start of the period after `period`, keeping the template's day of month (clamped to month end)."""
+    if frequency == "weekly":
+        return period + datetime.timedelta(days=7)
+    first = partitions.add_months(partitions.month_start(period), FREQUENCY_MONTHS[frequency])
+    return first.replace(day=min(start_date.day, calendar.monthrange(first.year, first.month)[1]))
+
+
+def _insert_invoices(db: Session, rows):
+    stmt = pg_insert(_invoices)
+    stmt = stmt.on_conflict_do_nothing(index_elements=["template_id", "period_start"]).returning(
+        _invoices.c.id, _invoices.c.owner_id, _invoices.c.payment_link_id, _invoices.c.template_id,
+        _invoices.c.period_start,
+    )
+    return db.execute(stmt, rows).all()
+
+
+def _generate_batch(db: Session, job_run: models.BatchJobRun, batch_size: int, rates: dict):
+    """Generate the invoices for one batch of due templates. Returns (templates, invoices created)."""
+    as_of = job_run.as_of
+    templates = db.execute(
+        select(_templates)
+        .where(_templates.c.active.is_(True), _templates.c.next_run_date <= as_of)
+        .order_by(_templates.c.next_run_date, _templates.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not templates:
+        return 0, 0
+
+    template_ids = [t.id for t in templates]
+    totals = dict(db.execute(
+        select(_template_items.c.template_id, func.sum(_template_items.c.quantity * _template_items.c.unit_price_minor))
+        .where(_template_items.c.template_id.in_(template_ids))
+        .group_by(_template_items.c.template_id)
+    ).all())
+
+    invoice_rows = []
+    advances = defaultdict(list)  # next_run_date -> template ids
+    for t in templates:
+        total = int(totals.get(t.id) or 0)
+        rate = rates.get(t.currency)
+        period = t.next_run_date
+        for _ in range(MAX_CATCH_UP_PERIODS):
+            if period > as_of or (t.end_date is not None and period > t.end_date):
+                break
+            invoice_rows.append({
+                "status": "draft",
+                "due_date": period + datetime.timedelta(days=t.due_days),
+                "currency": t.currency,
+                "total_minor": total,
+                "amount_inr_minor": fx_engine.to_inr_minor(total, t.currency, rate) if rate is not None else None,
+                "client_id": t.client_id,
+                "owner_id": t.owner_id,
+                "template_id": t.id,
+                "period_start": period,
+            })
+            period = next_period(t.start_date, period, t.frequency)
+        finished = t.end_date is not None and period > t.end_date
+        advances[None if finished else period].append(t.id)
+
+    # Payment links for the whole batch in one pass
+    for row, token in zip(invoice_rows, (secrets.token_urlsafe(16) for _ in invoice_rows)):
+        row["payment_link_id"] = token
+
+    created = _insert_invoices(db, invoice_rows) if invoice_rows else []
+    created_ids = [r.id for r in created]
+    if created_ids:
+        db.execute(insert(_items).from_select(
+            ["description", "quantity", "unit_price_minor", "invoice_id"],
+            select(_template_items.c.description, _template_items.c.quantity, _template_items.c.unit_price_minor, _invoices.c.id)
+            .select_from(_template_items.join(_invoices, _invoices.c.template_id == _template_items.c.template_id))
+            .where(_invoices.c.id.in_(created_ids)),
+        ))
+
+    # Templates in a batch mostly share their next date: one UPDATE per distinct date
+    for next_run_date, ids in advances.items():
+        db.execute(update(_templates).where(_templates.c.id.in_(ids)).values(next_run_date=next_run_date))
+
+    outbox.record_many(db, [
+        (
+            "invoice.created", r.owner_id, "invoice", r.id, r.payment_link_id,
+            {"invoice_id": r.id, "template_id": r.template_id, "period_start": r.period_start.isoformat()},
+        )
+        for r in created
+    ], publish=False)
+    by_owner = defaultdict(list)
+    for r in created:
+        by_owner[r.owner_id].append(r.id)
+    event_bus.publish_many(db, [
+        ("invoices.generated", owner_id, None, {"count": len(owner_ids), "invoice_ids": owner_ids[:SUMMARY_MAX_IDS]})
+        for owner_id, owner_ids in by_owner.items()
+    ])
+
+    batch_jobs.checkpoint(db, job_run, {"template_id": template_ids[-1]}, len(created_ids))
+    db.commit()
+
+    for owner_id in by_owner:
+        reconciliation.open_invoices.invalidate(owner_id)
+    return len(templates), len(created_ids)
+
+
+def run(as_of: Optional[datetime.date] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+        pause: float = BATCH_PAUSE_SECONDS, resume: bool = True, engine=None) -> Optional[dict]:
+    """
+    Generate every recurring invoice whose period starts on or before `as_of`
+    (default: today, UTC). Returns a summary, or None if another process is
+    already running the job.
+    """
+    engine = engine or database.engine
+    as_of = as_of or datetime.datetime.utcnow().date()
+
+    with batch_jobs.exclusive(engine, JOB_NAME) as acquired:
+        if not acquired:
+            return None
+
+        started = time.perf_counter()
+        rates = {currency: money.scale_rate(rate) for currency, rate in fx_engine.get_snapshot_rates().items()}
+        with Session(bind=engine) as db:
+            job_run = batch_jobs.start_or_resume(db, JOB_NAME, as_of, resume=resume)
+            resumed_from = job_run.processed or 0
+            templates = batches = 0
+            try:
+                while True:
+                    batch_templates, _ = _generate_batch(db, job_run, batch_size, rates)
+                    if not batch_templates:
+                        break
+                    templates += batch_templates
+                    batches += 1
+                    if pause:
+                        time.sleep(pause)
+            except Exception as e:
+                db.rollback()
+                batch_jobs.finish(db, job_run, "failed", error=str(e))
+                raise
+            batch_jobs.finish(db, job_run)
+
+            return {
+                "run_id": job_run.id,
+                "as_of": job_run.as_of.isoformat(),
+                "resumed_from": resumed_from,
+                "processed": job_run.processed - resumed_from,
+                "templates": templates,
+                "batches": batches,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+
+
+def start_scheduler(interval: float = INTERVAL_SECONDS):
+    """Run the job every `interval` seconds on a daemon thread (no-op if interval is 0)."""
+    batch_jobs.start_scheduler(JOB_NAME, run, interval)
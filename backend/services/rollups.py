@@ -0,0 +1,92 @@
+# backend/services/rollups.py
+"""
+Daily Revenue Rollups
+
+One row per (owner, day, currency, client) with the count, principal and net
+INR payout of the payments received that day. The payment webhook upserts
+into it in the same transaction as the Transaction row, so time-series
+queries at day granularity or coarser read a few rows per day instead of
+every transaction.
+"""
+
+import datetime
+from decimal import Decimal
+
+from sqlalchemy import Date, cast, delete, func, insert, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import models
+
+_rollup = models.RevenueDailyRollup.__table__
+_KEY = ["owner_id", "day", "currency", "client_id"]
+
+
+def record_payment(db, owner_id: int, client_id: int, currency: str, processed_at: datetime.datetime,
+                   principal_amount: Decimal, net_payout_inr: Decimal):
+    """Add one payment to its daily rollup row (upsert)."""
+    values = {
+        "owner_id": owner_id,
+        "day": processed_at.date(),
+        "currency": currency,
+        "client_id": client_id,
+        "transaction_count": 1,
+        "principal_amount": principal_amount or 0,
+        "net_payout_inr": net_payout_inr or 0,
+    }
+    stmt = pg_insert(_rollup).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=_KEY,
+        set_={
+            "transaction_count": _rollup.c.transaction_count + stmt.excluded.transaction_count,
+            "principal_amount": _rollup.c.principal_amount + stmt.excluded.principal_amount,
+            "net_payout_inr": _rollup.c.net_payout_inr + stmt.excluded.net_payout_inr,
+        },
+    )
+    db.execute(stmt)
+
+
+def _rollup_source(tx, inv, owner_id: int = None):
+    day = cast(tx.c.processed_at, Date)
+    source = (
+        select(
+            inv.c.owner_id,
+            day.label("day"),
+            func.coalesce(tx.c.currency, inv.c.currency).label("currency"),
+            inv.c.client_id,
+            func.count().label("transaction_count"),
+            func.coalesce(func.sum(tx.c.principal_amount), 0).label("principal_amount"),
+            func.coalesce(func.sum(tx.c.net_payout_inr), 0).label("net_payout_inr"),
+        )
+        .select_from(tx.join(inv, tx.c.invoice_id == inv.c.id))
+        .where(tx.c.status == "succeeded")
+        .group_by(inv.c.owner_id, day, func.coalesce(tx.c.currency, inv.c.currency), inv.c.client_id)
+    )
+    if owner_id is not None:
+        source = source.where(inv.c.owner_id == owner_id)
+    return source
+
+
+def rebuild(conn, owner_id: int = None, include_archive: bool = True):
+    """
+    Recompute rollups from the transactions table and the archive (all owners,
+    or one). Used to backfill existing data and to repair drift.
+    """
+    source = _rollup_source(models.Transaction.__table__, models.Invoice.__table__, owner_id)
+    if include_archive:
+        archived = _rollup_source(models.ArchivedTransaction.__table__, models.ArchivedInvoice.__table__, owner_id)
+        # An archived day may still have hot transactions of other invoices: add the two up
+        both = union_all(source, archived).subquery()
+        source = select(
+            both.c.owner_id, both.c.day, both.c.currency, both.c.client_id,
+            func.sum(both.c.transaction_count), func.sum(both.c.principal_amount), func.sum(both.c.net_payout_inr),
+        ).group_by(both.c.owner_id, both.c.day, both.c.currency, both.c.client_id)
+
+    clear = delete(_rollup)
+    if owner_id is not None:
+        clear = clear.where(_rollup.c.owner_id == owner_id)
+
+    conn.execute(clear)
+    conn.execute(insert(_rollup).from_select(
+        ["owner_id", "day", "currency", "client_id", "transaction_count", "principal_amount", "net_payout_inr"],
+        source,
+    ))
@@ -0,0 +1,227 @@
+# backend/services/search.py
+"""
+Client & Invoice Search
+
+One ranked, paginated result list over a user's clients (name, email) and
+invoices (id, payment link reference), with structured invoice filters
+(status, currency, due-date and amount ranges).
+
+Text matching is case-insensitive (LIKE on lower(...)), by substring or,
+with mode="prefix" (typeahead), by prefix. Results are ranked by match
+quality:
+
+  3  exact match (name, email, invoice id or reference)
+  2  prefix match
+  1  substring match
+
+ensure_search_indexes() creates trigram GIN indexes when the
+pg_trgm extension can be installed; those serve both prefix and substring
+LIKE patterns. Without pg_trgm it falls back to btree text_pattern_ops
+indexes, which serve prefix mode, while substring matches scan only the
+owner's rows.
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import BigInteger, Date, String, and_, case, cast, func, literal, null, or_, select, text, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import models
+from services import money
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 100
+TYPES = ("all", "clients", "invoices")
+MODES = ("substring", "prefix")
+RESULT_COLUMNS = ("type", "id", "title", "subtitle", "status", "currency", "amount", "due_date", "rank")
+
+_TRIGRAM_INDEXES = [
+    ("ix_clients_name_trgm", "clients", "lower(name) gin_trgm_ops"),
+    ("ix_clients_email_trgm", "clients", "lower(email) gin_trgm_ops"),
+    ("ix_invoices_payment_link_id_trgm", "invoices", "lower(payment_link_id) gin_trgm_ops"),
+]
+_PREFIX_INDEXES = [
+    ("ix_clients_owner_name_prefix", "clients", "owner_id, lower(name) text_pattern_ops"),
+    ("ix_clients_owner_email_prefix", "clients", "owner_id, lower(email) text_pattern_ops"),
+    ("ix_invoices_owner_link_prefix", "invoices", "owner_id, lower(payment_link_id) text_pattern_ops"),
+]
+
+
+def ensure_search_indexes(conn: Connection) -> str:
+    """
+    Create the text search indexes (idempotent). Returns "trigram" or "prefix".
+    """
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logger.warning(f"pg_trgm unavailable, using prefix indexes for search: {getattr(e, 'orig', e)}")
+        indexes, kind = _PREFIX_INDEXES, "prefix"
+    else:
+        indexes, kind = _TRIGRAM_INDEXES, "trigram"
+        conn.execute(text("DROP INDEX IF EXISTS " + ", ".join(name for name, _, _ in _PREFIX_INDEXES)))
+
+    for name, table, columns in indexes:
+        using = "USING gin " if kind == "trigram" else ""
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {using}({columns})"))
+    return kind
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _match_rank(column, term: str):
+    """3/2/1 for exact/prefix/substring matches of lower(column), else 0."""
+    lowered = func.lower(column)
+    escaped = _escape_like(term)
+    return case(
+        (lowered == term, 3),
+        (lowered.like(f"{escaped}%", escape="\\"), 2),
+        (lowered.like(f"%{escaped}%", escape="\\"), 1),
+        else_=0,
+    )
+
+
+def _match_condition(column, term: str, mode: str):
+    """Plain LIKE filter, so the trigram/prefix indexes on lower(column) can serve it."""
+    escaped = _escape_like(term)
+    pattern = f"{escaped}%" if mode == "prefix" else f"%{escaped}%"
+    return func.lower(column).like(pattern, escape="\\")
+
+
+def _parse_invoice_id(term: str) -> Optional[int]:
+    # Accept "42", "#42" and "inv-42" style references
+    digits = term.lstrip("#")
+    if digits.startswith("inv"):
+        digits = digits[3:].lstrip("-# ")
+    return int(digits) if digits.isdigit() and len(digits) < 10 else None
+
+
+def _result(row) -> dict:
+    result = {name: row[name] for name in RESULT_COLUMNS}
+    if result["amount"] is not None:
+        result["amount"] = money.to_major(result["amount"], result["currency"])
+    return result
+
+
+def search(
+    db: Session,
+    owner_id: int,
+    q: Optional[str] = None,
+    type: str = "all",
+    mode: str = "substring",
+    status: Optional[str] = None,
+    currency: Optional[str] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    min_amount: Optional[Decimal] = None,
+    max_amount: Optional[Decimal] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    """
+    Ranked search over the owner's clients and invoices. Invoice filters limit
+    the results to invoices. Raises ValueError for invalid arguments.
+    """
+    if type not in TYPES:
+        raise ValueError(f"type must be one of {', '.join(TYPES)}")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    term = (q or "").strip().lower()
+    has_filters = any(v is not None for v in (status, currency, due_from, due_to, min_amount, max_amount))
+    if not term and not has_filters:
+        raise ValueError("Provide a search term or at least one filter")
+
+    client = models.Client.__table__
+    invoice = models.Invoice.__table__
+    branches = []
+
+    if type in ("all", "clients") and not has_filters:
+        name_rank = _match_rank(client.c.name, term)
+        email_rank = _match_rank(client.c.email, term)
+        rank = case((name_rank >= email_rank, name_rank), else_=email_rank)
+        branches.append(
+            select(
+                literal("client").label("type"),
+                client.c.id,
+                client.c.name.label("title"),
+                client.c.email.label("subtitle"),
+                cast(null(), String).label("status"),
+                cast(null(), String).label("currency"),
+                cast(null(), BigInteger).label("amount"),
+                cast(null(), Date).label("due_date"),
+                rank.label("rank"),
+            )
+            .where(
+                client.c.owner_id == owner_id,
+                or_(_match_condition(client.c.name, term, mode), _match_condition(client.c.email, term, mode)),
+            )
+        )
+
+    if type in ("all", "invoices"):
+        conditions = [invoice.c.owner_id == owner_id]
+        if term:
+            invoice_id = _parse_invoice_id(term)
+            link_rank = _match_rank(invoice.c.payment_link_id, term)
+            matches = _match_condition(invoice.c.payment_link_id, term, mode)
+            if invoice_id is not None:
+                rank = case((invoice.c.id == invoice_id, 3), else_=link_rank)
+                matches = or_(invoice.c.id == invoice_id, matches)
+            else:
+                rank = link_rank
+            conditions.append(matches)
+        else:
+            rank = literal(0)
+        if status is not None:
+            conditions.append(invoice.c.status == status)
+        if currency is not None:
+            conditions.append(invoice.c.currency == currency.upper())
+        if due_from is not None:
+            conditions.append(invoice.c.due_date >= due_from)
+        if due_to is not None:
+            conditions.append(invoice.c.due_date <= due_to)
+        if min_amount is not None:
+            conditions.append(money.sql_to_major(invoice.c.total_minor, invoice.c.currency) >= min_amount)
+        if max_amount is not None:
+            conditions.append(money.sql_to_major(invoice.c.total_minor, invoice.c.currency) <= max_amount)
+
+        branches.append(
+            select(
+                literal("invoice").label("type"),
+                invoice.c.id,
+                client.c.name.label("title"),
+                invoice.c.payment_link_id.label("subtitle"),
+                invoice.c.status,
+                invoice.c.currency,
+                invoice.c.total_minor.label("amount"),
+                invoice.c.due_date,
+                rank.label("rank"),
+            )
+            .select_from(invoice.join(client, client.c.id == invoice.c.client_id))
+            .where(and_(*conditions))
+        )
+
+    if not branches:
+        return {"total": 0, "limit": limit, "offset": offset, "results": []}
+
+    results = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery("results")
+    total = db.execute(select(func.count()).select_from(results)).scalar()
+    rows = db.execute(
+        select(results)
+        .order_by(results.c.rank.desc(), func.length(results.c.title), results.c.id.desc())
+        .limit(min(limit, MAX_LIMIT))
+        .offset(offset)
+    ).mappings().all()
+
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "results": [_result(row) for row in rows],
+    }
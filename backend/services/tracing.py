@@ -0,0 +1,332 @@
+# backend/services/tracing.py
+"""
+Request Tracing
+
+Spans for where a request spends its time, without an external collector:
+
+  - one root span per HTTP request ("HTTP GET /invoices/{invoice_id}/pdf"),
+    continuing the caller's trace when it sends a W3C `traceparent` header,
+    and returning the request's own `traceparent` in the response
+  - a "db.query" span per SQL statement and a "db.commit" span per commit
+    (including the flush it triggers), on every engine
+  - spans opened in code with `span(...)` or `@traced(...)`: auth, FX payout
+    calculation, PDF rendering
+
+Finished spans are written as JSON lines to stdout (TRACE_EXPORTER=console)
+or to TRACE_FILE (TRACE_EXPORTER=file); TRACE_EXPORTER=none, the default,
+turns tracing off. TRACE_SAMPLE_RATE (0-1) is the share of new traces that
+are recorded; a request carrying a `traceparent` follows the caller's
+sampling decision instead.
+
+The current span is kept in a context variable, which Starlette copies into
+the threadpool that runs sync routes and dependencies.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders, Headers
+
+logger = logging.getLogger(__name__)
+
+EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()  # none | console | file
+SAMPLE_RATE = min(max(float(os.getenv("TRACE_SAMPLE_RATE", "1.0")), 0.0), 1.0)
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+ENABLED = EXPORTER in ("console", "file")
+MAX_STATEMENT_CHARS = 500
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "attributes", "status", "error",
+                 "start_time", "_started", "duration_ms", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, sampled: bool = True,
+                 attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.trace_id, self.span_id, self.sampled)
+
+    def to_dict(self) -> dict:
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+# --- W3C trace context ---
+
+def parse_traceparent(value: Optional[str]):
+    """(trace_id, parent span_id, sampled) from a `traceparent` header, or None if absent or invalid."""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 0x01)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+def _should_sample(trace_id: str, rate: float) -> bool:
+    # Ratio sampling on the trace id, so every service sampling at the same
+    # rate makes the same decision for a trace
+    return int(trace_id[16:], 16) < rate * (1 << 64)
+
+
+# --- Exporter ---
+
+_export_lock = threading.Lock()
+_export_file = None
+
+
+def _export(span: Span):
+    global _export_file
+    line = json.dumps(span.to_dict(), default=str) + "\n"
+    with _export_lock:
+        try:
+            if EXPORTER == "console":
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            elif EXPORTER == "file":
+                if _export_file is None:
+                    _export_file = open(TRACE_FILE, "a", buffering=1)
+                _export_file.write(line)
+        except OSError as e:
+            logger.warning(f"Could not export span {span.name}: {e}")
+
+
+# --- Spans ---
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, sample_rate: float = SAMPLE_RATE,
+                attributes: Optional[dict] = None) -> Span:
+    """Root span of a request, continuing the caller's trace when `traceparent` is valid."""
+    parent = parse_traceparent(traceparent)
+    if parent:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = _should_sample(trace_id, sample_rate)
+    span = Span(name, trace_id, parent_id, sampled, attributes)
+    span._token = _current.set(span)
+    return span
+
+
+def start_span(name: str, attributes: Optional[dict] = None) -> Optional[Span]:
+    """A child of the current span, made current; None when there is no sampled trace."""
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return None
+    span = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    span._token = _current.set(span)
+    return span
+
+
+def end_span(span: Optional[Span]):
+    if span is None or span.duration_ms is not None:
+        return
+    span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+    try:
+        _current.reset(span._token)
+    except ValueError:
+        # Ended from another context (e.g. a commit finished by a different
+        # task): just stop it being current here, if it is
+        if _current.get() is span:
+            _current.set(None)
+    if span.sampled:
+        _export(span)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child span of the current trace; does nothing outside one."""
+    s = start_span(name, attributes)
+    try:
+        yield s
+    except BaseException as e:
+        if s is not None:
+            s.record_error(e)
+        raise
+    finally:
+        end_span(s)
+
+
+def traced(name: str):
+    """Decorator form of span(); leaves the function untouched when tracing is off."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- HTTP ---
+
+class TracingMiddleware:
+    def __init__(self, app, sample_rate: float = SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        root = start_trace(
+            f"HTTP {method}",
+            Headers(scope=scope).get("traceparent"),
+            self.sample_rate,
+            {"http.method": method, "http.target": scope["path"]},
+        )
+        status_code = 500
+
+        async def send_with_traceparent(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["traceparent"] = root.traceparent
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_traceparent)
+        except Exception as e:
+            root.record_error(e)
+            raise
+        finally:
+            route = scope.get("route")  # set by the router once it matched
+            if route is not None and getattr(route, "path", None):
+                root.name = f"HTTP {method} {route.path}"
+                root.set_attribute("http.route", route.path)
+            root.set_attribute("http.status_code", status_code)
+            if status_code >= 500:
+                root.status = "error"
+            end_span(root)
+
+
+# --- SQLAlchemy ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    s = start_span("db.query", {
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:MAX_STATEMENT_CHARS],
+    })
+    if s is not None and executemany:
+        s.set_attribute("db.executemany", True)
+    context._trace_span = s
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    s = getattr(context, "_trace_span", None)
+    if s is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            s.set_attribute("db.rowcount", cursor.rowcount)
+        end_span(s)
+        context._trace_span = None
+
+
+def _handle_error(exception_context):
+    s = getattr(exception_context.execution_context, "_trace_span", None)
+    if s is not None:
+        s.record_error(exception_context.original_exception)
+        end_span(s)
+        exception_context.execution_context._trace_span = None
+
+
+def _before_commit(session):
+    session.info["trace_commit_span"] = start_span("db.commit")
+
+
+def _end_commit(session):
+    s = session.info.pop("trace_commit_span", None)
+    if s is not None:
+        end_span(s)
+
+
+def _rollback_commit(session):
+    s = session.info.pop("trace_commit_span", None)
+    if s is not None:
+        s.status = "error"
+        end_span(s)
+
+
+_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """Trace statements and commits of every engine and session; safe to call more than once."""
+    global _instrumented
+    if _instrumented:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _end_commit)
+    event.listen(Session, "after_rollback", _rollback_commit)
+    _instrumented = True
+
+
+def instrument(app):
+    """Add request spans to `app` and trace SQL, when TRACE_EXPORTER is set."""
+    if not ENABLED:
+        return
+    instrument_sqlalchemy()
+    app.add_middleware(TracingMiddleware)
+    logger.info(f"Tracing to {TRACE_FILE if EXPORTER == 'file' else 'stdout'}, sample rate {SAMPLE_RATE}")
@@ -0,0 +1,228 @@
+# backend/services/virtual_accounts.py
+"""
+Virtual Account Provisioning
+
+Opening a receiving account at a banking provider is a slow remote call, so
+account numbers are opened ahead of time into virtual_account_pool, per
+(currency, provider). Provisioning a user's account claims the oldest pooled
+number (SKIP LOCKED, so concurrent registrations never wait on each other)
+and moves it to virtual_accounts inside the caller's transaction.
+
+  - refill() tops every currency up to POOL_TARGET in one bulk call per
+    provider. It runs under a batch-job advisory lock, periodically when
+    VA_POOL_REFILL_INTERVAL_SECONDS is set, and on demand from a background
+    thread whenever a claim leaves fewer than POOL_LOW_WATER numbers.
+  - If a pool is empty, provisioning falls back to opening the account
+    directly (one provider round-trip) rather than failing.
+
+Account numbers are unique in both tables (unique indexes); a freshly minted
+number that is already assigned is discarded at refill time.
+
+_open_accounts() is a local stand-in for the providers' bulk account APIs;
+VA_PROVIDER_LATENCY_SECONDS simulates their round-trip time.
+"""
+
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import database
+import models
+from services import batch_jobs, reconciliation
+
+logger = logging.getLogger(__name__)
+
+REFILL_JOB_NAME = "va_pool_refill"
+DEFAULT_CURRENCY = "USD"
+POOL_TARGET = int(os.getenv("VA_POOL_TARGET", "200"))  # numbers kept ready per currency
+POOL_LOW_WATER = int(os.getenv("VA_POOL_LOW_WATER", "50"))  # claims below this trigger a refill
+PROVIDER_LATENCY_SECONDS = float(os.getenv("VA_PROVIDER_LATENCY_SECONDS", "0"))
+REFILL_INTERVAL_SECONDS = float(os.getenv("VA_POOL_REFILL_INTERVAL_SECONDS", "0"))  # 0 disables the periodic refill
+
+# Currency corridors: receiving bank and provider per currency
+VA_CONFIGS = {
+    "USD": {
+        "bank_name": "Community Federal Savings Bank",
+        "routing_code": "026073150",
+        "provider": "Currencycloud",
+        "prefix": "VA",
+    },
+    "EUR": {
+        "bank_name": "Banking Circle",
+        "routing_code": None,  # IBAN, issued per account
+        "provider": "Banking Circle",
+        "prefix": "EU",
+    },
+    "GBP": {
+        "bank_name": "Barclays Bank UK",
+        "routing_code": "20-45-45",  # Sort Code mock
+        "provider": "Currencycloud",
+        "prefix": "GB",
+    },
+}
+
+_pool = models.VirtualAccountPool.__table__
+_accounts = models.VirtualAccount.__table__
+
+_refill_lock = threading.Lock()
+_refill_thread: Optional[threading.Thread] = None
+
+
+class UnsupportedCurrency(ValueError):
+    pass
+
+
+def supported_currencies() -> List[str]:
+    return list(VA_CONFIGS)
+
+
+def _open_accounts(currency: str, count: int) -> List[dict]:
+    """Local stand-in for a provider's bulk account-opening API."""
+    config = VA_CONFIGS[currency]
+    if PROVIDER_LATENCY_SECONDS:
+        time.sleep(PROVIDER_LATENCY_SECONDS)
+    return [
+        {
+            "currency": currency,
+            "provider": config["provider"],
+            "bank_name": config["bank_name"],
+            "account_number": f"{config['prefix']}{secrets.token_hex(6).upper()}",
+            "routing_code": config["routing_code"] or f"BE{secrets.token_hex(10).upper()}",
+        }
+        for _ in range(count)
+    ]
+
+
+def _claim(db: Session, currency: str) -> Optional[dict]:
+    """Take the oldest pooled number for the currency, or None if the pool is empty."""
+    provider = VA_CONFIGS[currency]["provider"]
+    row = db.execute(
+        select(_pool)
+        .where(_pool.c.currency == currency, _pool.c.provider == provider)
+        .order_by(_pool.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).mappings().first()
+    if row is None:
+        return None
+    db.execute(delete(_pool).where(_pool.c.id == row["id"]))
+    return {key: row[key] for key in ("currency", "provider", "bank_name", "account_number", "routing_code")}
+
+
+def _is_low(db: Session, currency: str) -> bool:
+    # Index-only probe: is there a row past the low-water mark?
+    return db.execute(
+        select(_pool.c.id)
+        .where(_pool.c.currency == currency, _pool.c.provider == VA_CONFIGS[currency]["provider"])
+        .order_by(_pool.c.id)
+        .offset(POOL_LOW_WATER)
+        .limit(1)
+    ).first() is None
+
+
+def provision(db: Session, user_id: int, currencies: Iterable[str]) -> List[models.VirtualAccount]:
+    """
+    Assign one account per currency to the user, from the pool where possible.
+    Runs inside the caller's transaction (flushes, does not commit). Credits
+    that reached a pooled account before it was assigned move to the user's
+    review queue. Raises UnsupportedCurrency for a currency without a corridor.
+    """
+    currencies = [c.upper() for c in currencies]
+    unsupported = [c for c in currencies if c not in VA_CONFIGS]
+    if unsupported:
+        raise UnsupportedCurrency(f"Currency {', '.join(unsupported)} not supported for Virtual Accounts.")
+
+    accounts, low = [], False
+    for currency in currencies:
+        data = _claim(db, currency)
+        if data is None:
+            logger.warning(f"Virtual account pool for {currency} is empty; opening an account directly")
+            data = _open_accounts(currency, 1)[0]
+            low = True
+        else:
+            low = low or _is_low(db, currency)
+        accounts.append(models.VirtualAccount(user_id=user_id, **data))
+
+    db.add_all(accounts)
+    db.flush()
+    reconciliation.claim_orphans(db, [a.account_number for a in accounts])
+    if low:
+        request_refill()
+    return accounts
+
+
+def pool_levels(db: Session) -> Dict[str, int]:
+    counts = dict(db.execute(select(_pool.c.currency, func.count()).group_by(_pool.c.currency)).all())
+    return {currency: counts.get(currency, 0) for currency in VA_CONFIGS}
+
+
+def _insert_pool(db: Session, rows: List[dict]) -> int:
+    stmt = pg_insert(_pool)
+    result = db.execute(stmt.on_conflict_do_nothing(index_elements=["account_number"]), rows)
+    return result.rowcount
+
+
+def refill(target: int = POOL_TARGET, engine=None) -> Optional[dict]:
+    """
+    Top every currency's pool up to `target` numbers. Returns a summary, or
+    None if another process is already refilling.
+    """
+    engine = engine or database.engine
+    with batch_jobs.exclusive(engine, REFILL_JOB_NAME) as acquired:
+        if not acquired:
+            return None
+
+        started = time.perf_counter()
+        added = defaultdict(int)
+        with Session(bind=engine) as db:
+            for currency, available in pool_levels(db).items():
+                missing = target - available
+                if missing <= 0:
+                    continue
+                rows = _open_accounts(currency, missing)
+                taken = set(db.execute(
+                    select(_accounts.c.account_number)
+                    .where(_accounts.c.account_number.in_([r["account_number"] for r in rows]))
+                ).scalars())
+                fresh = [r for r in rows if r["account_number"] not in taken]
+                if fresh:
+                    added[currency] = _insert_pool(db, fresh)
+                db.commit()
+            levels = pool_levels(db)
+
+        return {
+            "processed": sum(added.values()),
+            "added": dict(added),
+            "available": levels,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+def _refill_quietly():
+    try:
+        refill()
+    except Exception as e:
+        logger.error(f"Virtual account pool refill failed: {e}")
+
+
+def request_refill():
+    """Refill the pool on a background thread, unless a refill is already running here."""
+    global _refill_thread
+    with _refill_lock:
+        if _refill_thread is not None and _refill_thread.is_alive():
+            return
+        _refill_thread = threading.Thread(target=_refill_quietly, name="va-pool-refill", daemon=True)
+        _refill_thread.start()
+
+
+def start_scheduler(interval: float = REFILL_INTERVAL_SECONDS):
+    """Refill the pool every `interval` seconds on a daemon thread (no-op if interval is 0)."""
+    batch_jobs.start_scheduler(REFILL_JOB_NAME, refill, interval)
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react';
 import { useParams, useRouter } from 'next/navigation';
-import { getInvoice, downloadInvoicePDF, downloadFiraPDF, getInvoiceTransaction } from '@/services/api';
+import { getInvoice, downloadInvoicePDF, downloadFiraPDF, getInvoiceTransaction, openInvoiceEventStream } from '@/services/api';
 import Link from 'next/link';
 
 interface InvoiceItem {
@@ -83,16 +83,21 @@ export default function InvoiceDetailPage() {
         if (id) {
             fetchData();
 
-            // Set up polling if the invoice is not paid yet
-            const interval = setInterval(() => {
-                if (invoice?.status !== 'paid') {
+            // Refetch when the server pushes a change for this invoice
+            const stream = openInvoiceEventStream();
+            const onEvent = (event: MessageEvent) => {
+                const data = JSON.parse(event.data);
+                if (data.type === 'resync' || data.invoice_id === Number(id)) {
                     fetchData();
                 }
-            }, 3000); // Poll every 3 seconds
+            };
+            ['invoice.paid', 'invoice.status_changed', 'settlement.updated', 'resync'].forEach((type) =>
+                stream.addEventListener(type, onEvent)
+            );
 
-            return () => clearInterval(interval);
+            return () => stream.close();
         }
-    }, [id, invoice?.status]);
+    }, [id]);
 
 
     if (loading) return <div className="p-8">Loading...</div>;
@@ -158,7 +163,7 @@ export default function InvoiceDetailPage() {
                                 )}
                             </div>
                         </div>
-                        <span className={`px-3 py-1 rounded-full text-sm font-semibold ${invoice.status === 'paid' ? 'bg-green-100 text-green-800' : 'bg-yellow-100 text-yellow-800'
+                        <span className={`px-3 py-1 rounded-full text-sm font-semibold ${invoice.status === 'paid' ? 'bg-green-100 text-green-800' : invoice.status === 'overdue' ? 'bg-red-100 text-red-800' : 'bg-yellow-100 text-yellow-800'
                             }`}>
                             {invoice.status.toUpperCase()}
                         </span>
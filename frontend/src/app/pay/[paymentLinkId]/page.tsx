@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react';
 import { useParams } from 'next/navigation';
-import { getPublicInvoice, triggerMockPayment } from '@/services/api';
+import { getPublicInvoice, triggerMockPayment, openPaymentLinkEventStream } from '@/services/api';
 
 interface InvoiceItem {
     id: number;
@@ -49,6 +49,18 @@ export default function PublicPaymentPage() {
             }
         };
         fetchInvoice();
+
+        if (!paymentLinkId) return;
+        // Pick up payments completed elsewhere (e.g. a bank transfer) without polling
+        const stream = openPaymentLinkEventStream(paymentLinkId as string);
+        const onStatus = (event: MessageEvent) => {
+            const data = JSON.parse(event.data);
+            setInvoice((current) => (current ? { ...current, status: data.status } : current));
+        };
+        stream.addEventListener('invoice.paid', onStatus);
+        stream.addEventListener('invoice.status_changed', onStatus);
+        stream.addEventListener('resync', fetchInvoice);
+        return () => stream.close();
     }, [paymentLinkId]);
 
     const handlePayment = async (status: 'success' | 'failed') => {
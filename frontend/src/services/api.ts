@@ -140,4 +140,14 @@ export const updateUserProfile = async (profile: { business_name: string; gstin:
   });
 };
 
+// EventSource cannot send headers, so the token travels as a query parameter.
+export const openInvoiceEventStream = () => {
+  const token = localStorage.getItem('token');
+  return new EventSource(`${API_BASE_URL}/streams/invoices?access_token=${encodeURIComponent(token || '')}`);
+};
+
+export const openPaymentLinkEventStream = (paymentLinkId: string) => {
+  return new EventSource(`${API_BASE_URL}/streams/payment-links/${paymentLinkId}`);
+};
+
 export default api;